@@ -0,0 +1,157 @@
+"""Collect per-signal activity statistics during a simulation.
+
+Used in the Logic Simulator project to estimate switching activity without
+storing signal traces.
+
+Classes
+-------
+Activity - counts toggles, high time and stable runs of every output.
+"""
+
+from signals import LEVEL_TABLE
+
+
+class Activity:
+
+    """Count toggles, high time and stable runs of every output.
+
+    The collector keeps the logic level (1 for HIGH and RISING, 0 otherwise)
+    of every output in the network. Each cycle only the outputs of the
+    devices the network reports as changed are visited, see
+    Network.changed_devices, so the cost of a cycle grows with the number of
+    changed signals rather than the size of the network.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+
+    Public methods
+    --------------
+    reset(self): Clears all statistics and starts counting from cycle 0.
+
+    update(self, changed_devices=None): Records the levels of the outputs
+                                        for one cycle.
+
+    repeat(self, cycles): Records more cycles with the levels of the last
+                          one.
+
+    get_statistics(self): Returns a row of statistics for every output.
+
+    display_statistics(self): Prints the statistics table in the console.
+    """
+
+    def __init__(self, devices):
+        """Initialise the output list and statistics."""
+        self.devices = devices
+
+        # Maps a signal to its logic level: HIGH and RISING are 1
+        self.level_table = LEVEL_TABLE
+        self.reset()
+
+    def reset(self):
+        """Clear all statistics and start counting from cycle 0."""
+        self.signal_list = []  # [(device_id, output_id)] in index order
+        # [(device.outputs, output_id, index)] of all outputs, and by device
+        self.output_refs = []
+        self.device_refs = {}
+        for device in self.devices.devices_list:
+            for output_id in device.outputs:
+                output_ref = (device.outputs, output_id,
+                              len(self.signal_list))
+                self.signal_list.append((device.device_id, output_id))
+                self.output_refs.append(output_ref)
+                self.device_refs.setdefault(device, []).append(output_ref)
+
+        signal_count = len(self.signal_list)
+        self.cycles = 0
+        self.levels = None  # bytearray of the levels of the previous cycle
+        self.toggles = [0] * signal_count
+        self.high_cycles = [0] * signal_count  # excludes the current run
+        self.run_start = [0] * signal_count  # cycle the current run began
+        self.longest_run = [0] * signal_count  # excludes the current run
+        self.first_change = [None] * signal_count
+        self.last_change = [None] * signal_count
+
+    def update(self, changed_devices=None):
+        """Record the levels of the outputs for one cycle.
+
+        This function is called at every simulation cycle. changed_devices
+        holds the devices whose outputs may have changed since the last
+        cycle, and only their outputs are visited. If it is None, every
+        output is visited, as on the first cycle.
+        """
+        cycle = self.cycles
+        self.cycles += 1
+        level_table = self.level_table
+        if self.levels is None:
+            self.levels = bytearray([
+                level_table[outputs[output_id]]
+                for outputs, output_id, index in self.output_refs])
+            return
+        if changed_devices is None:
+            output_refs = self.output_refs
+        else:
+            output_refs = [output_ref for device in changed_devices
+                           for output_ref in self.device_refs.get(device, [])]
+
+        levels = self.levels
+        for outputs, output_id, index in output_refs:
+            level = level_table[outputs[output_id]]
+            if level == levels[index]:
+                continue
+            levels[index] = level
+
+            run_length = cycle - self.run_start[index]
+            if run_length > self.longest_run[index]:
+                self.longest_run[index] = run_length
+            if not level:  # the signal has just fallen
+                self.high_cycles[index] += run_length
+            self.run_start[index] = cycle
+            self.toggles[index] += 1
+            if self.first_change[index] is None:
+                self.first_change[index] = cycle
+            self.last_change[index] = cycle
+
+    def repeat(self, cycles):
+        """Record cycles more cycles with the same levels as the last one.
+
+        Nothing changes in a repeated cycle, so only the cycle count moves.
+        """
+        self.cycles += cycles
+
+    def get_statistics(self):
+        """Return a row of statistics for every output.
+
+        Each row is [signal name, toggles, duty cycle, longest stable run,
+        first change, last change]. The change cycles are None if the signal
+        never changed.
+        """
+        rows = []
+        for index, (device_id, output_id) in enumerate(self.signal_list):
+            run_length = self.cycles - self.run_start[index]
+            high_cycles = self.high_cycles[index]
+            if self.levels is not None and self.levels[index]:
+                high_cycles += run_length
+            if self.cycles:
+                duty_cycle = high_cycles / self.cycles
+            else:
+                duty_cycle = 0.0
+            rows.append([self.devices.get_signal_name(device_id, output_id),
+                         self.toggles[index], duty_cycle,
+                         max(self.longest_run[index], run_length),
+                         self.first_change[index], self.last_change[index]])
+        return rows
+
+    def display_statistics(self):
+        """Print the statistics table in the console."""
+        rows = self.get_statistics()
+        margin = max([len("Signal")] + [len(row[0]) for row in rows])
+        print(" ".join(["Signal".ljust(margin), "Toggles", "  Duty",
+                        " Longest", "   First", "    Last"]))
+        for name, toggles, duty_cycle, longest_run, first, last in rows:
+            print(" ".join([name.ljust(margin), str(toggles).rjust(7),
+                            "{:6.1%}".format(duty_cycle),
+                            str(longest_run).rjust(8),
+                            ("-" if first is None else str(first)).rjust(8),
+                            ("-" if last is None else str(last)).rjust(8)]))
+        print("".join(["Cycles: ", str(self.cycles)]))
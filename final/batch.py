@@ -0,0 +1,124 @@
+"""Run the Logic Simulator without user interaction.
+
+Used in the Logic Simulator project by job schedulers and scripts, through
+"logsim.py --batch FILE --cycles N [--stimulus S] [--out TRACE]
+[--cache DIR]". Nothing is printed on success; parser and file errors go to
+standard error. The exit status is 0 if the run completed, 1 if the
+definition or stimulus file could not be read or parsed, and 2 if the
+network oscillated.
+
+Functions
+---------
+parse_circuit - parses a definition file, reporting errors on stderr.
+run_batch - parses a definition file, simulates it and writes the traces.
+"""
+
+import contextlib
+import sys
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from stimulus import Stimulus
+from trace_archive import save_monitors
+from periodicity import PeriodDetector
+
+[EXIT_OK, EXIT_ERROR, EXIT_OSCILLATING] = range(3)
+
+
+def parse_circuit(path):
+    """Parse the definition file at path without writing to standard output.
+
+    Return a list [names, devices, network, monitors], or None if the file
+    cannot be read or has errors, which are reported on standard error.
+    """
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    try:
+        # Keep standard output free for the caller
+        with contextlib.redirect_stdout(sys.stderr):
+            parser = Parser(names, devices, network, monitors,
+                            Scanner(path, names))
+            if not parser.parse_network():
+                return None
+    except OSError:
+        print("Error: cannot read definition file", path, file=sys.stderr)
+        return None
+    return [names, devices, network, monitors]
+
+
+def run_batch(path, cycles, stimulus_path=None, out_path=None, seed=None,
+              cache_dir=None):
+    """Simulate the definition file at path for a number of cycles.
+
+    The cold start-up is seeded with seed, if given, so runs can be repeated.
+    Once the network state repeats after the last switch event, the rest of
+    the run is extrapolated from the repeated period.
+    With a cache_dir, a run found in the result cache there is not simulated
+    again, and a longer run resumes from the end of the cached one.
+
+    Switch events from the stimulus file are applied as the run goes. The
+    monitor traces are written to a trace archive at out_path, also when the
+    network oscillates. Return the exit status.
+    """
+    circuit = parse_circuit(path)
+    if circuit is None:
+        return EXIT_ERROR
+    [names, devices, network, monitors] = circuit
+
+    stimulus = Stimulus(names, devices)
+    if stimulus_path is not None:
+        try:
+            error = stimulus.load(stimulus_path)
+        except OSError:
+            print("Error: cannot read stimulus file", stimulus_path,
+                  file=sys.stderr)
+            return EXIT_ERROR
+        if error != stimulus.NO_ERROR:
+            print("Error in stimulus file {path}, line {line}".format(
+                path=stimulus_path, line=stimulus.error_line),
+                file=sys.stderr)
+            return EXIT_ERROR
+
+    status = EXIT_OK
+    devices.set_seed(seed)
+    cache = key = None
+    if cache_dir is not None:
+        from result_cache import ResultCache  # only needed with a cache
+        try:
+            cache = ResultCache(cache_dir)
+        except OSError:
+            print("Error: cannot create cache directory", cache_dir,
+                  file=sys.stderr)
+            return EXIT_ERROR
+        key = cache.get_key(monitors, stimulus)
+    devices.cold_startup()
+    cycle = 0
+    if key is not None:
+        cycle = cache.load(key, cycles, monitors)
+        stimulus.skip(cycle)
+    cached_cycles = cycle
+    # Batch runs never add monitors or replay, so take no checkpoints
+    detector = PeriodDetector(network, monitors)
+    [cycle, run_status, fired] = monitors.run_cycles(
+        cycle, cycles, stimulus, detector=detector, checkpoint=False)
+    if run_status == monitors.OSCILLATING:
+        status = EXIT_OSCILLATING
+    if key is not None and status == EXIT_OK and cycles > cached_cycles:
+        try:
+            cache.store(key, cycles, monitors)
+        except OSError as error:
+            print(error, file=sys.stderr)  # the run itself succeeded
+
+    if out_path is not None:
+        try:
+            save_monitors(out_path, monitors)
+        except OSError as error:
+            print(error, file=sys.stderr)
+            return EXIT_ERROR
+    return status
@@ -0,0 +1,121 @@
+"""Measure the cost of signal updates and gate evaluations.
+
+Compares the table lookups of the signals module with the list-membership
+branches they replaced, and the gate bank of the network with executing
+the gates one by one. Run from this directory:
+
+    python bench_signals.py [gates] [repeats]
+
+Reports the best time per signal update, and per gate evaluated in a cycle
+of a chain of gates fed by a toggling switch.
+"""
+
+import sys
+import timeit
+
+from names import Names
+from devices import Devices
+from network import Network
+from signals import SIGNAL_TYPES, LOW, HIGH, RISING, FALLING, TRANSITIONS
+
+UPDATES = [(signal, target) for signal in SIGNAL_TYPES
+           for target in [LOW, HIGH]]
+
+
+def update_by_branches(signal, target):
+    """Return the updated signal using branches, as before the tables."""
+    if signal in [LOW, FALLING]:
+        if target == LOW:
+            return LOW
+        return RISING
+    elif signal in [HIGH, RISING]:
+        if target == LOW:
+            return FALLING
+        return HIGH
+    return None
+
+
+def update_by_table(signal, target):
+    """Return the updated signal using signals.TRANSITIONS."""
+    transitions = TRANSITIONS.get(signal)
+    if transitions is None:
+        return None
+    return transitions[target != LOW]
+
+
+def time_updates(update, repeats):
+    """Return the best time in seconds of one signal update."""
+    number = 10000
+    times = timeit.repeat(lambda: [update(signal, target) for signal, target
+                                   in UPDATES],
+                          number=number, repeat=repeats)
+    return min(times) / (number * len(UPDATES))
+
+
+def make_chain(gate_count):
+    """Return a network of a chain of gates and the switch feeding it."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    [SW_ID, I1, I2] = names.lookup(["sw", "I1", "I2"])
+    devices.make_device(SW_ID, devices.SWITCH, 0)
+    previous_id = SW_ID
+    kinds = [devices.AND, devices.OR, devices.NAND, devices.NOR, devices.XOR]
+    for index in range(gate_count):
+        [GATE_ID] = names.lookup(["g{}".format(index)])
+        kind = kinds[index % len(kinds)]
+        devices.make_device(GATE_ID, kind, None if kind == devices.XOR else 2)
+        network.make_connection(previous_id, None, GATE_ID, I1)
+        network.make_connection(SW_ID, None, GATE_ID, I2)
+        previous_id = GATE_ID
+    network.memo_size = 0  # time the evaluation, not the memo
+    return network, SW_ID
+
+
+def time_gates(gate_count, bank, repeats):
+    """Return the best time in seconds of one gate evaluation."""
+    network, SW_ID = make_chain(gate_count)
+    devices = network.devices
+    network.execute_network()
+    if not bank:
+        network.gates = None  # executed one by one until the network changes
+
+    def run_cycles():
+        for state in [1, 0]:
+            devices.set_switch(SW_ID, state)
+            network.execute_network()
+
+    # Count the gate evaluations of two cycles, one rising and one falling
+    method_name = "execute_gates" if bank else "execute_gate"
+    method = getattr(network, method_name)
+    evaluations = []
+
+    def count_evaluations(*args):
+        evaluations.append(gate_count if bank else 1)
+        return method(*args)
+    setattr(network, method_name, count_evaluations)
+    run_cycles()
+    delattr(network, method_name)
+
+    number = 5
+    times = timeit.repeat(run_cycles, number=number, repeat=repeats)
+    return min(times) / (number * sum(evaluations))
+
+
+def main(arg_list):
+    """Time signal updates and gate evaluations."""
+    gate_count = int(arg_list[0]) if arg_list else 200
+    repeats = int(arg_list[1]) if len(arg_list) > 1 else 5
+
+    for name, update in [("update by branches", update_by_branches),
+                         ("update by table", update_by_table)]:
+        print("{:32} {:7.1f} ns".format(
+            name, 1e9 * time_updates(update, repeats)))
+    for name, bank in [("gates one by one", False),
+                       ("gate bank", True)]:
+        print("{:32} {:7.1f} ns per gate".format(
+            name, 1e9 * time_gates(gate_count, bank, repeats)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
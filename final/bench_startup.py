@@ -0,0 +1,46 @@
+"""Measure the cold-start time of the Logic Simulator command line.
+
+Each measurement starts a fresh Python interpreter, so module imports and
+the loading of the message catalog are included. Run from this directory:
+
+    python bench_startup.py [definition file] [repeats]
+
+Reports the best and median wall-clock times of importing logsim and of
+parsing a definition file and quitting the command line interface.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_command(arguments, repeats, input_text=None):
+    """Return the wall-clock times of running Python with arguments."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, input=input_text,
+                       capture_output=True, text=True, check=False)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main(arg_list):
+    """Time the interpreter alone, importing logsim and a CLI session."""
+    path = arg_list[0] if arg_list else "final_ex0.txt"
+    repeats = int(arg_list[1]) if len(arg_list) > 1 else 10
+
+    benchmarks = [
+        ("python -c pass", ["-c", "pass"], None),
+        ("import logsim", ["-c", "import logsim"], None),
+        ("logsim.py -c (parse and quit)", ["logsim.py", "-c", path], "q\n"),
+    ]
+    for name, arguments, input_text in benchmarks:
+        times = time_command(arguments, repeats, input_text)
+        print("{:32} best {:7.1f} ms   median {:7.1f} ms".format(
+            name, 1000 * min(times), 1000 * statistics.median(times)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
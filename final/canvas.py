@@ -1,10 +1,9 @@
 """
-This module initializes the locale settings and imports necessary modules 
+This module imports the necessary modules 
 for the MyGLCanvas class, which handles all drawing operations using 
 OpenGL in a wxPython application.
 """
 
-import os
 import wx
 import wx.glcanvas as wxcanvas
 import numpy as np
@@ -19,25 +18,8 @@ from matplotlib.backends.backend_wxagg import (
 
 from logic_draw import LogicDrawer
 from connect_draw import ConnectDrawer
+from i18n import _
 
-import gettext
-
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
 
 class MyGLCanvas(wxcanvas.GLCanvas):
     """
@@ -340,7 +322,10 @@ class MyGLCanvas(wxcanvas.GLCanvas):
             text = "".join([_("Mouse button pressed at: "), str(event.GetX()),
                             ", ", str(event.GetY())])
 
-            if self.parent.is_zap_monitor:
+            if self.parent.simulating:
+                # The circuit cannot change while a simulation is running
+                pass
+            elif self.parent.is_zap_monitor:
                 GL.glFlush()
                 port_tuple = self.return_closest_output_id((ox, oy))
                 self.do_zap_monitor(port_tuple)
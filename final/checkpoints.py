@@ -0,0 +1,235 @@
+"""Take periodic checkpoints of the simulation and replay from them.
+
+Used in the Logic Simulator project to reconstruct the history of monitors
+that were added after part of the simulation had already been run.
+
+Classes
+-------
+Checkpoints - stores checkpoints of the network state and replays them.
+"""
+
+import bisect
+
+
+class Checkpoints:
+
+    """Store checkpoints of the network state and replay from them.
+
+    A checkpoint is the dynamic state of every device at the start of a
+    simulation cycle. Checkpoints are taken every interval cycles and at the
+    start of every run or continue, so that switch changes made between runs
+    are captured. Switch changes made during a run, e.g. by a stimulus, are
+    recorded as the switch states alone. Any past cycle can then be
+    re-simulated by starting from the nearest earlier checkpoint instead of
+    from cycle 0.
+
+    Once there are more than max_checkpoints periodic checkpoints, the
+    interval is doubled and the periodic checkpoints off the new interval
+    are deleted, so memory stays bounded however long the run. Forced
+    checkpoints are always kept.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    interval: number of simulation cycles between periodic checkpoints at
+              first.
+    max_checkpoints: maximum number of periodic checkpoints kept.
+
+    Public methods
+    --------------
+    reset(self): Deletes all checkpoints.
+
+    truncate(self, cycle): Deletes the checkpoints at or after the given
+                           cycle.
+
+    update(self, cycle, force=False): Takes a checkpoint at the start of the
+                                      given cycle if one is due.
+
+    add_switches(self, cycle): Records the switch states at the start of the
+                               given cycle.
+
+    nearest_checkpoint(self, cycle): Returns the latest checkpoint cycle at or
+                                     before the given cycle.
+
+    add_period(self, start, stop, period): Records that cycles start to
+               stop - 1 repeat the period before them, and takes a
+               checkpoint at stop.
+
+    replay_signal(self, device_id, output_id, start, stop): Returns the
+                  signal levels of an output for cycles start to stop - 1.
+    """
+
+    def __init__(self, devices, network, interval=100,
+                 max_checkpoints=1000):
+        """Initialise the checkpoint store."""
+        self.devices = devices
+        self.network = network
+        self.first_interval = interval
+        self.interval = interval
+        self.max_checkpoints = max_checkpoints
+
+        self.checkpoints = {}  # {cycle: state at the start of that cycle}
+        self.checkpoint_cycles = []  # sorted list of checkpoint cycles
+        self.forced = set()  # cycles of the forced checkpoints
+        # Switch states set during runs, {cycle: [(device, switch_state)]},
+        # and the sorted list of their cycles
+        self.switches = {}
+        self.switch_cycles = []
+        # Extrapolated spans, {first cycle: [stop cycle, period]}, see
+        # add_period
+        self.periods = {}
+
+    def reset(self):
+        """Delete all checkpoints."""
+        self.checkpoints = {}
+        self.checkpoint_cycles = []
+        self.forced = set()
+        self.switches = {}
+        self.switch_cycles = []
+        self.periods = {}
+        self.interval = self.first_interval
+
+    def truncate(self, cycle):
+        """Delete the checkpoints at or after the given cycle."""
+        position = bisect.bisect_left(self.checkpoint_cycles, cycle)
+        for later_cycle in self.checkpoint_cycles[position:]:
+            del self.checkpoints[later_cycle]
+            self.forced.discard(later_cycle)
+        del self.checkpoint_cycles[position:]
+        position = bisect.bisect_left(self.switch_cycles, cycle)
+        for later_cycle in self.switch_cycles[position:]:
+            del self.switches[later_cycle]
+        del self.switch_cycles[position:]
+        for first_cycle in list(self.periods):
+            if first_cycle >= cycle:
+                del self.periods[first_cycle]
+            elif self.periods[first_cycle][0] > cycle:
+                self.periods[first_cycle][0] = cycle
+
+    def update(self, cycle, force=False):
+        """Take a checkpoint at the start of the given cycle if one is due.
+
+        A checkpoint is due every interval cycles, or whenever force is True.
+        This function is called before executing every simulation cycle, or
+        after cycles skipped by Network.fast_forward, in which case a
+        checkpoint is due if a multiple of interval was skipped.
+        """
+        if force:
+            self.forced.add(cycle)
+        elif cycle % self.interval != 0 and (
+                not self.checkpoint_cycles or
+                self.checkpoint_cycles[-1] // self.interval ==
+                cycle // self.interval):
+            return
+        if cycle not in self.checkpoints:
+            bisect.insort(self.checkpoint_cycles, cycle)
+        self.checkpoints[cycle] = self.devices.save_state()
+
+        if len(self.checkpoint_cycles) - len(self.forced) > \
+                self.max_checkpoints:
+            # Thin out the periodic checkpoints to the doubled interval
+            self.interval *= 2
+            kept_cycles = []
+            for kept_cycle in self.checkpoint_cycles:
+                if kept_cycle % self.interval == 0 or \
+                        kept_cycle in self.forced:
+                    kept_cycles.append(kept_cycle)
+                else:
+                    del self.checkpoints[kept_cycle]
+            self.checkpoint_cycles = kept_cycles
+
+    def add_switches(self, cycle):
+        """Record the switch states at the start of the given cycle.
+
+        This is called when switches are set during a run, e.g. by stimulus
+        events. Replays set the recorded states as they pass the cycle, so
+        no checkpoint is needed there.
+        """
+        if cycle not in self.switches:
+            bisect.insort(self.switch_cycles, cycle)
+        devices = self.devices
+        self.switches[cycle] = [(device, device.switch_state) for device
+                                in devices.devices_list
+                                if device.device_kind == devices.SWITCH]
+
+    def nearest_checkpoint(self, cycle):
+        """Return the latest checkpoint cycle at or before the given cycle.
+
+        Return None if there is no such checkpoint.
+        """
+        position = bisect.bisect_right(self.checkpoint_cycles, cycle)
+        if position == 0:
+            return None
+        return self.checkpoint_cycles[position - 1]
+
+    def add_period(self, start, stop, period):
+        """Record that cycles start to stop - 1 repeat the period before them.
+
+        This is called when a run is extrapolated, see
+        periodicity.PeriodDetector, after the network state has been moved
+        on to the start of cycle stop, where a checkpoint is taken. Replays
+        then copy the period instead of simulating the span again.
+        """
+        self.periods[start] = [stop, period]
+        self.update(stop, force=True)
+
+    def replay_signal(self, device_id, output_id, start, stop):
+        """Return the signal levels of an output for cycles start to stop - 1.
+
+        The cycles are re-simulated from the nearest earlier checkpoint and
+        the live simulation state is restored afterwards. Later checkpoints
+        met on the way are loaded and recorded switch states are set, so
+        switch changes are respected. Idle cycles up to the next checkpoint
+        or switch change are skipped, see Network.fast_forward, and
+        extrapolated spans are copied from the period before them, see
+        add_period. Return None if no checkpoint
+        covers start, or a shorter list if the network oscillates.
+        """
+        first_cycle = self.nearest_checkpoint(start)
+        if first_cycle is None:
+            return None
+
+        live_state = self.devices.save_state()
+        steady_state = self.network.steady_state
+        signal_list = []
+        try:
+            cycle = first_cycle
+            while cycle < stop:
+                if cycle in self.periods:
+                    [span_stop, period] = self.periods[cycle]
+                    pattern = self.replay_signal(device_id, output_id,
+                                                 cycle - period, cycle)
+                    if pattern is not None and len(pattern) == period:
+                        span_stop = min(span_stop, stop)
+                        first = max(cycle, start)
+                        signal_list += [pattern[(later_cycle - cycle) % period]
+                                        for later_cycle
+                                        in range(first, span_stop)]
+                        cycle = span_stop
+                        continue
+                if cycle in self.checkpoints:
+                    self.devices.load_state(self.checkpoints[cycle])
+                if cycle in self.switches:
+                    for device, switch_state in self.switches[cycle]:
+                        device.switch_state = switch_state
+                if not self.network.execute_network():
+                    break
+                signal = self.network.get_output_signal(device_id, output_id)
+                if cycle >= start:
+                    signal_list.append(signal)
+                cycle += 1
+
+                limit = stop
+                for event_cycles in [self.checkpoint_cycles,
+                                     self.switch_cycles]:
+                    position = bisect.bisect_left(event_cycles, cycle)
+                    if position < len(event_cycles):
+                        limit = min(limit, event_cycles[position])
+                skipped = self.network.fast_forward(limit - cycle)
+                signal_list += [signal] * (cycle + skipped - max(cycle, start))
+                cycle += skipped
+        finally:
+            self.devices.load_state(live_state)
+            self.network.steady_state = steady_state
+        return signal_list
@@ -5,11 +5,46 @@ properties.
 
 Classes
 -------
+Timer - stores the simulation time that clock and RC counters count from.
 Device - stores device properties.
 Devices - makes and stores all the devices in the logic network.
 """
 
 import random
+import struct
+
+from signals import SIGNAL_TYPES
+
+SNAPSHOT_MAGIC = b"LSSNAP01"
+SNAPSHOT_HEADER = "<8sII"  # magic, number of devices, number of outputs
+# dtype_memory, switch_state, clock_counter, cycle_counter; -1 for None
+SNAPSHOT_DEVICE = "<bbqq"
+
+
+class Timer:
+
+    """Store the simulation time that clock and RC counters count from.
+
+    The counters of clocks and RC devices are not stored, but derived from
+    the cycle at which they were last zero, so that advancing the time moves
+    every counter on at once. The network advances the time and schedules
+    the clock toggles and RC timeouts, see Network.prepare_calendar.
+
+    Parameters
+    ----------
+    No parameters.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    def __init__(self):
+        """Initialise the time."""
+        self.cycle = 0
+        # Set whenever a counter is set from outside the network, e.g. by a
+        # cold start-up or a state load, so the schedule must be rebuilt
+        self.changed = True
 
 
 class Device:
@@ -19,16 +54,19 @@ class Device:
     Parameters
     ----------
     device_id: device ID.
+    timer: instance of the Timer() class shared by the devices, or None for
+           a timer of its own.
 
     Public methods
     --------------
     No public methods.
     """
 
-    def __init__(self, device_id):
+    def __init__(self, device_id, timer=None):
         """Initialise device properties."""
 
         self.device_id = device_id
+        self.timer = Timer() if timer is None else timer
 
         # inputs dictionary stores
         # {input_id: (connected_output_device_id, connected_output_port_id)}
@@ -39,11 +77,46 @@ class Device:
 
         self.device_kind = None
         self.clock_half_period = None
-        self.clock_counter = None
+        self.rc_cycles = None
         self.switch_state = None
         self.dtype_memory = None
-        self.cycle_counter = 0
-        self.rc_cycles = None
+
+        # Timer cycles at which the clock and RC counters were zero. Devices
+        # other than clocks and RC devices hold fixed counters here instead
+        self.clock_start = None
+        self.cycle_start = 0
+
+    @property
+    def clock_counter(self):
+        """Return the number of cycles since the clock last toggled."""
+        if self.clock_half_period is None or self.clock_start is None:
+            return self.clock_start
+        return self.timer.cycle - self.clock_start
+
+    @clock_counter.setter
+    def clock_counter(self, value):
+        """Set the number of cycles since the clock last toggled."""
+        if self.clock_half_period is None or value is None:
+            self.clock_start = value
+        else:
+            self.clock_start = self.timer.cycle - value
+        self.timer.changed = True
+
+    @property
+    def cycle_counter(self):
+        """Return the number of cycles since the RC device was reset."""
+        if self.rc_cycles is None:
+            return self.cycle_start
+        return self.timer.cycle - self.cycle_start
+
+    @cycle_counter.setter
+    def cycle_counter(self, value):
+        """Set the number of cycles since the RC device was reset."""
+        if self.rc_cycles is None:
+            self.cycle_start = value
+        else:
+            self.cycle_start = self.timer.cycle - value
+        self.timer.changed = True
 
 
 class Devices:
@@ -94,8 +167,21 @@ class Devices:
 
     make_d_type(self, device_id): Makes a D-type device.
 
+    set_seed(self, seed): Seeds the random power-up state of cold start-ups.
+
+    get_random(self, device_id): Returns the random generator of a device for
+                                 the next cold start-up.
+
     cold_startup(self): Simulates cold start-up of D-types and clocks.
 
+    save_state(self): Returns the dynamic state of every device.
+
+    load_state(self, state): Restores a state returned by save_state.
+
+    snapshot(self): Returns the dynamic state of every device as bytes.
+
+    restore(self, data): Restores a state returned by snapshot.
+
     make_device(self, device_id, device_kind, device_property=None): Creates
                        the specified device and returns errors if unsuccessful.
     """
@@ -106,6 +192,12 @@ class Devices:
         self.names = names
 
         self.devices_list = []
+        self.timer = Timer()  # the time clock and RC counters count from
+
+        # Random generator of the cold start-up power-up state. With a seed,
+        # every device has its own stream derived from the seed and its name
+        self.seed = None
+        self.random = random.Random()
 
         self.gate_strings = ["AND", "OR", "NAND", "NOR", "XOR"]
         self.device_strings = ["CLOCK", "SWITCH", "DTYPE", "RC"]
@@ -117,7 +209,7 @@ class Devices:
          self.DEVICE_PRESENT] = self.names.unique_error_codes(6)
 
         self.signal_types = [self.LOW, self.HIGH, self.RISING,
-                             self.FALLING, self.BLANK] = range(5)
+                             self.FALLING, self.BLANK] = SIGNAL_TYPES
         self.gate_types = [self.AND, self.OR, self.NAND, self.NOR,
                            self.XOR] = self.names.lookup(self.gate_strings)
         self.device_types = [self.CLOCK, self.SWITCH,
@@ -152,9 +244,10 @@ class Devices:
 
     def add_device(self, device_id, device_kind):
         """Add the specified device to the network."""
-        new_device = Device(device_id)
+        new_device = Device(device_id, self.timer)
         new_device.device_kind = device_kind
         self.devices_list.append(new_device)
+        self.timer.changed = True
 
 
     def add_input(self, device_id, input_id):
@@ -244,6 +337,7 @@ class Devices:
         self.add_device(device_id, self.RC)
         device = self.get_device(device_id)
         device.rc_cycles = n
+        device.cycle_counter = 0
         self.add_output(device_id, output_id=None, signal=self.HIGH)
 
 
@@ -279,31 +373,127 @@ class Devices:
             self.add_output(device_id, output_id)
         self.cold_startup()  # D-type initialised to a random state
 
+    def set_seed(self, seed):
+        """Seed the random power-up state of cold start-ups.
+
+        With an integer seed every cold start-up gives the same power-up
+        state, whatever the order the devices were made in. With None the
+        power-up state is different every time.
+        """
+        self.seed = seed
+        self.random = random.Random(seed)
+
+    def get_random(self, device_id):
+        """Return the random generator of a device for the next cold start-up.
+
+        With a seed, this is a new generator seeded from the seed and the
+        device name, so the power-up state of a device does not depend on
+        the other devices. Otherwise it is the shared unseeded generator.
+        """
+        if self.seed is None:
+            return self.random
+        return random.Random("{seed}/{name}".format(
+            seed=self.seed, name=self.names.get_name_string(device_id)))
+
     def cold_startup(self):
         """Simulate cold start-up of D-types and clocks.
 
         Set the memory of the D-types to a random state and make the clocks
-        begin from a random point in their cycles.
+        begin from a random point in their cycles. The random state comes
+        from get_random, so it can be reproduced with set_seed.
 
         Also resets RC devices to high output state.
         """
         for device in self.devices_list:
             if device.device_kind == self.D_TYPE:
-                device.dtype_memory = random.choice([self.LOW, self.HIGH])
+                device_random = self.get_random(device.device_id)
+                device.dtype_memory = device_random.choice([self.LOW,
+                                                            self.HIGH])
 
             elif device.device_kind == self.CLOCK:
-                clock_signal = random.choice([self.LOW, self.HIGH])
+                device_random = self.get_random(device.device_id)
+                clock_signal = device_random.choice([self.LOW, self.HIGH])
                 self.add_output(device.device_id, output_id=None,
                                 signal=clock_signal)
                 # Initialise it to a random point in its cycle.
                 device.clock_counter = \
-                    random.randrange(device.clock_half_period)
+                    device_random.randrange(device.clock_half_period)
                 
             elif device.device_kind == self.RC:
                 # Reset to high and set cycle counter to 0
                 self.add_output(device.device_id, output_id=None, signal=self.HIGH)
                 device.cycle_counter = 0
 
+    def save_state(self):
+        """Return the dynamic state of every device.
+
+        The state holds the output signals, D-type memories, clock and RC
+        counters and switch states, in device order. It is only valid for the
+        network it was taken from.
+        """
+        return [(dict(device.outputs), device.dtype_memory,
+                 device.clock_counter, device.cycle_counter,
+                 device.switch_state) for device in self.devices_list]
+
+    def load_state(self, state):
+        """Restore the dynamic state returned by save_state."""
+        for device, device_state in zip(self.devices_list, state):
+            (outputs, device.dtype_memory, device.clock_counter,
+             device.cycle_counter, device.switch_state) = device_state
+            # Update in place, other objects may hold the outputs dictionary
+            device.outputs.update(outputs)
+
+    def snapshot(self):
+        """Return the dynamic state of every device as a compact bytes blob.
+
+        The blob holds the same state as save_state, so that it can be
+        written to a file and restored later in a new session with the same
+        definition file.
+        """
+        output_count = sum(len(device.outputs) for device in self.devices_list)
+        data = bytearray(struct.pack(SNAPSHOT_HEADER, SNAPSHOT_MAGIC,
+                                     len(self.devices_list), output_count))
+        for device in self.devices_list:
+            data += bytes(device.outputs.values())
+            data += struct.pack(SNAPSHOT_DEVICE, *[
+                -1 if value is None else value for value in
+                [device.dtype_memory, device.switch_state,
+                 device.clock_counter, device.cycle_counter]])
+        return bytes(data)
+
+    def restore(self, data):
+        """Restore the dynamic state returned by snapshot.
+
+        Raise ValueError if the blob was not taken from a network with the
+        same devices and outputs.
+        """
+        header_size = struct.calcsize(SNAPSHOT_HEADER)
+        device_size = struct.calcsize(SNAPSHOT_DEVICE)
+        if len(data) < header_size:
+            raise ValueError("not a simulation snapshot")
+        magic, device_count, output_count = struct.unpack_from(
+            SNAPSHOT_HEADER, data)
+        if magic != SNAPSHOT_MAGIC or \
+                device_count != len(self.devices_list) or \
+                output_count != sum(len(device.outputs)
+                                    for device in self.devices_list) or \
+                len(data) != header_size + output_count + \
+                device_count * device_size:
+            raise ValueError("snapshot does not match the network")
+
+        state = []
+        position = header_size
+        for device in self.devices_list:
+            signals = data[position:position + len(device.outputs)]
+            position += len(device.outputs)
+            values = [None if value == -1 else value for value in
+                      struct.unpack_from(SNAPSHOT_DEVICE, data, position)]
+            position += device_size
+            [dtype_memory, switch_state, clock_counter, cycle_counter] = values
+            state.append((dict(zip(device.outputs, signals)), dtype_memory,
+                          clock_counter, cycle_counter, switch_state))
+        self.load_state(state)
+
     def make_device(self, device_id, device_kind, device_property=None):
         """Create the specified device.
 
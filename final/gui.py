@@ -21,11 +21,11 @@ from OpenGL import GL, GLUT
 import matplotlib
 matplotlib.use('WXAgg')
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
 from matplotlib.backends.backend_wxagg import NavigationToolbar2WxAgg as NavigationToolbar2Wx
 from sys import platform
 import os
-import gettext
 
 from names import Names
 from devices import Devices
@@ -36,27 +36,18 @@ from parse import Parser
 from logic_draw import LogicDrawer
 from connect_draw import ConnectDrawer
 from userint import UserInterface 
+from watchpoints import Watchpoints
+from stimulus import Stimulus
+from sim_worker import SimulationWorker
+from sim_process import EngineProcess, CANCELLED, OSCILLATING, WATCH_FIRED
+from trace_archive import TraceReader, save_monitors
+from trace_pyramid import TracePyramid
 from device_canvas_3D import MyGLCanvas3D
 from monitor_canvas_3D import MyGLCanvasMonitor3D
 from canvas import MyGLCanvas
 from textctrl import TextEditor, PromptedTextCtrl
+from i18n import _
 
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
 
 class Gui(wx.Frame):
     """Configure the main window and all the widgets apart from the text box.
@@ -89,7 +80,7 @@ class Gui(wx.Frame):
     on_text_box(self, event)
         Event handler for when the user enters text.
     """
-    def __init__(self, title, path, names, devices, network, monitors):
+    def __init__(self, title, path, names, devices, network, monitors, use_engine=False):
         """Initialise main window, widgets and layout."""
         super().__init__(parent=None, title=title, size=(800, 600))
 
@@ -116,7 +107,14 @@ class Gui(wx.Frame):
         fileMenu.Append(wx.ID_EXIT, _("&Exit"))
         sourceMenu.Append(wx.ID_OPEN, _("&Open"))
         sourceMenu.Append(wx.ID_EDIT, _("&Edit"))
+        sourceMenu.Append(wx.ID_SAVE, _("&Save Trace Archive"))
+        sourceMenu.Append(wx.ID_REVERT, _("Open &Trace Archive"))
+        sourceMenu.Append(wx.ID_FILE, _("Load S&timulus File"))
         commandMenu.Append(wx.ID_HELP_COMMANDS, _("&Commands"))
+        commandMenu.Append(wx.ID_INFO, _("&Statistics"))
+        commandMenu.Append(wx.ID_ADD, _("Save &Branch Point"))
+        commandMenu.Append(wx.ID_BACKWARD, _("&Go to Branch Point"))
+        commandMenu.Append(wx.ID_PROPERTIES, _("Set Random S&eed"))
         view3DMenu.Append(wx.ID_PREFERENCES,_("&Change 3D Signal Max"))
         view3DMenu.Append(wx.ID_APPLY,_("&Change 2D Signal Max"))
 
@@ -135,12 +133,28 @@ class Gui(wx.Frame):
         self.devices = devices
         self.scanner = Scanner(self.path, self.names)
         self.parser = Parser(self.names, self.devices, self.network, self.monitors, self.scanner)
+        self.watchpoints = Watchpoints(self.names, self.devices)
+        self.stimulus = Stimulus(self.names, self.devices)
 
         self.is_zap_monitor = False
         self.is_add_monitor = False
 
         self.cycle_count = 10
         self.cycles_completed = 0
+        self.plot_interval = 1000  # cycles between plot refreshes while running
+        self.worker = None  # SimulationWorker while a simulation is running
+        self.simulating = False
+        # Snapshots of the simulation state to branch runs from, stored as
+        # [(cycle, Network.snapshot())]
+        self.branch_points = []
+        # With use_engine, simulations run in an EngineProcess and the local
+        # network only mirrors the switches and monitors
+        self.use_engine = use_engine
+        self.engine = None
+        self.engine_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_engine_timer, self.engine_timer)
+        if use_engine:
+            self.start_engine()
 
         # Message display widget
         self.message_display = wx.TextCtrl(self, wx.ID_ANY, "", style=wx.TE_MULTILINE | wx.TE_READONLY)
@@ -151,7 +165,7 @@ class Gui(wx.Frame):
 
         # Configure the widgets
         self.text = wx.StaticText(self, wx.ID_ANY, _("Cycles")) 
-        self.spin = wx.SpinCtrl(self, wx.ID_ANY, initial=self.cycle_count, min=1, max=500)
+        self.spin = wx.SpinCtrl(self, wx.ID_ANY, initial=self.cycle_count, min=1, max=10 ** 9)
         self.run_button = wx.Button(self, wx.ID_ANY, _("Run"))
         self.continue_button = wx.Button(self, wx.ID_ANY, _("Continue"))
         self.reset_plot_button = wx.Button(self, wx.ID_ANY, _("Reset Plot"))
@@ -162,15 +176,15 @@ class Gui(wx.Frame):
         self.clear_button = wx.Button(self, wx.ID_ANY, _("Clear terminal")) # button for clearing terminal output
         self.switch_to_3D_button = wx.ToggleButton(self, wx.ID_ANY, _("3D Mode")) # button to switch canvases out
         self.scroll_bar = wx.ScrollBar(self, wx.ID_ANY)
+        self.progress_gauge = wx.Gauge(self, wx.ID_ANY, range=100)
+        self.cancel_button = wx.Button(self, wx.ID_ANY, _("Cancel"))
+        self.cancel_button.Disable()
         self.scroll_bar.SetScrollbar(0, 10, 10, 9)
         
         self.is3D = False
         self.max_3D_view = 50
         self.max_2D_view = 100
-        self.max_total = 2000
         self.scroll_val = 0
-        self.plot_array = []
-        self.name_array = []
 
         # Bind events to widgets
         self.Bind(wx.EVT_MENU, self.on_menu)
@@ -185,6 +199,8 @@ class Gui(wx.Frame):
         self.add_monitor_button.Bind(wx.EVT_TOGGLEBUTTON, self.on_add_button)
         self.switch_to_3D_button.Bind(wx.EVT_TOGGLEBUTTON, self.draw_canvas_to_3D)
         self.scroll_bar.Bind(wx.EVT_SCROLL, self.on_scroll)
+        self.cancel_button.Bind(wx.EVT_BUTTON, self.on_cancel_button)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
 
         # Configure sizers for layout
         main_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -193,11 +209,14 @@ class Gui(wx.Frame):
         button_sizer0 = wx.BoxSizer(wx.HORIZONTAL)
         button_sizer1 = wx.BoxSizer(wx.HORIZONTAL)
         button_sizer2 = wx.BoxSizer(wx.HORIZONTAL)
+        button_sizer3 = wx.BoxSizer(wx.HORIZONTAL)
 
         # Initialise some empty matplotlib figure
         self.configure_matplotlib_canvas()
         self.matplotlib_canvas = FigureCanvas(self, -1, self.figure)
+        self.matplotlib_canvas.mpl_connect("resize_event", self.on_plot_resize)
         self.legend = None
+        self.clear_plot()
 
         # Arrange sizers, all stemming from main sizer
         canvas_plot_sizer.Add(self.canvas, 40, wx.EXPAND | wx.ALL, 1)
@@ -211,6 +230,7 @@ class Gui(wx.Frame):
         side_sizer.Add(self.spin, 1, wx.ALL, 5)
         side_sizer.Add(button_sizer1, 1, wx.EXPAND | wx.ALL, 5)
         side_sizer.Add(button_sizer2, 1, wx.EXPAND | wx.ALL, 5)
+        side_sizer.Add(button_sizer3, 1, wx.EXPAND | wx.ALL, 5)
         side_sizer.Add(button_sizer0, 1, wx.EXPAND | wx.ALL, 5)
         side_sizer.Add(self.text_box, 15, wx.EXPAND | wx.ALL, 5) # expanding text box
         side_sizer.Add(self.clear_button, 1, wx.EXPAND | wx.ALL, 5)
@@ -221,6 +241,8 @@ class Gui(wx.Frame):
         button_sizer0.Add(self.add_monitor_button, 1, wx.ALL, 1)
         button_sizer2.Add(self.continue_button, 1, wx.ALL, 1)
         button_sizer2.Add(self.run_button, 1, wx.ALL, 1)
+        button_sizer3.Add(self.progress_gauge, 2, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 1)
+        button_sizer3.Add(self.cancel_button, 1, wx.ALL, 1)
         button_sizer1.Add(self.reset_view_button, 1, wx.ALL, 1)
         button_sizer1.Add(self.reset_plot_button, 1, wx.ALL, 1)
 
@@ -245,7 +267,7 @@ class Gui(wx.Frame):
             self.matplotlib_canvas.Destroy()
 
             self.canvas = MyGLCanvas3D(self, self.devices, self.monitors)
-            self.matplotlib_canvas = MyGLCanvasMonitor3D(self, self.devices, self.monitors)
+            self.matplotlib_canvas = MyGLCanvasMonitor3D(self, self.devices, self.trace_source())
 
             main_sizer = self.GetSizer()
             canvas_plot_sizer = main_sizer.GetChildren()[0].GetSizer()
@@ -275,6 +297,8 @@ class Gui(wx.Frame):
 
             self.canvas = MyGLCanvas(self, self.devices, self.monitors, self.message_display)
             self.matplotlib_canvas = FigureCanvas(self, -1, self.figure)
+            self.matplotlib_canvas.mpl_connect("resize_event", self.on_plot_resize)
+            self.plot_background = None
 
             main_sizer = self.GetSizer()
             canvas_plot_sizer = main_sizer.GetChildren()[0].GetSizer()
@@ -295,8 +319,9 @@ class Gui(wx.Frame):
         
             max_view = self.max_2D_view
             self.scroll_val = self.scroll_bar.GetThumbPosition()
+            self.update_plot_lines(self.scroll_val, self.scroll_val + max_view + 1)
             self.axes.set_xlim(self.scroll_val, self.scroll_val + max_view)
-            self.matplotlib_canvas.draw()
+            self.draw_plot()
         else: 
             self.scroll_val = self.scroll_bar.GetThumbPosition()
             self.matplotlib_canvas.scroll_val = self.scroll_val
@@ -326,38 +351,224 @@ class Gui(wx.Frame):
         self.axes.set_title(_("Monitor Plots"))
         self.axes.tick_params(axis = 'both', bottom = True, left = False, right = False, labelright = False, labelleft = False, labelbottom = True)
 
-    def execute_circuit(self, cycles): 
-        """Simulates the circuit for N cycles"""
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                wx.MessageBox("Error! Network oscillating.")
-                return False
+    def execute_circuit(self, cycles, cold_start=False): 
+        """Starts simulating the circuit for N cycles on a worker thread,
+        or in the engine process if there is one
+
+        Progress, plot refreshes and the end of the run are reported back to
+        the main thread with wx.CallAfter, or polled with a timer.
+        """
+        self.run_start_cycle = self.cycles_completed
+        self.run_cycles = cycles
+        if self.engine is not None:
+            self.sync_engine()
+            self.engine.start_run(cycles, cold_start)
+            self.set_running(True)
+            self.engine_timer.Start(50)
+            return True
+
+        self.worker = SimulationWorker(
+            self.network, self.monitors, self.watchpoints, cycles, self.cycles_completed,
+            progress_callback=lambda *args: wx.CallAfter(self.on_simulation_progress, *args),
+            done_callback=lambda *args: wx.CallAfter(self.on_simulation_done, *args),
+            chunk_cycles=self.plot_interval, stimulus=self.stimulus)
+        self.set_running(True)
+        self.worker.start()
         return True
+
+    def start_engine(self):
+        """Starts a new engine process for the current definition file"""
+        self.close_engine()
+        try:
+            # Room for every monitor of the definition file, or of -a, and
+            # for some added later
+            self.engine = EngineProcess(self.path, self.names, self.devices,
+                                        slot_count=len(self.monitors.monitors_dictionary) + 16,
+                                        chunk_cycles=self.plot_interval)
+        except (OSError, ValueError) as ex:
+            wx.LogError(_("Cannot start the engine process: {exception}").format(exception=ex))
+
+    def close_engine(self):
+        """Stops the engine process, if there is one"""
+        if self.engine is not None:
+            self.engine_timer.Stop()
+            self.engine.close()
+            self.engine = None
+
+    def sync_engine(self):
+        """Copies the switch states, monitors, seed, stimulus and watch
+        expressions of the local network to the engine process before a run"""
+        self.engine.set_seed(self.devices.seed)
+        for switch_id in self.devices.find_devices(self.devices.SWITCH):
+            self.engine.set_switch(switch_id, self.devices.get_device(switch_id).switch_state)
+        for device_id, output_id in list(self.engine.monitors_dictionary):
+            if (device_id, output_id) not in self.monitors.monitors_dictionary:
+                self.engine.remove_monitor(device_id, output_id)
+        for device_id, output_id in self.monitors.monitors_dictionary:
+            if (device_id, output_id) not in self.engine.monitors_dictionary and \
+                    not self.engine.make_monitor(device_id, output_id):
+                wx.LogError(_("No free trace slot in the engine process for {signal}").format(
+                    signal=self.devices.get_signal_name(device_id, output_id)))
+        self.engine.set_stimulus(self.stimulus)
+        self.engine.set_watches(self.watchpoints.expressions)
+
+    def trace_source(self):
+        """Returns the object holding the monitor traces to plot"""
+        if self.engine is not None:
+            return self.engine
+        return self.monitors
+
+    def on_engine_timer(self, event):
+        """Plots the traces published by the engine process so far"""
+        if self.engine is None:
+            self.engine_timer.Stop()
+            return
+        status = self.engine.poll()
+        self.cycles_completed = self.engine.get_cycles()
+        self.progress_gauge.SetValue(int(100 * (self.cycles_completed - self.run_start_cycle)
+                                         / max(self.run_cycles, 1)))
+        if status is not None:
+            self.engine_timer.Stop()
+            self.set_running(False)
+            if self.cycles_completed - self.run_start_cycle > self.engine.capacity:
+                # Cycles that left the shared memory during the run were
+                # plotted blank, so rebuild the plot from the full traces
+                self.plot_monitors = None
+        if not self.is3D:
+            try:
+                self.monitor_plot()
+            except Exception:
+                wx.LogError(_("Run failed - cannot plot monitors"))
+        else:
+            self.matplotlib_canvas.initialise_monitor_plots()
+            self.matplotlib_canvas.Refresh()
+        if status is None:
+            return
+
+        self.update_scroll()
+        if status == OSCILLATING:
+            wx.MessageBox("Error! Network oscillating.")
+        elif status == WATCH_FIRED:
+            wx.MessageBox(_("Watch expression true at cycle {cycle}: "
+                            "{expression}").format(
+                                cycle=self.cycles_completed,
+                                expression=", ".join(self.engine.fired)))
+        elif status == CANCELLED:
+            self.canvas.render(_("Simulation cancelled at cycle {cycle}.").format(
+                cycle=self.cycles_completed))
+
+    def set_running(self, running):
+        """Enables the cancel button and disables the controls that change
+        the circuit while a simulation is running"""
+        for widget in [self.run_button, self.continue_button, self.reset_plot_button,
+                       self.zap_monitor_button, self.add_monitor_button,
+                       self.switch_to_3D_button]:
+            widget.Enable(not running)
+        if self.is3D:
+            self.zap_monitor_button.Disable()
+            self.add_monitor_button.Disable()
+        self.cancel_button.Enable(running)
+        self.progress_gauge.SetValue(0)
+        self.simulating = running
+
+    def is_running(self):
+        """Returns True, and shows an error, if a simulation is running"""
+        if not self.simulating:
+            return False
+        wx.LogError(_("Simulation running - wait for it or cancel it first"))
+        return True
+
+    def on_simulation_progress(self, cycles_completed):
+        """Updates the progress bar and hands completed trace chunks to the plot"""
+        worker = self.worker
+        if worker is None:
+            return
+        self.progress_gauge.SetValue(int(100 * (cycles_completed - self.run_start_cycle)
+                                         / max(worker.cycles, 1)))
+        self.refresh_plots(worker)
+
+    def refresh_plots(self, worker):
+        """Plots the traces up to the latest chunk completed by the worker"""
+        chunk_end = None
+        while worker.chunks:
+            chunk_end = worker.chunks.popleft()
+        if chunk_end is None:
+            return
+        self.cycles_completed = chunk_end
+        if not self.is3D:
+            try:
+                self.monitor_plot()
+            except Exception:
+                wx.LogError(_("Run failed - cannot plot monitors"))
+        else:
+            self.matplotlib_canvas.initialise_monitor_plots()
+            self.matplotlib_canvas.Refresh()
+
+    def on_simulation_done(self, status, fired):
+        """Plots the final traces and reports why the simulation stopped"""
+        worker = self.worker
+        if worker is None:
+            return
+        worker.join()
+        self.refresh_plots(worker)
+        self.cycles_completed = worker.cycles_completed
+        self.worker = None
+        self.set_running(False)
+        self.update_scroll()
+
+        if status == worker.OSCILLATING:
+            wx.MessageBox("Error! Network oscillating.")
+        elif status == worker.WATCH_FIRED:
+            wx.MessageBox(_("Watch expression true at cycle {cycle}: "
+                            "{expression}").format(
+                                cycle=self.cycles_completed,
+                                expression=", ".join(fired)))
+        elif status == worker.CANCELLED:
+            self.canvas.render(_("Simulation cancelled at cycle {cycle}.").format(
+                cycle=self.cycles_completed))
+        elif status == worker.FAILED:
+            wx.LogError(_("Simulation failed at cycle {cycle}: {exception}").format(
+                cycle=self.cycles_completed, exception=worker.error))
+
+    def on_cancel_button(self, event):
+        """Handle the event when the user clicks the cancel button."""
+        if self.worker is not None:
+            self.worker.cancel()
+        if self.engine is not None:
+            self.engine.cancel()
+
+    def on_close(self, event):
+        """Stops any running simulation before the window closes"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.join()
+            self.worker = None
+        self.close_engine()
+        event.Skip()
     
     def run_circuit(self, cycles): 
+        if self.is_running():
+            return False
         self.cycles_completed = 0
         self.monitors.reset_monitors()
         self.devices.cold_startup()
+        self.watchpoints.reset()
+        self.stimulus.reset()
+        self.branch_points = []  # they belong to the previous run
+        self.plot_monitors = None  # the traces restart, so rebuild the plot
 
         self.update_scroll()
 
-        if self.execute_circuit(cycles): 
-            self.cycles_completed += cycles
-            return True
-        return False 
+        return self.execute_circuit(cycles, cold_start=True)
     
     def continue_circuit(self, cycles):
         """Continues the simulation for N cycles"""
+        if self.is_running():
+            return False
         if self.cycles_completed == 0: 
             wx.LogError(_("Nothing to continue - run the simulation first"))
             return False 
-        elif self.execute_circuit(cycles): 
-            self.cycles_completed += cycles
-            self.update_scroll()
-            return True 
-        return False
+        return self.execute_circuit(cycles)
 
     def on_menu(self, event):
         """Handle the event when the user selects a menu item."""
@@ -391,9 +602,14 @@ class Gui(wx.Frame):
                         "\ns X N - set switch X to N (0 or 1)"
                         "\nm X - set a monitor on signal X"
                         "\nz X - zap the monitor on signal X"
+                        "\nw E - stop runs when expression E becomes true"
+                        "\nw - clear all watch expressions"
+                        "\nstats - show signal activity statistics"
                         "\nh - print a list of available commands on the terminal"
                         "\nq - quit the simulation"))
         if Id == wx.ID_OPEN:
+            if self.is_running():
+                return
             with wx.FileDialog(self,  _("Open New Source File"),
                             wildcard="TXT files (*.txt)|*.txt",
                             style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
@@ -415,6 +631,7 @@ class Gui(wx.Frame):
                     
                     # Parse the new network file
                     if parser.parse_network(): 
+                        devices.set_seed(self.devices.seed)  # keep the seed for the new file
 
                         self.names = names
                         self.devices = devices
@@ -424,11 +641,16 @@ class Gui(wx.Frame):
                         # Reinitialize the scanner and parser with the new file
                         self.scanner = scanner
                         self.parser = parser
+                        self.watchpoints = Watchpoints(names, devices)
+                        self.stimulus = Stimulus(names, devices)
+                        self.branch_points = []
                 
                         # Reinitialize the canvas with the new devices and monitors
                         self.on_reset_plot_button(None)
                         self.draw_canvas_to_3D(None)
                         self.path = pathname  
+                        if self.use_engine:
+                            self.start_engine()
                    
                         # Print the name of the file opened to the terminal (text box) window
                         wx.MessageBox(_(" Opened file:"), pathname)
@@ -441,6 +663,72 @@ class Gui(wx.Frame):
 
                 except Exception as ex:
                     wx.LogError(_("Cannot open file: {exception}").format(exception=ex))
+        if Id == wx.ID_SAVE:
+            with wx.FileDialog(self, _("Save Trace Archive"),
+                            wildcard="Trace archives (*.trace)|*.trace",
+                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as file_dialog:
+                if file_dialog.ShowModal() == wx.ID_CANCEL:
+                    return
+                try:
+                    save_monitors(file_dialog.GetPath(), self.trace_source())
+                except OSError as ex:
+                    wx.LogError(_("Cannot save file: {exception}").format(exception=ex))
+        if Id == wx.ID_REVERT:
+            if self.is3D:
+                wx.LogError(_("Switch to 2D mode to plot a trace archive"))
+                return
+            with wx.FileDialog(self, _("Open Trace Archive"),
+                            wildcard="Trace archives (*.trace)|*.trace",
+                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
+                if file_dialog.ShowModal() == wx.ID_CANCEL:
+                    return
+                try:
+                    reader = TraceReader(file_dialog.GetPath())
+                    # Plot the archived traces only, the live circuit is kept
+                    self.monitor_plot(reader.load_monitors(), reader.cycles)
+                except (OSError, ValueError) as ex:
+                    wx.LogError(_("Cannot open file: {exception}").format(exception=ex))
+        if Id == wx.ID_FILE:
+            if self.is_running():
+                return
+            with wx.FileDialog(self, _("Load Stimulus File"),
+                            wildcard="TXT files (*.txt)|*.txt",
+                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
+                if file_dialog.ShowModal() == wx.ID_CANCEL:
+                    return
+                # Switch events are applied from the next run or continue
+                self.stimulus.clear()
+                try:
+                    stimulus_error = self.stimulus.load(file_dialog.GetPath())
+                except OSError as ex:
+                    wx.LogError(_("Cannot open file: {exception}").format(exception=ex))
+                    return
+                if stimulus_error != self.stimulus.NO_ERROR:
+                    wx.LogError(_("Invalid stimulus on line {line}").format(
+                        line=self.stimulus.error_line))
+                    self.stimulus.clear()
+                else:
+                    self.stimulus.skip(self.cycles_completed)
+        if Id == wx.ID_INFO:
+            self.show_statistics()
+        if Id == wx.ID_PROPERTIES:
+            # A seed repeats the same power-up state in every run, an empty
+            # value gives a new one every time
+            seed = "" if self.devices.seed is None else str(self.devices.seed)
+            with wx.TextEntryDialog(self, _("Random seed of the power-up state (empty for none)"),
+                                    value=seed) as text_dialog:
+                if text_dialog.ShowModal() == wx.ID_OK:
+                    value = text_dialog.GetValue().strip()
+                    if not value:
+                        self.devices.set_seed(None)
+                    elif value.isdigit():
+                        self.devices.set_seed(int(value))
+                    else:
+                        wx.LogError(_("The seed must be a whole number"))
+        if Id == wx.ID_ADD:
+            self.save_branch_point()
+        if Id == wx.ID_BACKWARD:
+            self.go_to_branch_point()
         if Id == wx.ID_PREFERENCES: 
             with wx.TextEntryDialog(self, _("Change Value of 3D max view"), value = str(self.max_3D_view)) as text_dialog: 
                 if text_dialog.ShowModal() == wx.ID_OK: 
@@ -480,47 +768,61 @@ class Gui(wx.Frame):
 
         text = _("Run button pressed, {cycle_count} cycles.").format(cycle_count=self.cycle_count)
         
-        if not self.is3D: 
-            if self.cycles_completed > self.max_total: 
-                wx.LogError(_("Max cycle count exceeded! Refresh the plot or edit the source data"))
-                return 
-            self.run_circuit(self.cycle_count)
+        # The plots are refreshed by the simulation worker callbacks
+        if self.run_circuit(self.cycle_count) and not self.is3D: 
             self.canvas.render(text)
 
-            try: 
-                self.monitor_plot()
-            except Exception: 
-                self.on_reset_plot_button(None)
-                wx.LogError(_("Run failed - cannot plot monitors"))
-        
-        else: 
-            if self.cycles_completed > self.max_total: 
-                wx.LogError(_("Max cycle count exceeded! Refresh the plot or edit the source data"))
-                return 
-            self.run_circuit(self.cycle_count)
+    
+    def save_branch_point(self):
+        """Stores a snapshot of the simulation state at the current cycle"""
+        if self.is_running():
+            return
+        if self.engine is not None:
+            wx.LogError(_("Branch points are not available in the engine process"))
+            return
+        self.branch_points = [(cycle, data) for cycle, data in self.branch_points
+                              if cycle != self.cycles_completed]
+        self.branch_points.append((self.cycles_completed, self.network.snapshot()))
+        self.branch_points.sort(key=lambda branch_point: branch_point[0])
+        self.canvas.render(_("Saved branch point at cycle {cycle}.").format(
+            cycle=self.cycles_completed))
+
+    def go_to_branch_point(self):
+        """Restores a saved snapshot, so that the next continue branches off
+        from its cycle instead of re-simulating from cycle 0"""
+        if self.is_running() or not self.branch_points:
+            return
+        choices = [_("Cycle {cycle}").format(cycle=cycle) for cycle, data in self.branch_points]
+        with wx.SingleChoiceDialog(self, _("Go back to the state at"),
+                                   _("Go to Branch Point"), choices) as choice_dialog:
+            if choice_dialog.ShowModal() != wx.ID_OK:
+                return
+            cycle, data = self.branch_points[choice_dialog.GetSelection()]
+        self.network.restore(data)
+        self.monitors.rewind(cycle)
+        self.watchpoints.reset()
+        self.stimulus.reset()
+        self.stimulus.skip(cycle)
+        self.cycles_completed = cycle
+        self.plot_monitors = None  # the traces were cut, so rebuild the plot
+        self.update_scroll()
+        if not self.is3D:
+            self.monitor_plot()
+        else:
             self.matplotlib_canvas.initialise_monitor_plots()
             self.matplotlib_canvas.Refresh()
+        self.canvas.render(_("Went back to cycle {cycle}.").format(cycle=cycle))
 
-    
     def on_reset_plot_button(self, event): 
         """Clears the matplotlib plot"""
+        if self.is_running():
+            return
         
         self.monitors.reset_monitors()
-        self.plot_array = []
-        self.name_array = []
 
         if not self.is3D:             
-            self.axes.clear()
-            self.axes.set_title(_("Monitor Plots"))
-            
-            try: 
-                self.legend.remove()
-            except: 
-                pass
-
+            self.clear_plot()
             self.matplotlib_canvas.draw()
-            self.plot_array = []
-            self.name_array = []
 
             self.cycles_completed = 0
             self.update_scroll()
@@ -529,16 +831,7 @@ class Gui(wx.Frame):
             self.canvas.render(text)
         
         else: 
-            self.axes.clear()
-            self.axes.set_title(_("Monitor Plots"))
-            
-            try: 
-                self.legend.remove()
-            except: 
-                pass
-
-            self.plot_array = []
-            self.name_array = []
+            self.clear_plot()
             self.cycles_completed = 0
             self.update_scroll()
             self.matplotlib_canvas.initialise_monitor_plots()
@@ -565,33 +858,15 @@ class Gui(wx.Frame):
         """Handle continue button event"""
         text = _("Continue button pressed, {cycle_count} cycles.").format(cycle_count=self.cycle_count)
 
-        if self.cycles_completed > self.max_total: 
-            wx.LogError(_("Max cycle count exceeded! Refresh the plot or edit the source data"))
-            return 
-        
-        if not self.is3D: 
-            self.continue_circuit(self.cycle_count)
+        # The plots are refreshed by the simulation worker callbacks
+        if self.continue_circuit(self.cycle_count) and not self.is3D: 
             self.canvas.render(text)
-
-            if self.cycles_completed == 0: 
-                wx.LogError(_("Nothing to Continue - try running the simulation first"))
-                return
-            try: 
-                self.monitor_plot()
-            except Exception: 
-                self.on_reset_plot_button(None)
-                wx.LogError(_("Run failed - cannot plot monitors"))
-        else: 
-            if self.cycles_completed == 0: 
-                wx.LogError(_("Nothing to Continue - try running the simulation first"))
-                return
-            self.continue_circuit(self.cycle_count)
-            self.matplotlib_canvas.initialise_monitor_plots()
-            self.matplotlib_canvas.Refresh()
     
     def change_switch_state(self, switch_name, switch_id, value): 
         
         bool_switch = False
+        if self.is_running():
+            return bool_switch
         if switch_id is None: 
             # literally the first time I've ever used query from names -_-
             switch_id = self.names.query(switch_name)
@@ -611,6 +886,8 @@ class Gui(wx.Frame):
     def add_monitor_with_name(self, m_string: str):
         
         bool_add_mon = None
+        if self.is_running():
+            return bool_add_mon
         string_array = m_string.split('.')
         
         dev_name = string_array[0]
@@ -643,6 +920,8 @@ class Gui(wx.Frame):
         return bool_add_mon
     
     def del_monitor_with_name(self, m_string: str):
+        if self.is_running():
+            return False
         string_array = m_string.split('.')
 
         dev_name = string_array[0]
@@ -662,58 +941,150 @@ class Gui(wx.Frame):
         
         return bool_del_mon
 
-    def monitor_plot(self):
-        
+    def clear_plot(self):
+        """Remove all monitor traces from the 2D plot."""
         self.axes.clear()
         self.axes.set_title(_("Monitor Plots"))
-        try: self.legend.remove()
-        except: pass
-        self.matplotlib_canvas.draw()
-        
-        self.plot_array = []
-        self.name_array = []
-
-        for device_id, output_id in self.monitors.monitors_dictionary: 
-
-            one_d_signal = []
-            monitor_name = self.devices.get_signal_name(device_id, output_id)
-            signal_list = self.monitors.monitors_dictionary[(device_id, output_id)]
-            for signal in signal_list: 
-                if signal == self.devices.HIGH: 
-                    one_d_signal.append(1)
-                if signal == self.devices.LOW: 
-                    one_d_signal.append(0)
-                if signal == self.devices.RISING: 
-                    one_d_signal.append(0.5)
-                if signal == self.devices.FALLING: 
-                    one_d_signal.append(0.5)
-                if signal == self.devices.BLANK: 
-                    one_d_signal.append(np.nan)
-            
-            self.plot_array.append(one_d_signal)
-            self.name_array.append(monitor_name)
-        
-        for i, int_signal in enumerate(self.plot_array): 
-
-            name = self.name_array[i]
-            tick_array = list(np.linspace(0, self.cycles_completed, self.cycles_completed))
-            int_signal = np.array(int_signal) + 2*i
-
-            if len(int_signal) < self.cycles_completed:
-                temp_signal = np.empty(self.cycles_completed)
-                temp_signal[:] = np.nan
-                temp_signal[self.cycles_completed - len(int_signal):] = int_signal
-                int_signal = temp_signal
-            
-            zero_signal = np.zeros_like(int_signal) + 2*i
-            sig_plot = self.axes.plot(tick_array, int_signal, label = name)
-            sig_base = self.axes.plot(tick_array, zero_signal, color = 'black', linestyle = "dashed") 
-        
-        self.axes.set_ylim(0, 2*i + 2)
-        self.axes.set_xlim(max(self.cycles_completed - self.max_2D_view, 0), self.cycles_completed - 1)
-        self.legend = self.figure.legend(fontsize="8", loc ="upper left")
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
 
-        self.matplotlib_canvas.draw()
+        self.plot_array = []  # one TracePyramid per monitor
+        self.name_array = []
+        self.plot_lines = []  # one persistent Line2D per monitor
+        self.plot_baselines = None  # LineCollection of the dashed baselines
+        self.plot_monitors = None  # monitors the artists were built for
+        self.plot_keys = []
+        self.plot_cycles = 0  # cycles already converted and plotted
+        self.plot_background = None
+
+    def monitor_plot(self, monitors=None, cycles=None):
+        """Plot the traces of the live monitors, or of the given monitors.
+
+        The line artists are kept between calls, so after a continue only the
+        new cycles of each trace are added to its TracePyramid. The lines are
+        then set to the min/max summary of the visible cycles, at a few points
+        per pixel. The artists are rebuilt when the monitors change or the run
+        restarts.
+        """
+        if monitors is None:
+            monitors = self.trace_source()
+            cycles = self.cycles_completed
+
+        keys = list(monitors.monitors_dictionary)
+        if monitors is not self.plot_monitors or keys != self.plot_keys or \
+                cycles < self.plot_cycles:
+            self.clear_plot()
+            self.plot_monitors = monitors
+            self.plot_keys = keys
+            for device_id, output_id in keys:
+                name = monitors.devices.get_signal_name(device_id, output_id)
+                line, = self.axes.plot([], [], label=name)
+                self.plot_lines.append(line)
+                self.plot_array.append(TracePyramid(monitors.devices))
+                self.name_array.append(name)
+            self.plot_baselines = LineCollection([], colors="black", linestyles="dashed")
+            self.axes.add_collection(self.plot_baselines)
+            if keys:
+                self.axes.set_ylim(0, 2*len(keys))
+                self.legend = self.figure.legend(fontsize="8", loc="upper left")
+
+        for i, (device_id, output_id) in enumerate(keys):
+            # Summarise only the cycles that are not plotted yet
+            pyramid = self.plot_array[i]
+            # Never replay while the worker thread is simulating the network
+            pyramid.extend(monitors.get_signal_trace(device_id, output_id, len(pyramid), cycles,
+                                                     replay=not self.simulating))
+
+        self.plot_baselines.set_segments([[(0, 2*i), (max(cycles - 1, 0), 2*i)]
+                                          for i in range(len(keys))])
+        self.plot_cycles = cycles
+        start = max(cycles - self.max_2D_view, 0)
+        self.update_plot_lines(start, cycles)
+        if cycles > 1:
+            self.axes.set_xlim(start, cycles - 1)
+        self.draw_plot()
+
+    def update_plot_lines(self, start, stop):
+        """Set every plotted line to the summary of cycles start to stop - 1."""
+        max_buckets = max(self.matplotlib_canvas.GetClientSize().width, 100)
+        for i, pyramid in enumerate(self.plot_array):
+            # Traces shorter than the run are aligned with the last cycle
+            offset = self.plot_cycles - len(pyramid)
+            x_list, y_list = pyramid.get_points(start - offset, stop - offset, max_buckets)
+            self.plot_lines[i].set_data(np.array(x_list) + offset, np.array(y_list) + 2*i)
+
+    def draw_plot(self):
+        """Redraw the 2D plot, blitting the axes over a cached background.
+
+        Only the axes and the legend are redrawn; the rest of the figure is
+        restored from a copy taken on the first redraw after a rebuild or a
+        resize.
+        """
+        canvas = self.matplotlib_canvas
+        if self.plot_background is None:
+            # Draw the figure without the axes once to cache the background
+            self.axes.set_visible(False)
+            if self.legend is not None:
+                self.legend.set_visible(False)
+            canvas.draw()
+            self.plot_background = canvas.copy_from_bbox(self.figure.bbox)
+            self.axes.set_visible(True)
+            if self.legend is not None:
+                self.legend.set_visible(True)
+
+        canvas.restore_region(self.plot_background)
+        self.figure.draw_artist(self.axes)
+        if self.legend is not None:
+            self.figure.draw_artist(self.legend)
+        canvas.blit(self.figure.bbox)
+
+    def on_plot_resize(self, event):
+        """Forget the cached plot background when the canvas is resized."""
+        self.plot_background = None
+
+    def show_statistics(self):
+        """Show the activity statistics of every output in a table.
+
+        The first request starts the collector, which then counts from the
+        next simulated cycle.
+        """
+        if self.is_running():
+            return
+        if self.engine is not None:
+            # The engine process does not send its activity statistics back
+            wx.LogError(_("Activity statistics are not available in the engine process"))
+            return
+        if self.monitors.activity is None:
+            self.monitors.enable_activity()
+            wx.MessageBox(_("Collecting activity statistics from the next cycle."))
+            return
+
+        dialog = wx.Dialog(self, title=_("Signal Statistics"), size=(600, 400),
+                           style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        table = wx.ListCtrl(dialog, style=wx.LC_REPORT)
+        headings = [_("Signal"), _("Toggles"), _("Duty cycle"), _("Longest stable run"),
+                    _("First change"), _("Last change")]
+        for column, heading in enumerate(headings):
+            table.InsertColumn(column, heading)
+
+        for name, toggles, duty_cycle, longest_run, first, last in self.monitors.activity.get_statistics():
+            row = table.InsertItem(table.GetItemCount(), name)
+            table.SetItem(row, 1, str(toggles))
+            table.SetItem(row, 2, "{:.1%}".format(duty_cycle))
+            table.SetItem(row, 3, str(longest_run))
+            table.SetItem(row, 4, "-" if first is None else str(first))
+            table.SetItem(row, 5, "-" if last is None else str(last))
+        for column in range(len(headings)):
+            table.SetColumnWidth(column, wx.LIST_AUTOSIZE_USEHEADER)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(table, 1, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(wx.StaticText(dialog, wx.ID_ANY, _("Cycles: {cycles}").format(
+            cycles=self.monitors.activity.cycles)), 0, wx.ALL, 5)
+        dialog.SetSizer(sizer)
+        dialog.ShowModal()
+        dialog.Destroy()
 
     def on_clear_button(self, event):
         """Handle the event when the user clicks the clear button."""
@@ -740,7 +1111,7 @@ class Gui(wx.Frame):
             self.matplotlib_canvas.Destroy()
 
             self.canvas = MyGLCanvas3D(self, self.devices, self.monitors)
-            self.matplotlib_canvas = MyGLCanvasMonitor3D(self, self.devices, self.monitors)
+            self.matplotlib_canvas = MyGLCanvasMonitor3D(self, self.devices, self.trace_source())
 
             main_sizer = self.GetSizer()
             canvas_plot_sizer = main_sizer.GetChildren()[0].GetSizer()
@@ -796,12 +1167,8 @@ class Gui(wx.Frame):
                 if N < 1: 
                     wx.LogError(_("Must run for positive number of cycles"))
                     return 
-                self.run_circuit(N)
-                try: 
-                    self.on_run_button(None)
-                except Exception: 
-                    self.on_reset_plot_button(None)
-                    wx.LogError(_("Run failed - cannot plot monitors"))
+                if not self.run_circuit(N):
+                    return
                 
                 if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
                     self.text_box.AppendText("\n")
@@ -821,12 +1188,6 @@ class Gui(wx.Frame):
                 bool_cont = self.continue_circuit(N)
                 # If True (continuing circuit doesn't give error)
                 if bool_cont:
-                    try: 
-                        self.on_continue_button(None)
-                    except Exception: 
-                        self.on_reset_plot_button(None)
-                        wx.LogError(_("Run failed - cannot plot monitors"))
-
                     if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
                         self.text_box.AppendText("\n")
                     self.text_box.AppendText(_("Continuing simulation for {cycles} cycles.\n").format(cycles=N))
@@ -892,6 +1253,33 @@ class Gui(wx.Frame):
                 if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
                     self.text_box.AppendText("\n")
                 self.text_box.AppendText(_("Monitor zap failed for signal {signal}.\n").format(signal=signal))
+        elif text == 'stats':
+            # Show activity statistics, starting the collector on first use
+            if self.is_running():
+                return
+            if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
+                self.text_box.AppendText("\n")
+            self.text_box.AppendText(_("Showing signal statistics.\n"))
+            self.show_statistics()
+        elif text.startswith('w ') or text == 'w':
+            # Add a watch expression, or clear them all. The worker checks
+            # them every cycle, so they cannot change during a run
+            if self.is_running():
+                return
+            expression = text[1:].strip()
+            if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
+                self.text_box.AppendText("\n")
+            if not expression:
+                self.watchpoints.remove_all()
+                self.text_box.AppendText(_("Cleared all watch expressions.\n"))
+            else:
+                watch_error = self.watchpoints.add_watch(expression)
+                if watch_error == self.watchpoints.NO_ERROR:
+                    self.text_box.AppendText(_("Watching {expression}.\n").format(expression=expression))
+                elif watch_error == self.watchpoints.UNKNOWN_SIGNAL:
+                    self.text_box.AppendText(_("Unknown signal in watch expression {expression}.\n").format(expression=expression))
+                else:
+                    self.text_box.AppendText(_("Invalid watch expression {expression}.\n").format(expression=expression))
         elif text == 'h' or text == 'help':
             # Print a list of available commands to console
             if platform == 'linux' or platform == 'linux2' or platform == 'darwin':
@@ -903,6 +1291,9 @@ class Gui(wx.Frame):
                 "s X N     - set switch X to N (0 or 1)\n"
                 "m X       - add a monitor on signal X\n"
                 "z X       - zap the monitor on signal X\n"
+                "w E       - stop runs when expression E becomes true\n"
+                "w         - clear all watch expressions\n"
+                "stats     - show signal activity statistics\n"
                 "h         - print a list of available commands\n"
                 "q         - quit the program\n"
             ))
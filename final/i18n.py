@@ -0,0 +1,42 @@
+"""Provide the shared message catalog of the Logic Simulator.
+
+Every module translates its messages with the function _ from this module.
+The catalog for the system language is loaded the first time a message is
+translated, and is then shared by all modules.
+
+Functions
+---------
+get_locale - returns the locale used for messages.
+get_translation - returns the shared gettext translation.
+_ - returns the translation of a message.
+"""
+
+import gettext
+import os
+
+translation = None  # loaded by get_translation on first use
+
+
+def get_locale():
+    """Return the locale used for messages, based on the LANG variable."""
+    if os.getenv("LANG") == "el_GR.UTF-8":
+        return "el_GR.utf8"
+    return "en_GB.utf8"
+
+
+def get_translation():
+    """Return the shared gettext translation, loading it on first use."""
+    global translation
+    if translation is None:
+        translation = gettext.translation(
+            "logsim",
+            localedir=os.path.join(os.path.dirname(__file__), 'locales'),
+            languages=[get_locale()],
+            fallback=True
+        )
+    return translation
+
+
+def _(message):
+    """Return the translation of message in the system language."""
+    return get_translation().gettext(message)
@@ -9,9 +9,6 @@ import getopt
 import sys
 import os
 
-import wx
-import gettext
-
 from names import Names
 from devices import Devices
 from network import Network
@@ -19,27 +16,8 @@ from monitors import Monitors
 from scanner import Scanner
 from parse import Parser
 from userint import UserInterface
-from gui import Gui
-
-# Determine the system language and set locale accordingly
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-    print("Greek system language detected")
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    print("Your system language is English.")
-    locale = "en_GB.utf8"
-else:
-    print("Attention - your system language is neither English nor Greek. Logsim will run in English.")
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
+from batch import run_batch, EXIT_ERROR
+from i18n import _, get_locale
 
 def main(arg_list):
     """
@@ -48,24 +26,117 @@ def main(arg_list):
     Run either the command line user interface, the graphical user interface,
     or display the usage message.
     """
+    try:
+        options, arguments = getopt.getopt(arg_list, "hapqc:s:", ["batch=", "cycles=",
+                                                                "stimulus=", "out=", "sweep=",
+                                                                "set=", "jobs=", "monte-carlo=",
+                                                                "trials=", "seed=", "cache="])
+    except getopt.GetoptError:
+        options, arguments = None, []
+
+    # --seed repeats the random power-up state of cold starts in every mode
+    batch_options = dict(options or [])
+    try:
+        seed = batch_options.get("--seed")
+        if seed is not None:
+            seed = int(seed)
+    except ValueError:
+        print(_("Error: --seed requires an integer"), file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+
+    # Batch runs print nothing, and exit with a status for the job scheduler
+    if "--batch" in batch_options:
+        try:
+            cycles = int(batch_options["--cycles"])
+        except (KeyError, ValueError):
+            print(_("Error: --batch requires --cycles N"), file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        sys.exit(run_batch(batch_options["--batch"], cycles,
+                           batch_options.get("--stimulus"), batch_options.get("--out"), seed,
+                           batch_options.get("--cache")))
+    if "--sweep" in batch_options:
+        try:
+            cycles = int(batch_options["--cycles"])
+            processes = int(batch_options.get("--jobs", 0)) or None
+        except (KeyError, ValueError):
+            print(_("Error: --sweep requires --cycles N"), file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        # Imported here, as the process pool is slow to import
+        from sweep import run_sweep
+        # --set may be given once per swept device
+        settings = [value for option, value in options if option == "--set"]
+        sys.exit(run_sweep(batch_options["--sweep"], cycles, settings, processes, seed))
+    if "--monte-carlo" in batch_options:
+        try:
+            cycles = int(batch_options["--cycles"])
+            trials = int(batch_options["--trials"])
+            processes = int(batch_options.get("--jobs", 0)) or None
+        except (KeyError, ValueError):
+            print(_("Error: --monte-carlo requires --cycles N and --trials K"),
+                  file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        from montecarlo import run_monte_carlo
+        sys.exit(run_monte_carlo(batch_options["--monte-carlo"], cycles, trials, seed or 0,
+                                 processes))
+
+    # -q prints nothing until the end of a command line session
+    quiet = any(option == "-q" for option, value in options or [])
+
+    # Report the system language, as messages are shown in English or Greek
+    if quiet:
+        pass  # keep the output to the end of session summary
+    elif get_locale() == "el_GR.utf8":
+        print("Greek system language detected")
+    elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
+        print("Your system language is English.")
+    else:
+        print("Attention - your system language is neither English nor Greek. Logsim will run in English.")
+
     usage_message = _("""Usage:
 Show help: logsim.py -h
 Command line user interface: logsim.py -c <file path>
-Graphical user interface: logsim.py <file path>""")
+Graphical user interface: logsim.py <file path>
+Record every output each cycle: add -a to either of the above
+Simulate in a separate process: add -p to the graphical user interface
+Command script: add -s <script path> to the command line user interface, or pipe the commands in
+Quiet command line session: add -q [--out <trace path>] to show or save the traces only at the end
+Batch run: logsim.py --batch <file path> --cycles N [--stimulus <file path>] [--out <trace path>]
+Parameter sweep: logsim.py --sweep <file path> --cycles N --set <device>=<value>,<value>... [--jobs J]
+Repeatable power-up state: add --seed S to any of the above
+Result cache: add --cache <directory> to a batch run or the command line user interface
+Cold-start analysis: logsim.py --monte-carlo <file path> --cycles N --trials K [--seed S] [--jobs J]""")
     
-    try:
-        options, arguments = getopt.getopt(arg_list, "hc:")
-    except getopt.GetoptError:
+    if options is None:
         print(_("Error: invalid command line arguments\n"))
         print(usage_message)
         sys.exit()
 
+    # Without -c, only the options of the graphical user interface apply
+    if "-c" not in dict(options):
+        stray_options = [option for option, value in options
+                         if option not in ["-h", "-a", "-p", "--seed"]]
+        if stray_options:
+            print(_("Error: {options} requires -c <file path>\n").format(
+                options=" ".join(stray_options)))
+            print(usage_message)
+            sys.exit(EXIT_ERROR)
+
     # Initialise instances of the four inner simulator classes
     names = Names()
     devices = Devices(names)
     network = Network(names, devices)
     monitors = Monitors(names, devices, network)
 
+    # -a is equivalent to MONITOR * in the definition file
+    monitor_all = any(option == "-a" for option, value in options)
+    # -p runs the GUI simulations in an engine process
+    use_engine = any(option == "-p" for option, value in options)
+    # -s reads the command line session from a script, --out saves its traces
+    script_path = dict(options).get("-s")
+    out_path = dict(options).get("--out")
+    # --cache restores runs that were already simulated from a directory
+    cache_dir = dict(options).get("--cache")
+
     for option, path in options:
         if option == "-h":  # print the usage message
             print(usage_message)
@@ -74,11 +145,26 @@ Graphical user interface: logsim.py <file path>""")
             scanner = Scanner(path, names)
             parser = Parser(names, devices, network, monitors, scanner)
             if parser.parse_network():
+                if monitor_all:
+                    monitors.monitor_all_signals()
+                devices.set_seed(seed)
+                cache = None
+                if cache_dir is not None:
+                    from result_cache import ResultCache
+                    cache = ResultCache(cache_dir)
                 # Initialise an instance of the userint.UserInterface() class
-                userint = UserInterface(names, devices, network, monitors)
-                userint.command_interface()
+                userint = UserInterface(names, devices, network, monitors,
+                                        quiet, cache)
+                if script_path is not None:
+                    with open(script_path) as script:
+                        userint.command_interface(script, out_path)
+                elif not sys.stdin.isatty():  # commands piped in
+                    userint.command_interface(sys.stdin, out_path)
+                else:
+                    userint.command_interface(out_path=out_path)
 
-    if not options:  # no option given, use the graphical user interface
+    # no -h or -c option given, use the graphical user interface
+    if not [option for option, value in options if option not in ["-a", "-p", "--seed"]]:
         if len(arguments) > 2:  # wrong number of arguments
             print(_("Error: one file path required and one language code optional\n"))
             print(usage_message)
@@ -92,9 +178,18 @@ Graphical user interface: logsim.py <file path>""")
         parser = Parser(names, devices, network, monitors, scanner)
         
         assert parser.parse_network()
+        if monitor_all:
+            monitors.monitor_all_signals()
+        devices.set_seed(seed)
+        # The GUI modules are only imported here, so that the command line
+        # interface starts quickly and works without wx, OpenGL or matplotlib
+        import wx
+        from gui import Gui
+
         # Initialise an instance of the gui.Gui() class
         app = wx.App()
-        gui = Gui(_("Logic Simulator"), path, names, devices, network, monitors)
+        gui = Gui(_("Logic Simulator"), path, names, devices, network, monitors,
+                  use_engine=use_engine)
         gui.Show(True)
         app.MainLoop()
 
@@ -22,6 +22,7 @@ from monitors import Monitors
 from scanner import Scanner
 from parse import Parser
 from logic_draw_3D import LogicDrawer3D
+from trace_pyramid import TracePyramid
 
 
 class MyGLCanvasMonitor3D(wxcanvas.GLCanvas):
@@ -106,6 +107,12 @@ class MyGLCanvasMonitor3D(wxcanvas.GLCanvas):
         self.color_arr = []
 
         self.blank_signal = ["BLANK"] 
+        # Signal names drawn by LogicDrawer3D, indexed by signal
+        self.signal_names = {self.devices.HIGH: "HIGH", self.devices.LOW: "LOW",
+                             self.devices.RISING: "RISING", self.devices.FALLING: "FALLING",
+                             self.devices.BLANK: "BLANK"}
+        # Columns drawn per monitor before cycles are summarised
+        self.max_columns = 200
 
         self.max_view = self.parent.max_3D_view
         self.scroll_val = self.parent.scroll_val
@@ -174,11 +181,10 @@ class MyGLCanvasMonitor3D(wxcanvas.GLCanvas):
 
         self.plot_array = []
         self.name_array = []
-        self.all_signals = []
+        self.all_signals = []  # one TracePyramid per monitor
         self.m_names = []
 
         count = 0
-        blank_signal = self.blank_signal*self.parent.cycles_completed
 
         if not bool(self.monitors.monitors_dictionary): 
             return 
@@ -189,32 +195,45 @@ class MyGLCanvasMonitor3D(wxcanvas.GLCanvas):
             
             count += 1
             monitor_name = self.devices.get_signal_name(device_id, output_id)
-            signal_list = self.monitors.monitors_dictionary[(device_id, output_id)]
+            # Read only the completed chunks, without replaying, while the
+            # worker thread is simulating the network
+            signal_list = self.monitors.get_signal_trace(
+                device_id, output_id, 0, self.parent.cycles_completed,
+                replay=not self.parent.simulating)
 
-            one_d_signal = []
-            for signal in signal_list: 
-                if signal == self.devices.HIGH: 
-                    s_name = "HIGH"
-
-                if signal == self.devices.LOW: 
-                    s_name = "LOW"
-
-                if signal == self.devices.RISING: 
-                    s_name = "RISING"
-
-                if signal == self.devices.FALLING: 
-                    s_name = "FALLING"
-
-                if signal == self.devices.BLANK: 
-                    s_name = "BLANK"
-   
-                one_d_signal.append(s_name)
-            if len(one_d_signal) < self.parent.cycles_completed:
-                one_d_signal = blank_signal + one_d_signal
-                one_d_signal = one_d_signal[-self.parent.cycles_completed:]
-            
-            self.all_signals.append(one_d_signal)
+            self.all_signals.append(TracePyramid(self.devices, signal_list))
             self.m_names.append(monitor_name)
+
+    def get_column_names(self, pyramid, start, stop):
+        """Return the signal names to draw for cycles start to stop - 1.
+
+        Returns (first_cycle, cycles_per_column, names). When the window is
+        wider than max_columns, each column summarises several cycles: a
+        column in which the signal changes is drawn as an edge, so glitches
+        stay visible.
+        """
+        if stop - start <= self.max_columns:
+            signal_list = pyramid.get_samples(start, stop)
+            return (max(start, 0), 1, [self.signal_names[signal] for signal in signal_list])
+
+        bucket_size, first_cycle, mins, maxs, edges = pyramid.get_buckets(
+            start, stop, self.max_columns)
+        names = []
+        previous = "LOW"
+        for low, high, edge in zip(mins, maxs, edges):
+            if low > high:
+                name = "BLANK"
+            elif low != high or low == 1:
+                name = "FALLING" if previous == "HIGH" else "RISING"
+            else:
+                name = "HIGH" if low == 2 else "LOW"
+                if edge and name == previous:
+                    # The signal glitched and came back within the column
+                    name = "FALLING" if name == "HIGH" else "RISING"
+            names.append(name)
+            if name != "BLANK":
+                previous = "HIGH" if name in ["HIGH", "RISING"] else "LOW"
+        return (first_cycle, bucket_size, names)
     
     def render_monitor_plots(self): 
 
@@ -225,17 +244,22 @@ class MyGLCanvasMonitor3D(wxcanvas.GLCanvas):
 
         GL.glColor3f(1.0,1.0,1.0)
         self.signal_renderer.render_text("Time Axis", -15, 15 , 10)
-        for i, signal_list in enumerate(self.all_signals): 
-            x_offset = 0
+        for i, pyramid in enumerate(self.all_signals): 
             color = self.color_arr[i]
             monitor_name = self.m_names[i]
-            
-            signal_list = signal_list[self.scroll_val: self.scroll_val + self.max_view]
+
+            # Traces shorter than the run are aligned with the last cycle
+            offset = self.parent.cycles_completed - len(pyramid)
+            first_cycle, column_cycles, signal_list = self.get_column_names(
+                pyramid, self.scroll_val - offset, self.scroll_val + self.max_view - offset)
+            first_column = (first_cycle + offset - self.scroll_val) // column_cycles
+            x_offset = x_dist * first_column
             
             for j, s_name in enumerate(signal_list): 
-                if (j + self.scroll_val) % 10 == 0: 
+                cycle = first_cycle + offset + j * column_cycles
+                if (cycle // column_cycles) % 10 == 0: 
                     GL.glColor3f(1.0,1.0,1.0)
-                    self.signal_renderer.render_text(str(int(j + self.scroll_val)), x_offset, +15, 0)
+                    self.signal_renderer.render_text(str(int(cycle)), x_offset, +15, 0)
 
                 self.signal_renderer.draw_signal(x_offset, y_offset, s_name, color)
                 x_offset += x_dist
@@ -6,10 +6,73 @@ signals.
 Classes
 -------
 Monitors - records and displays specified output signals.
+StateColumn - read-only view of one signal in the full-state recording.
 
 """
 
 import collections
+import collections.abc
+import itertools
+import re
+import sys
+
+from checkpoints import Checkpoints
+from activity import Activity
+
+
+class StateColumn(collections.abc.Sequence):
+
+    """Present one column of the full-state recording as a signal list.
+
+    In full-state mode every output is stored in a single cycles x nets byte
+    array. A StateColumn lets the rest of the simulator treat one column of
+    that array exactly like the signal lists of ordinary monitors.
+
+    Parameters
+    ----------
+    monitors: instance of the monitors.Monitors() class.
+    column: index of the signal in the net vector.
+
+    Public methods
+    --------------
+    No public methods apart from the sequence protocol.
+    """
+
+    def __init__(self, monitors, column):
+        """Store the owning Monitors instance and the column index."""
+        self.monitors = monitors
+        self.column = column
+
+    def __len__(self):
+        """Return the number of recorded cycles."""
+        return self.monitors.get_state_cycles()
+
+    def __getitem__(self, index):
+        """Return the signal at a cycle, or a list of signals for a slice."""
+        if isinstance(index, slice):
+            return list(self)[index]
+        cycles = len(self)
+        if index < 0:
+            index += cycles
+        if not 0 <= index < cycles:
+            raise IndexError("cycle out of range")
+        width = len(self.monitors.net_list)
+        return self.monitors.state_trace[index * width + self.column]
+
+    def __iter__(self):
+        """Iterate over the recorded signals in cycle order."""
+        width = len(self.monitors.net_list)
+        return iter(self.monitors.state_trace[self.column::width])
+
+    def __eq__(self, other):
+        """Compare equal to any sequence holding the same signals."""
+        if isinstance(other, (list, tuple, StateColumn)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        """Return the recorded signals formatted as a list."""
+        return repr(list(self))
 
 
 class Monitors:
@@ -30,22 +93,61 @@ class Monitors:
     make_monitor(self, device_id, output_id): Sets a specified monitor on the
                                               specified output.
 
+    monitor_all_signals(self): Records the whole network state every cycle and
+                               monitors every output.
+
+    get_state_cycles(self): Returns the number of cycles in the full-state
+                            recording.
+
+    enable_activity(self): Starts collecting activity statistics for every
+                           output.
+
+    start_archive(self, writer): Streams the named signals to a trace archive
+                                 writer every cycle.
+
+    stop_archive(self): Closes the trace archive being written.
+
     remove_monitor(self, device_id, output_id): Removes a monitor from the
                                                 specified output.
 
     get_monitor_signal(self, device_id, output_id): Returns the signal level of
                                                     the specified monitor.
 
+    get_signal_trace(self, device_id, output_id, start=0, stop=None,
+                     replay=True): Returns the recorded signal levels of a
+                     monitor, reconstructing cycles from before it was added.
+
     record_signals(self): Records the current signal level of all monitors.
 
+    record_repeats(self, cycles): Records the current signal level of all
+                                  monitors for several cycles.
+
+    record_period(self, period, count): Records the last period cycles of
+                                        all monitors count more times.
+
+    run_cycles(self, start, stop, stimulus=None, watchpoints=None,
+               detector=None, checkpoint=True, callback=None): Simulates
+               and records the network from cycle start to cycle stop.
+
     get_signal_names(self): Returns two lists of signal names: monitored and
                             not monitored.
 
     reset_monitors(self): Clears the memory of all monitors.
 
+    rewind(self, cycle): Cuts the recorded traces back to the given number
+                         of cycles.
+
+    load_traces(self, traces): Replaces the recorded traces with the given
+                               ones.
+
     get_margin(self): Returns the length of the longest monitor's name.
 
-    display_signals(self): Displays signal trace(s) in the text console.
+    format_signals(self, start=0, stop=None, width=None, summary=False):
+                   Returns the signal traces of cycles start to stop - 1 as
+                   text.
+
+    display_signals(self, start=0, stop=None, width=None, summary=False):
+                    Displays signal trace(s) in the text console.
     """
 
     def __init__(self, names, devices, network):
@@ -58,9 +160,48 @@ class Monitors:
         # {(device_id, output_id): [signal_list]}
         self.monitors_dictionary = collections.OrderedDict()
 
+        # Full-state recording, enabled by MONITOR * or logsim.py -a. The
+        # value of every output is stored each cycle in state_trace, a
+        # row-major (cycles x nets) byte array whose columns follow net_list.
+        self.full_state = False
+        self.net_list = []  # [(device_id, output_id)] in column order
+        self.net_index = {}  # {(device_id, output_id): column}
+        self.output_refs = []  # [(device.outputs, output_id)] in column order
+        self.state_trace = bytearray()
+
+        # Checkpoints taken during runs, used to reconstruct the history of
+        # monitors added part way through. monitor_start stores
+        # {(device_id, output_id): cycle at which the monitor was added}
+        self.checkpoints = Checkpoints(devices, network)
+        self.monitor_start = {}
+
+        # Optional activity statistics, updated every cycle even if no
+        # signals are being monitored
+        self.activity = None
+
+        # Optional trace_archive.TraceWriter() written to every cycle
+        self.archive = None
+        self.archive_refs = []  # [(device.outputs, output_id)] per signal
+
+        # Console characters of the signal levels, and the shortest constant
+        # stretch collapsed in summary mode
+        self.display_table = bytearray(b"?" * 256)
+        for signal, character in [(devices.LOW, b"_"), (devices.HIGH, b"-"),
+                                  (devices.RISING, b"/"),
+                                  (devices.FALLING, b"\\"),
+                                  (devices.BLANK, b" ")]:
+            self.display_table[signal] = ord(character)
+        self.summary_run = 20
+        self.run_pattern = re.compile(rb"(.)\1{%d,}" % (self.summary_run - 1),
+                                      re.DOTALL)
+
         [self.NO_ERROR, self.NOT_OUTPUT,
          self.MONITOR_PRESENT] = self.names.unique_error_codes(3)
 
+        # Statuses of run_cycles
+        [self.COMPLETED, self.CANCELLED, self.OSCILLATING,
+         self.WATCH_FIRED] = range(4)
+
     def make_monitor(self, device_id, output_id, cycles_completed=0):
         """Add the specified signal to the monitors dictionary.
 
@@ -77,11 +218,78 @@ class Monitors:
             # If n simulation cycles have been completed before making this
             # monitor, then initialise the signal trace with an n-length list
             # of BLANK signals. Otherwise, initialise the trace with an empty
-            # list.
-            self.monitors_dictionary[(device_id, output_id)] = [
-                self.devices.BLANK] * cycles_completed
+            # list. In full-state mode the whole history is already stored.
+            if self.full_state and (device_id, output_id) in self.net_index:
+                self.monitors_dictionary[(device_id, output_id)] = \
+                    StateColumn(self, self.net_index[(device_id, output_id)])
+            else:
+                self.monitors_dictionary[(device_id, output_id)] = [
+                    self.devices.BLANK] * cycles_completed
+                self.monitor_start[(device_id, output_id)] = cycles_completed
             return self.NO_ERROR
 
+    def monitor_all_signals(self):
+        """Record the whole network state every cycle and monitor every output.
+
+        Each cycle then costs a single byte-array append rather than one list
+        append per monitor. Return NO_ERROR.
+        """
+        self.net_list = []
+        self.net_index = {}
+        self.output_refs = []
+        for device in self.devices.devices_list:
+            for output_id in device.outputs:
+                self.net_index[(device.device_id, output_id)] = len(
+                    self.net_list)
+                self.net_list.append((device.device_id, output_id))
+                self.output_refs.append((device.outputs, output_id))
+        self.state_trace = bytearray()
+        self.monitor_start = {}
+        self.full_state = True
+
+        for device_id, output_id in self.net_list:
+            # Existing monitors are replaced by views onto the state array
+            self.monitors_dictionary[(device_id, output_id)] = StateColumn(
+                self, self.net_index[(device_id, output_id)])
+        return self.NO_ERROR
+
+    def enable_activity(self):
+        """Start collecting activity statistics for every output.
+
+        Statistics are counted from the next recorded cycle. Return the
+        activity.Activity() instance.
+        """
+        if self.activity is None:
+            self.activity = Activity(self.devices)
+        return self.activity
+
+    def start_archive(self, writer):
+        """Stream the signals named by a trace archive writer every cycle.
+
+        writer is an instance of the trace_archive.TraceWriter() class. Its
+        signals are sampled from the next recorded cycle until stop_archive
+        is called, whether or not they are monitored.
+        """
+        self.archive_refs = []
+        for signal_name in writer.signal_names:
+            [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+            device = self.devices.get_device(device_id)
+            self.archive_refs.append((device.outputs, output_id))
+        self.archive = writer
+
+    def stop_archive(self):
+        """Close the trace archive being written, if any."""
+        if self.archive is not None:
+            self.archive.close()
+        self.archive = None
+        self.archive_refs = []
+
+    def get_state_cycles(self):
+        """Return the number of cycles in the full-state recording."""
+        if not self.net_list:
+            return 0
+        return len(self.state_trace) // len(self.net_list)
+
     def remove_monitor(self, device_id, output_id):
         """Remove the specified signal from the monitors dictionary.
 
@@ -91,6 +299,7 @@ class Monitors:
             return False
         else:
             del self.monitors_dictionary[(device_id, output_id)]
+            self.monitor_start.pop((device_id, output_id), None)
             return True
 
     def get_monitor_signal(self, device_id, output_id):
@@ -103,16 +312,165 @@ class Monitors:
         else:
             return None
 
+    def get_signal_trace(self, device_id, output_id, start=0, stop=None,
+                         replay=True):
+        """Return the signal levels of a monitor for cycles start to stop - 1.
+
+        Cycles from before the monitor was added are BLANK in the monitors
+        dictionary. The first time such cycles are requested they are
+        reconstructed by replaying from the nearest checkpoint, and stored.
+        With replay False they are returned as BLANK, leaving the network
+        alone, e.g. while another thread is simulating it. Return None if
+        the monitor does not exist.
+        """
+        if (device_id, output_id) not in self.monitors_dictionary:
+            return None
+        signal_list = self.monitors_dictionary[(device_id, output_id)]
+        if stop is None or stop > len(signal_list):
+            stop = len(signal_list)
+
+        replay_stop = min(stop, self.monitor_start.get((device_id, output_id),
+                                                       0))
+        if replay and start < replay_stop and \
+                self.devices.BLANK in signal_list[start:replay_stop]:
+            replayed = self.checkpoints.replay_signal(device_id, output_id,
+                                                      start, replay_stop)
+            if replayed:
+                signal_list[start:start + len(replayed)] = replayed
+        return signal_list[start:stop]
+
     def record_signals(self):
         """Record the current signal level for every monitor.
 
         This function is called at every simulation cycle.
         """
+        if self.activity is not None:
+            self.activity.update(self.network.changed_devices)
+            self.network.changed_devices.clear()
+        if self.archive is not None:
+            self.archive.append([outputs[output_id] for outputs, output_id
+                                 in self.archive_refs])
+        if self.full_state:
+            self.state_trace.extend([outputs[output_id] for outputs, output_id
+                                     in self.output_refs])
         for device_id, output_id in self.monitors_dictionary:
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
             signal_level = self.get_monitor_signal(device_id, output_id)
             self.monitors_dictionary[(device_id,
                                       output_id)].append(signal_level)
 
+    def record_repeats(self, cycles):
+        """Record the current signal level of every monitor for cycles cycles.
+
+        This is called instead of record_signals for cycles that repeat the
+        last one, see Network.fast_forward, so the levels are appended in
+        bulk.
+        """
+        if self.activity is not None:
+            self.activity.repeat(cycles)
+        if self.archive is not None:
+            self.archive.append_traces([bytes([outputs[output_id]]) * cycles
+                                        for outputs, output_id
+                                        in self.archive_refs], cycles)
+        if self.full_state:
+            self.state_trace += bytes([outputs[output_id] for outputs,
+                                       output_id in self.output_refs]) * cycles
+        for device_id, output_id in self.monitors_dictionary:
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
+            signal_level = self.get_monitor_signal(device_id, output_id)
+            self.monitors_dictionary[(device_id, output_id)].extend(
+                [signal_level] * cycles)
+
+    def record_period(self, period, count):
+        """Record the last period cycles of every monitor count more times.
+
+        This is called when the network state has repeated after period
+        cycles, see periodicity.PeriodDetector, so the following cycles
+        repeat the recorded ones.
+        """
+        width = len(self.net_list)
+        if self.full_state and width:
+            self.state_trace += self.state_trace[-period * width:] * count
+        for device_id, output_id in self.monitors_dictionary:
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
+            signal_list = self.monitors_dictionary[(device_id, output_id)]
+            signal_list += signal_list[-period:] * count
+
+    def run_cycles(self, start, stop, stimulus=None, watchpoints=None,
+                   detector=None, checkpoint=True, callback=None):
+        """Simulate and record the network from cycle start to cycle stop.
+
+        This is the simulation loop of every front end. Each cycle the due
+        events of stimulus, a stimulus.Stimulus() instance, are applied, a
+        checkpoint is taken if one is due, the network is executed and the
+        monitors are recorded. With checkpoint True, a checkpoint is forced
+        at start and the switch states are recorded at every stimulus event,
+        to capture switch changes.
+
+        The run stops early when a watch expression of watchpoints, a
+        watchpoints.Watchpoints() instance, becomes true. Without watch
+        expressions, once the last stimulus event has passed, detector, a
+        periodicity.PeriodDetector() instance, extrapolates whole periods.
+        Cycles that repeat the last one are recorded in bulk, see
+        Network.fast_forward.
+
+        callback, if given, is called with the cycle reached before every
+        cycle simulated, and stops the run if it returns True. Return
+        [cycle reached, status, fired], where status is COMPLETED,
+        CANCELLED, OSCILLATING or WATCH_FIRED, and fired lists the watch
+        expressions that became true.
+        """
+        network = self.network
+        cycle = start
+        status = self.COMPLETED
+        fired = []
+        next_event = None
+        if stimulus is not None:
+            next_event = stimulus.next_cycle()
+        if watchpoints is not None and not watchpoints.predicates:
+            watchpoints = None
+        force = checkpoint
+        while cycle < stop:
+            if callback is not None and callback(cycle):
+                status = self.CANCELLED
+                break
+            if next_event is not None and cycle >= next_event:
+                next_event = stimulus.apply(cycle)
+                if checkpoint:
+                    self.checkpoints.add_switches(cycle)
+            if checkpoint:
+                self.checkpoints.update(cycle, force)
+                force = False
+            if not network.execute_network():
+                status = self.OSCILLATING
+                break
+            self.record_signals()
+            cycle += 1
+            if watchpoints is not None:
+                fired = watchpoints.check()
+                if fired:
+                    status = self.WATCH_FIRED
+                    break
+            elif next_event is None and detector is not None:
+                # With no switch changes left, a repeated state repeats the
+                # rest of the run
+                period = detector.check(cycle)
+                if period is not None:
+                    cycle = detector.extrapolate(period, cycle, stop)
+
+            # Skip the cycles that repeat this one, up to the next event
+            limit = stop - cycle
+            if next_event is not None:
+                limit = min(limit, next_event - cycle)
+            skipped = network.fast_forward(limit)
+            if skipped:
+                self.record_repeats(skipped)
+                cycle += skipped
+        return [cycle, status, fired]
+
     def get_signal_names(self):
         """Return two signal name lists: monitored and not monitored."""
         non_monitored_signal_list = []
@@ -136,9 +494,66 @@ class Monitors:
 
         The list of stored signal levels for each monitor is deleted.
         """
+        self.state_trace = bytearray()
+        self.checkpoints.reset()
+        if self.activity is not None:
+            self.activity.reset()
         for device_id, output_id in self.monitors_dictionary:
+            self.monitor_start[(device_id, output_id)] = 0
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
             self.monitors_dictionary[(device_id, output_id)] = []
 
+    def rewind(self, cycle):
+        """Cut the recorded traces back to the given number of cycles.
+
+        This is called when the simulation state is restored to the start of
+        an earlier cycle, so that the next run records from there. Traces
+        with fewer cycles are padded with BLANK signals, and every checkpoint
+        is deleted, as their history is not known.
+        """
+        self.checkpoints.truncate(cycle)
+        known = True
+        width = len(self.net_list)
+        if self.full_state and width:
+            padding = cycle * width - len(self.state_trace)
+            del self.state_trace[cycle * width:]
+            self.state_trace += bytes([self.devices.BLANK]) * max(padding, 0)
+            known = padding <= 0
+        for device_id, output_id in self.monitors_dictionary:
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
+            signal_list = self.monitors_dictionary[(device_id, output_id)]
+            padding = cycle - len(signal_list)
+            del signal_list[cycle:]
+            signal_list += [self.devices.BLANK] * padding
+            known = known and padding <= 0
+            if self.monitor_start.get((device_id, output_id), 0) > cycle:
+                self.monitor_start[(device_id, output_id)] = cycle
+        if not known:
+            self.checkpoints.reset()
+
+    def load_traces(self, traces):
+        """Replace the recorded traces with the given ones.
+
+        traces maps (device_id, output_id) to a list of signal levels for
+        every monitor, all of the same length, e.g. traces read back from a
+        result cache. Every checkpoint is deleted, as they belong to the
+        replaced run.
+        """
+        self.checkpoints.reset()
+        if self.full_state:
+            columns = [traces[(device_id, output_id)]
+                       for device_id, output_id in self.net_list]
+            self.state_trace = bytearray(itertools.chain.from_iterable(
+                zip(*columns)))
+        for device_id, output_id in self.monitors_dictionary:
+            self.monitor_start[(device_id, output_id)] = 0
+            if self.full_state and (device_id, output_id) in self.net_index:
+                continue
+            self.monitors_dictionary[(device_id, output_id)] = list(
+                traces[(device_id, output_id)])
+
     def get_margin(self):
         """Return the length of the longest monitor's name.
 
@@ -156,25 +571,49 @@ class Monitors:
         else:
             return None
 
-    def display_signals(self):
-        """Display the signal trace(s) in the text console."""
+    def format_signals(self, start=0, stop=None, width=None, summary=False):
+        """Return the signal traces of cycles start to stop - 1 as text.
+
+        Each trace is one line, translated from the signal levels in a
+        single pass. If width is given, the lines are wrapped into blocks at
+        most width characters wide, each headed by its first cycle. In
+        summary mode, constant stretches of summary_run cycles or more are
+        collapsed to their length, e.g. "_<5000>_".
+        """
         margin = self.get_margin()
+        if margin is None:
+            return ""
+        names = []
+        traces = []
         for device_id, output_id in self.monitors_dictionary:
             monitor_name = self.devices.get_signal_name(device_id, output_id)
-            name_length = len(monitor_name)
-            signal_list = self.monitors_dictionary[(device_id, output_id)]
-            print(monitor_name + (margin - name_length) * " ", end=": ")
-            for signal in signal_list:
-                if signal == self.devices.HIGH:
-                    print("-", end="")
-                if signal == self.devices.LOW:
-                    print("_", end="")
-                if signal == self.devices.RISING:
-                    print("/", end="")
-                if signal == self.devices.FALLING:
-                    print("\\", end="")
-                if signal == self.devices.BLANK:
-                    print(" ", end="")
-            print("\n", end="")
-
-    
\ No newline at end of file
+            names.append((monitor_name + (margin - len(monitor_name)) * " " +
+                          ": ").encode("ascii"))
+            signal_list = self.get_signal_trace(device_id, output_id, start,
+                                                stop)
+            trace = bytes(signal_list).translate(self.display_table)
+            if summary:
+                trace = self.run_pattern.sub(
+                    lambda run: b"%c<%d>%c" % (run[0][0], len(run[0]),
+                                               run[0][0]), trace)
+            traces.append(trace)
+
+        length = max(len(trace) for trace in traces)
+        step = length or 1
+        if width is not None:
+            step = max(width - margin - 2, 1)
+        headed = not summary and (start > 0 or length > step)
+        lines = []
+        for position in range(0, length or 1, step):
+            if headed:
+                lines.append(b" " * (margin + 2) + b"%d" % (start + position))
+            for name, trace in zip(names, traces):
+                lines.append(name + trace[position:position + step])
+        return b"".join(line + b"\n" for line in lines).decode("ascii")
+
+    def display_signals(self, start=0, stop=None, width=None, summary=False):
+        """Display the signal trace(s) in the text console.
+
+        The text is built by format_signals and written in one call.
+        """
+        sys.stdout.write(self.format_signals(start, stop, width, summary))
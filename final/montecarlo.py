@@ -0,0 +1,138 @@
+"""Check how a circuit depends on its power-up state by Monte Carlo runs.
+
+Used in the Logic Simulator project to find reset-dependence bugs. The cold
+start-up sets every D-type memory and clock phase at random, so a single
+run only sees one power-up state. A Monte Carlo analysis runs many seeded
+cold starts of the same circuit on worker processes and compares them.
+
+Every trial has its own seed, so a trial that behaves differently can be
+reproduced exactly.
+
+Classes
+-------
+MonteCarlo - runs seeded cold starts of a circuit and compares them.
+
+Functions
+---------
+run_monte_carlo - runs the analysis given on the command line and prints a
+                  report.
+"""
+
+import collections
+
+from batch import parse_circuit, EXIT_OK, EXIT_ERROR
+from sweep import Sweep, OSCILLATING
+
+
+class MonteCarlo:
+
+    """Run seeded cold starts of a circuit and compare them.
+
+    For every monitored signal the analysis reports the distribution of its
+    level after the last cycle, and the cycle from which every trial agrees,
+    i.e. from which the signal no longer depends on the power-up state.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    run(self, trials, cycles, seed=0, processes=None): Runs the trials and
+                  returns the report of every monitored signal.
+
+    converged_cycle(traces): Returns the first cycle from which all the
+                             traces are the same.
+    """
+
+    def __init__(self, names, devices, network, monitors):
+        """Initialise the sweep used to run the trials."""
+        self.sweep = Sweep(names, devices, network, monitors)
+
+    def run(self, trials, cycles, seed=0, processes=None):
+        """Run trials cold starts of cycles cycles, seeded seed, seed + 1, ...
+
+        Return a list [reports, oscillating]. reports is a dictionary
+        {signal name: report}, where a report holds "finals", a Counter of
+        the levels after the last cycle, "converged", the first cycle from
+        which every trial has the same trace, or None, and "outliers", the
+        seeds of the trials whose final level differs from the most common
+        one. oscillating lists the seeds of the trials where the network
+        oscillates, which are left out of the reports.
+        """
+        seeds = list(range(seed, seed + trials))
+        results = self.sweep.run([{}] * trials, cycles, processes,
+                                 keep_traces=True, seeds=seeds)
+        oscillating = [result["seed"] for result in results
+                       if result["status"] == OSCILLATING]
+        results = [result for result in results
+                   if result["status"] != OSCILLATING]
+
+        reports = {}
+        if not results:
+            return [reports, oscillating]
+        for signal_name in results[0]["traces"]:
+            traces = [result["traces"][signal_name] for result in results]
+            finals = collections.Counter(trace[-1] for trace in traces
+                                         if trace)
+            majority = finals.most_common(1)[0][0] if finals else None
+            reports[signal_name] = {
+                "finals": finals,
+                "converged": self.converged_cycle(traces),
+                "outliers": [result["seed"] for result, trace
+                             in zip(results, traces)
+                             if trace and trace[-1] != majority]}
+        return [reports, oscillating]
+
+    @staticmethod
+    def converged_cycle(traces):
+        """Return the first cycle from which all the traces are the same.
+
+        Return None if they differ at the last cycle.
+        """
+        cycle = len(traces[0])
+        while cycle > 0 and \
+                len({trace[cycle - 1] for trace in traces}) == 1:
+            cycle -= 1
+        if cycle == len(traces[0]) and cycle > 0:
+            return None
+        return cycle
+
+
+def run_monte_carlo(path, cycles, trials, seed=0, processes=None):
+    """Run the analysis given on the command line and print a report.
+
+    One line is printed per monitored signal, giving the count of every
+    final level, the convergence cycle and the seeds of the outliers.
+    Return the exit status, as for batch runs.
+    """
+    circuit = parse_circuit(path)
+    if circuit is None:
+        return EXIT_ERROR
+    devices = circuit[1]
+    level_names = {devices.LOW: "LOW", devices.HIGH: "HIGH",
+                   devices.RISING: "RISING", devices.FALLING: "FALLING",
+                   devices.BLANK: "BLANK"}
+
+    [reports, oscillating] = MonteCarlo(*circuit).run(trials, cycles, seed,
+                                                      processes)
+    if oscillating:
+        print("Oscillating seeds:", " ".join(map(str, oscillating)))
+    for signal_name, signal_report in reports.items():
+        finals = ", ".join("{} {}".format(level_names[level], count)
+                           for level, count in
+                           sorted(signal_report["finals"].items()))
+        if signal_report["converged"] is None:
+            converged = "never converged"
+        else:
+            converged = "converged at cycle {}".format(
+                signal_report["converged"])
+        line = "{}: {}; {}".format(signal_name, finals, converged)
+        if signal_report["outliers"]:
+            line += "; outlier seeds " + " ".join(
+                map(str, signal_report["outliers"]))
+        print(line)
+    return EXIT_OK
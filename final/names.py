@@ -8,25 +8,8 @@ Classes
 Names - maps variable names and string names to unique integers.
 """
 
-import gettext
-import os
-
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
+from i18n import _
+
 
 class Names:
 
@@ -7,6 +7,12 @@ Classes
 Network - builds and executes the network.
 """
 
+import collections
+import heapq
+
+from signals import LOW, HIGH, TRANSITIONS, INVERSE, GATE_RULES, gate_target
+
+
 class Network:
 
     """Build and execute the network.
@@ -47,9 +53,19 @@ class Network:
     execute_gate(self, device_id, x=None, y=None): Simulates a logic gate and
                                               updates its output signal value.
 
+    prepare_gates(self): Compiles the logic gates into a gate bank.
+
+    execute_gates(self): Simulates every logic gate in the gate bank.
+
     execute_d_type(self, device_id): Simulates a D-type device and updates its
                                      output signal value.
 
+    prepare_registers(self): Compiles the D-type devices into a register
+                             bank.
+
+    execute_registers(self): Simulates every D-type device in the register
+                             bank.
+
     execute_clock(self, device_id): Simulates a clock and updates its output
                                     signal value.
 
@@ -58,8 +74,22 @@ class Network:
     update_clocks(self): If it is time to do so, sets clock signals to RISING
                          or FALLING.
 
+    update_cycles(self): Advances the clock and RC counters by one cycle.
+
+    prepare_calendar(self): Schedules the next clock toggles and RC timeouts.
+
+    prepare_memo(self): Checks if the settled outputs of a cycle can be
+                        memoized, and clears the memo.
+
     execute_network(self): Executes all the devices in the network for one
                            simulation cycle.
+
+    fast_forward(self, limit): Skips up to limit cycles that would repeat the
+                               last one, and returns how many were skipped.
+
+    snapshot(self): Returns the dynamic state of the network as bytes.
+
+    restore(self, data): Restores a state returned by snapshot.
     """
 
     def __init__(self, names, devices):
@@ -73,6 +103,41 @@ class Network:
         self.steady_state = True  # for checking if signals have settled
         self.cycle_count = 0 # Counting the number of cycles
 
+        # Number of iterations to wait for the signals to settle before
+        # declaring the network unstable
+        self.iteration_limit = 20
+
+        # Memo of the settled outputs of a network of switches and gates,
+        # {key: [outputs dictionary of every device]} in least recently used
+        # order. connection_count and the number of devices tell when the
+        # network has changed since the memo was prepared
+        self.memo = collections.OrderedDict()
+        self.memo_size = 1024
+        self.connection_count = 0
+        self.memo_structure = None
+        self.memo_switches = None  # switch devices, or None if no memo
+        self.memo_outputs = False  # True if the key holds the outputs too
+
+        # Register bank of the D-type devices, see prepare_registers, or
+        # None if they are executed one by one. It is prepared together
+        # with the memo, whenever the network has changed. The gate bank is
+        # the same for logic gates, see prepare_gates
+        self.registers = None
+        self.gates = None
+
+        # Calendar of the next clock toggles and RC timeouts, a heap of
+        # [timer cycle, device index, device], see prepare_calendar
+        self.calendar = []
+
+        # Devices whose outputs were changed by the network, for consumers
+        # that only visit changed outputs, e.g. activity.Activity, which
+        # clear it once they have read it
+        self.changed_devices = set()
+
+        # True if the last cycle changed no output, so that the next cycles
+        # repeat it until a clock edge or RC timeout, see fast_forward
+        self.quiescent = False
+
     def get_connected_output(self, device_id, input_id):
         """Return the output connected to the given input.
 
@@ -156,6 +221,8 @@ class Network:
         else:  # first_port_id not a valid input or output port
             error_type = self.PORT_ABSENT
 
+        if error_type == self.NO_ERROR:
+            self.connection_count += 1
         return error_type
 
     def check_network(self):
@@ -171,19 +238,14 @@ class Network:
         """Update the signal in the direction of the target.
 
         Return updated signal, and set steady_state to false if the new signal
-        is different from the old signal.
+        is different from the old signal. The update is looked up in
+        signals.TRANSITIONS.
         """
-        if signal in [self.devices.LOW, self.devices.FALLING]:
-            if target == self.devices.LOW:
-                new_signal = self.devices.LOW
-            else:
-                new_signal = self.devices.RISING
-        elif signal in [self.devices.HIGH, self.devices.RISING]:
-            if target == self.devices.LOW:
-                new_signal = self.devices.FALLING
-            else:
-                new_signal = self.devices.HIGH
-        else:
+        transitions = TRANSITIONS.get(signal)
+        if transitions is None:
+            return None
+        new_signal = transitions[target != LOW]
+        if new_signal is None:  # BLANK cannot be updated
             return None
         if signal != new_signal:
             self.steady_state = False
@@ -194,12 +256,7 @@ class Network:
 
         Return None if the signal is not HIGH or LOW.
         """
-        if signal == self.devices.HIGH:
-            return self.devices.LOW
-        elif signal == self.devices.LOW:
-            return self.devices.HIGH
-        else:
-            return None
+        return INVERSE.get(signal)
 
     def execute_switch(self, device_id):
         """Simulate a switch.
@@ -215,6 +272,8 @@ class Network:
         if updated_signal is None:  # signal update is unsuccessful
             return False
         else:
+            if updated_signal != signal:
+                self.changed_devices.add(device)
             device.outputs[None] = updated_signal
             return True
 
@@ -228,27 +287,18 @@ class Network:
         Return True if successful.
         """
         device = self.devices.get_device(device_id)
+        input_signal_list = []
         for input_id in device.inputs:
             input_signal = self.get_input_signal(device_id, input_id)
             if input_signal is None:  # this input is unconnected
                 return False
-
-        input_signal_list = []
-        for input_id in device.inputs:
-            input_signal = self.get_input_signal(device_id, input_id)
             input_signal_list.append(input_signal)
-            if device.device_kind != self.devices.XOR:
-                if input_signal != x:
-                    output_signal = self.invert_signal(y)
-                    break
-                output_signal = y
 
         if device.device_kind == self.devices.XOR:
             # Output is high only if both inputs are different
-            if input_signal_list[0] == input_signal_list[1]:  # assume two inputs
-                output_signal = self.devices.LOW
-            else:
-                output_signal = self.devices.HIGH
+            output_signal = gate_target(None, None, input_signal_list)
+        else:
+            output_signal = gate_target(x, y, input_signal_list)
 
         # Update and store the new signal
         signal = self.get_output_signal(device_id, None)
@@ -256,9 +306,75 @@ class Network:
         updated_signal = self.update_signal(signal, target)
         if updated_signal is None:  # if the update is unsuccessful
             return False
+        if updated_signal != signal:
+            self.changed_devices.add(device)
         device.outputs[None] = updated_signal
         return True
 
+    def prepare_gates(self):
+        """Compile the logic gates into a gate bank.
+
+        For every gate the bank holds its outputs dictionary, its rule from
+        signals.GATE_RULES and the outputs dictionaries and port IDs its
+        inputs are connected to, like the register bank of the D-types, see
+        prepare_registers. The gates are in the order execute_network runs
+        them, by kind. If any gate input is not connected to an output, the
+        bank is None and the gates are executed one by one.
+        """
+        devices = self.devices
+        self.gates = []
+        for gate_kind, gate_string in zip(devices.gate_types,
+                                          devices.gate_strings):
+            [x, y] = GATE_RULES[gate_string]
+            for device in devices.devices_list:
+                if device.device_kind != gate_kind:
+                    continue
+                sources = []
+                for connected_output in device.inputs.values():
+                    if connected_output is None:
+                        self.gates = None
+                        return
+                    (output_device_id, output_id) = connected_output
+                    output_device = devices.get_device(output_device_id)
+                    if output_device is None or \
+                            output_id not in output_device.outputs:
+                        self.gates = None
+                        return
+                    sources.append((output_device.outputs, output_id))
+                self.gates.append([device, device.outputs, x, y,
+                                   INVERSE.get(y), sources])
+
+    def execute_gates(self):
+        """Simulate every logic gate in the gate bank.
+
+        This gives the same result as execute_gate for every gate in turn.
+        Return True if successful.
+        """
+        changed_devices = self.changed_devices
+        for [device, outputs, x, y, inverse_y, sources] in self.gates:
+            if x is None:  # XOR, HIGH only if both inputs are different
+                [(first_outputs, first_id),
+                 (second_outputs, second_id)] = sources
+                if first_outputs[first_id] == second_outputs[second_id]:
+                    target = LOW
+                else:
+                    target = HIGH
+            else:
+                target = y
+                for source_outputs, source_id in sources:
+                    if source_outputs[source_id] != x:
+                        target = inverse_y
+                        break
+            signal = outputs[None]
+            new_signal = TRANSITIONS[signal][target != LOW]
+            if new_signal is None:  # if the update is unsuccessful
+                return False
+            if new_signal != signal:
+                self.steady_state = False
+                changed_devices.add(device)
+                outputs[None] = new_signal
+        return True
+
     def execute_d_type(self, device_id):
         """Simulate a D-type device and update its output signal value.
 
@@ -301,11 +417,89 @@ class Network:
                                       self.invert_signal(device.dtype_memory))
         if new_Q is None or new_QBAR is None:  # if the update is unsuccessful
             return False
+        if new_Q != Q_signal or new_QBAR != QBAR_signal:
+            self.changed_devices.add(device)
         device.outputs[self.devices.Q_ID] = new_Q
         device.outputs[self.devices.QBAR_ID] = new_QBAR
 
         return True
     
+    def prepare_registers(self):
+        """Compile the D-type devices into a register bank.
+
+        For every D-type device the bank holds its outputs dictionary and
+        the outputs dictionaries and port IDs its CLK, DATA, SET and CLEAR
+        inputs are connected to, so executing it needs no device lookups.
+        Output dictionaries are only ever updated in place, so the bank
+        stays valid until the network changes. If any D-type input is not
+        connected to an output, the bank is None and the D-types are
+        executed one by one, to report the error.
+        """
+        devices = self.devices
+        self.registers = []
+        for device in devices.devices_list:
+            if device.device_kind != devices.D_TYPE:
+                continue
+            register = [device, device.outputs]
+            for input_id in [devices.CLK_ID, devices.DATA_ID, devices.SET_ID,
+                             devices.CLEAR_ID]:
+                connected_output = device.inputs.get(input_id)
+                if connected_output is None:
+                    self.registers = None
+                    return
+                (output_device_id, output_id) = connected_output
+                output_device = devices.get_device(output_device_id)
+                if output_device is None or \
+                        output_id not in output_device.outputs:
+                    self.registers = None
+                    return
+                register += [output_device.outputs, output_id]
+            self.registers.append(register)
+
+    def execute_registers(self):
+        """Simulate every D-type device in the register bank.
+
+        This gives the same result as execute_d_type for every D-type
+        device in turn: a RISING clock stores DATA, then SET and CLEAR
+        force the memory HIGH and LOW, CLEAR taking priority. Return True if
+        successful.
+        """
+        devices = self.devices
+        [RISING, FALLING] = [devices.RISING, devices.FALLING]
+        Q_ID = devices.Q_ID
+        QBAR_ID = devices.QBAR_ID
+        changed_devices = self.changed_devices
+        for [device, outputs, clock_outputs, clock_id, data_outputs, data_id,
+             set_outputs, set_id, clear_outputs,
+             clear_id] in self.registers:
+            memory = device.dtype_memory
+            if clock_outputs[clock_id] == RISING:
+                data_signal = data_outputs[data_id]
+                if data_signal == HIGH or data_signal == FALLING:
+                    memory = HIGH
+                elif data_signal == LOW or data_signal == RISING:
+                    memory = LOW
+            if set_outputs[set_id] == HIGH:
+                memory = HIGH
+            if clear_outputs[clear_id] == HIGH:
+                memory = LOW
+            device.dtype_memory = memory
+
+            # Update Q towards the memory and QBAR towards its inverse, any
+            # memory other than LOW counting as HIGH
+            Q_signal = outputs[Q_ID]
+            QBAR_signal = outputs[QBAR_ID]
+            new_Q = TRANSITIONS[Q_signal][memory != LOW]
+            new_QBAR = TRANSITIONS[QBAR_signal][memory != HIGH]
+            if new_Q is None or new_QBAR is None:  # unsuccessful update
+                return False
+            if new_Q != Q_signal or new_QBAR != QBAR_signal:
+                self.steady_state = False
+                changed_devices.add(device)
+                outputs[Q_ID] = new_Q
+                outputs[QBAR_ID] = new_QBAR
+        return True
+
     def execute_rc(self, device_id):
         """Simulate an RC device and update its output signal value.
 
@@ -323,6 +517,8 @@ class Network:
             updated_signal = self.update_signal(signal, self.devices.LOW)
             if updated_signal is None:
                 return False
+            if updated_signal != signal:
+                self.changed_devices.add(device)
             device.outputs[None] = updated_signal
         
         return True
@@ -339,6 +535,7 @@ class Network:
             new_signal = self.update_signal(output_signal, self.devices.HIGH)
             if new_signal is None:  # update is unsuccessful
                 return False
+            self.changed_devices.add(device)
             device.outputs[None] = new_signal
             return True
 
@@ -346,6 +543,7 @@ class Network:
             new_signal = self.update_signal(output_signal, self.devices.LOW)
             if new_signal is None:  # update is unsuccessful
                 return False
+            self.changed_devices.add(device)
             device.outputs[None] = new_signal
             return True
 
@@ -356,33 +554,146 @@ class Network:
             return False
 
     def update_clocks(self):
-        """If it is time to do so, set clock signals to RISING or FALLING."""
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
-        for device_id in clock_devices:
-            device = self.devices.get_device(device_id)
-            if device.clock_counter == device.clock_half_period:
-                device.clock_counter = 0
-                output_signal = self.get_output_signal(device_id,
-                                                       output_id=None)
-                if output_signal == self.devices.HIGH:
-                    device.outputs[None] = self.devices.FALLING
-                elif output_signal == self.devices.LOW:
-                    device.outputs[None] = self.devices.RISING
-            device.clock_counter += 1
+        """If it is time to do so, set clock signals to RISING or FALLING.
 
+        Only the clocks due to toggle in this cycle are visited, as they are
+        taken from the calendar. RC devices timing out are taken off it too.
+        """
+        devices = self.devices
+        if devices.timer.changed:
+            self.prepare_calendar()
+        cycle = devices.timer.cycle
+        calendar = self.calendar
+        while calendar and calendar[0][0] <= cycle:
+            [due_cycle, index, device] = heapq.heappop(calendar)
+            if device.clock_half_period is None or due_cycle != cycle:
+                continue  # an RC device timing out
+            device.clock_start = cycle
+            output_signal = device.outputs[None]
+            if output_signal == devices.HIGH:
+                device.outputs[None] = devices.FALLING
+            elif output_signal == devices.LOW:
+                device.outputs[None] = devices.RISING
+            self.changed_devices.add(device)
+            heapq.heappush(calendar, [cycle + device.clock_half_period,
+                                      index, device])
 
     def update_cycles(self):
-        """Update the cycle count for the network."""
-        rc_devices = self.devices.find_devices(self.devices.RC)
-        for device_id in rc_devices:
-            device = self.devices.get_device(device_id)
-            device.cycle_counter += 1
+        """Advance the clock and RC counters by one cycle.
+
+        The counters are derived from the time, see devices.Timer, so this
+        takes the same time however many clocks and RC devices there are.
+        """
+        self.devices.timer.cycle += 1
+
+    def prepare_calendar(self):
+        """Schedule the next clock toggles and RC timeouts.
+
+        A clock toggles in the cycle its counter reaches its half period,
+        and an RC device times out in the cycle its counter passes its
+        number of cycles. Counters that are already past these never toggle
+        or time out again. This is called whenever a counter was set from
+        outside the network, e.g. by a cold start-up or a state load.
+        """
+        devices = self.devices
+        cycle = devices.timer.cycle
+        self.calendar = []
+        for index, device in enumerate(devices.devices_list):
+            if device.device_kind == devices.CLOCK and \
+                    device.clock_counter is not None:
+                due_cycle = cycle + device.clock_half_period - \
+                    device.clock_counter
+            elif device.device_kind == devices.RC:
+                due_cycle = cycle + device.rc_cycles - device.cycle_counter
+            else:
+                continue
+            if due_cycle >= cycle:
+                self.calendar.append([due_cycle, index, device])
+        heapq.heapify(self.calendar)
+        devices.timer.changed = False
+
+    def prepare_memo(self):
+        """Check if the settled outputs of a cycle can be memoized.
+
+        This is the case for networks of switches and connected gates only,
+        where a cycle holds no state other than the outputs. If the gates
+        form no loops and are shallow enough to settle within the iteration
+        limit from any outputs, the settled outputs only depend on the
+        switch states, which are then the memo key. Otherwise the outputs
+        before the cycle are part of the key too. The memo is cleared.
+        """
+        devices = self.devices
+        self.memo.clear()
+        self.memo_structure = [len(devices.devices_list),
+                               self.connection_count]
+        self.memo_switches = None
+
+        levels = {}  # {device_id: logic depth}, switches at depth 0
+        gates = []
+        for device in devices.devices_list:
+            if device.device_kind == devices.SWITCH:
+                levels[device.device_id] = 0
+            elif device.device_kind in devices.gate_types and \
+                    None not in device.inputs.values():
+                gates.append(device)
+            else:
+                return  # state held by clocks, D-types or RC devices
+        progress = True
+        while gates and progress:
+            progress = False
+            for device in list(gates):
+                input_levels = [levels.get(output_device_id) for
+                                output_device_id, output_id in
+                                device.inputs.values()]
+                if None not in input_levels:
+                    levels[device.device_id] = max(input_levels) + 1
+                    gates.remove(device)
+                    progress = True
+
+        # A gate settles two iterations after its inputs, one to start its
+        # RISING or FALLING edge and one to finish it, and one more
+        # iteration finds the steady state. Gates left over are in loops
+        depth = max(levels.values(), default=0)
+        self.memo_outputs = bool(gates) or \
+            2 * depth + 3 > self.iteration_limit
+        self.memo_switches = [devices.get_device(device_id) for device_id
+                              in devices.find_devices(devices.SWITCH)]
 
     def execute_network(self):
         """Execute all the devices in the network for one simulation cycle.
 
+        Networks of switches and gates only are memoized: if the network was
+        executed from the same key before, see prepare_memo, the memoized
+        settled outputs are copied in instead.
+
         Return True if successful and the network does not oscillate.
         """
+        devices_list = self.devices.devices_list
+        self.quiescent = False
+        if self.memo_structure != [len(devices_list), self.connection_count]:
+            self.prepare_memo()
+            self.prepare_registers()
+            self.prepare_gates()
+        memo_key = None
+        if self.memo_switches is not None and self.memo_size > 0:
+            memo_key = tuple([device.switch_state for device
+                              in self.memo_switches])
+            if self.memo_outputs:
+                memo_key = (memo_key, tuple([
+                    signal for device in devices_list
+                    for signal in device.outputs.values()]))
+            settled = self.memo.get(memo_key)
+            if settled is not None:
+                self.memo.move_to_end(memo_key)
+                self.quiescent = True
+                for device, outputs in zip(devices_list, settled):
+                    if device.outputs != outputs:
+                        self.quiescent = False
+                        self.changed_devices.add(device)
+                        device.outputs.update(outputs)
+                self.steady_state = True
+                return True
+
         clock_devices = self.devices.find_devices(self.devices.CLOCK)
         switch_devices = self.devices.find_devices(self.devices.SWITCH)
         rc_devices = self.devices.find_devices(self.devices.RC)
@@ -397,12 +708,8 @@ class Network:
         self.update_clocks()
         self.update_cycles()
 
-        # Number of iterations to wait for the signals to settle before
-        # declaring the network unstable
-        iteration_limit = 20
-
         iterations = 0
-        while iterations < iteration_limit:
+        while iterations < self.iteration_limit:
             iterations += 1
             self.steady_state = True
             for device_id in switch_devices:  # execute switch devices
@@ -415,33 +722,88 @@ class Network:
                     return False
             # Execute D-type devices before clocks to catch the rising edge of
             # the clock
-            for device_id in d_type_devices:  # execute DTYPE devices
-                if not self.execute_d_type(device_id):
+            if self.registers is not None:  # execute DTYPE devices
+                if not self.execute_registers():
                     return False
+            else:
+                for device_id in d_type_devices:
+                    if not self.execute_d_type(device_id):
+                        return False
             for device_id in clock_devices:  # complete clock executions
                 if not self.execute_clock(device_id):
                     return False
                 
 
-            for device_id in and_devices:  # execute AND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in or_devices:  # execute OR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nand_devices:  # execute NAND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nor_devices:  # execute NOR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in xor_devices:  # execute XOR devices
-                if not self.execute_gate(device_id, None, None):
+            if self.gates is not None:  # execute gate devices
+                if not self.execute_gates():
                     return False
+            else:
+                for device_id in and_devices:  # execute AND gate devices
+                    if not self.execute_gate(device_id, self.devices.HIGH,
+                                             self.devices.HIGH):
+                        return False
+                for device_id in or_devices:  # execute OR gate devices
+                    if not self.execute_gate(device_id, self.devices.LOW,
+                                             self.devices.LOW):
+                        return False
+                for device_id in nand_devices:  # execute NAND gate devices
+                    if not self.execute_gate(device_id, self.devices.HIGH,
+                                             self.devices.LOW):
+                        return False
+                for device_id in nor_devices:  # execute NOR gate devices
+                    if not self.execute_gate(device_id, self.devices.LOW,
+                                             self.devices.HIGH):
+                        return False
+                for device_id in xor_devices:  # execute XOR devices
+                    if not self.execute_gate(device_id, None, None):
+                        return False
             if self.steady_state:
                 break
+        # Nothing changed if the first iteration was already steady
+        self.quiescent = self.steady_state and iterations == 1
+        if self.steady_state and memo_key is not None:
+            self.memo[memo_key] = [dict(device.outputs)
+                                   for device in devices_list]
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
         return self.steady_state
+
+    def fast_forward(self, limit):
+        """Skip the next cycles if they would repeat the last one exactly.
+
+        After a cycle that changed no output, every cycle repeats it until a
+        clock is due to toggle or an RC device to time out, the first event
+        on the calendar, so only the time has to move on. This must be
+        called right after execute_network, before any switch is changed. At
+        most limit cycles are skipped, e.g. to stop at the next stimulus
+        event. Return the number of cycles skipped.
+        """
+        if not self.quiescent or limit <= 0:
+            return 0
+        timer = self.devices.timer
+        if timer.changed:
+            self.prepare_calendar()
+        cycles = limit
+        if self.calendar:
+            cycles = min(cycles, self.calendar[0][0] - timer.cycle)
+        if cycles <= 0:
+            return 0
+        timer.cycle += cycles
+        return cycles
+
+    def snapshot(self):
+        """Return the dynamic state of the network as a compact bytes blob.
+
+        All of the state that changes from cycle to cycle is held by the
+        devices, see Devices.snapshot.
+        """
+        return self.devices.snapshot()
+
+    def restore(self, data):
+        """Restore the dynamic state returned by snapshot.
+
+        Raise ValueError if the blob does not match the network.
+        """
+        self.devices.restore(data)
+        self.steady_state = True
+        self.changed_devices.update(self.devices.devices_list)
@@ -9,25 +9,8 @@ Classes
 Parser - parses the definition file and builds the logic network.
 """
 from scanner import Symbol
-import gettext
-import os
-
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
+from i18n import _
+
 
 class Parser:
 
@@ -422,10 +405,15 @@ class Parser:
 
 
     def monitor(self, stopping_symbols):
-        """Implement rule monitor = "MONITOR", [output_con, {",", output_con}], ";";"""
+        """Implement rule monitor = "MONITOR", ["*" | output_con, {",", output_con}], ";";"""
         if self.symbol.type == self.scanner.KEYWORD and self.symbol.id == self.scanner.MONITOR_ID:
             self.symbol = self.scanner.get_symbol()
-            if self.symbol.type != self.scanner.SEMICOLON:
+            if self.symbol.type == self.scanner.STAR:
+                # MONITOR * records the whole network state every cycle
+                self.symbol = self.scanner.get_symbol()
+                if self.error_count == 0:
+                    self.monitors.monitor_all_signals()
+            elif self.symbol.type != self.scanner.SEMICOLON:
                 device_id, output_id = self.output_con(stopping_symbols | {self.scanner.COMMA, self.scanner.SEMICOLON})
                 if self.error_count == 0:
                     error_type = self.monitors.make_monitor(device_id, output_id)
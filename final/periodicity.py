@@ -0,0 +1,127 @@
+"""Detect periodic simulation states and extrapolate long runs.
+
+Used in the Logic Simulator project to finish long runs of circuits that
+settle into a periodic orbit, e.g. counters and dividers driven by clocks,
+without simulating every cycle.
+
+Without switch changes the simulation is deterministic, so once the whole
+dynamic state of the network repeats, every later cycle repeats the cycles
+in between. The state is only compared on the cycles where the slowest
+clock toggles, which every periodic orbit passes through, and is stored as
+a short digest. When a state repeats, whole periods are copied into the
+monitors and only the cycles left over are simulated.
+
+Classes
+-------
+PeriodDetector - finds repeated network states and extrapolates runs.
+"""
+
+import hashlib
+import struct
+
+from devices import SNAPSHOT_DEVICE
+
+
+class PeriodDetector:
+
+    """Find repeated network states and extrapolate runs from them.
+
+    Every state of a periodic orbit comes back once per period, so the
+    period is found at most one period and one toggle of the slowest clock
+    after the transient. RC counters past their timeout all behave alike,
+    and so are stored as one value.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    max_states: maximum number of states stored per run.
+
+    Public methods
+    --------------
+    reset(self): Forgets the stored states, e.g. after a switch change.
+
+    check(self, cycle): Records the state after cycle cycles, and returns
+                        the period if the state was seen before.
+
+    extrapolate(self, period, cycle, stop): Copies the last period into
+                  the monitors as many whole times as fit before stop, and
+                  returns the cycle reached.
+    """
+
+    def __init__(self, network, monitors, max_states=100000):
+        """Initialise the state store."""
+        self.network = network
+        self.devices = network.devices
+        self.monitors = monitors
+        self.max_states = max_states
+        self.reset()
+
+    def reset(self):
+        """Forget the stored states, e.g. after a switch change.
+
+        Detection is off for networks without clocks, which never repeat
+        without also staying constant, and while the monitors keep activity
+        statistics or stream to a trace archive, which extrapolation would
+        skip.
+        """
+        self.states = {}  # {state digest: cycle}
+        devices = self.devices
+        clocks = [devices.get_device(device_id) for device_id
+                  in devices.find_devices(devices.CLOCK)]
+        self.reference_clock = None
+        if clocks and self.monitors.activity is None and \
+                self.monitors.archive is None:
+            self.reference_clock = max(
+                clocks, key=lambda device: device.clock_half_period)
+
+    def check(self, cycle):
+        """Record the network state after cycle cycles.
+
+        This is called after every simulated cycle while no switch changes
+        are pending, and does nothing unless the slowest clock has just
+        toggled. Return the period if the state was seen before, or None.
+        """
+        if self.reference_clock is None or \
+                self.reference_clock.clock_counter != 1:
+            return None
+        devices = self.devices
+        state = bytearray()
+        for device in devices.devices_list:
+            cycle_counter = device.cycle_counter
+            if device.device_kind == devices.RC:
+                cycle_counter = min(cycle_counter, device.rc_cycles + 1)
+            state += bytes(device.outputs.values())
+            state += struct.pack(SNAPSHOT_DEVICE, *[
+                -1 if value is None else value for value in
+                [device.dtype_memory, device.switch_state,
+                 device.clock_counter, cycle_counter]])
+        digest = hashlib.blake2b(state, digest_size=16).digest()
+        if digest in self.states:
+            return cycle - self.states[digest]
+        if len(self.states) < self.max_states:
+            self.states[digest] = cycle
+        return None
+
+    def extrapolate(self, period, cycle, stop):
+        """Copy the last period of cycles into the monitors.
+
+        The period is copied as many whole times as fit between cycle and
+        stop, and the RC counters are moved on to match. The network state
+        is then the same as after cycle cycles, and is checkpointed at the
+        cycle reached, which is returned.
+        """
+        count = (stop - cycle) // period
+        if count <= 0:
+            return cycle
+        self.monitors.record_period(period, count)
+        devices = self.devices
+        for device in devices.devices_list:
+            if device.device_kind == devices.RC:
+                device.cycle_counter += period * count
+        self.states = {}
+        # Checkpoint the end of the span, so replays need not simulate it
+        self.monitors.checkpoints.add_period(cycle, cycle + period * count,
+                                             period)
+        return cycle + period * count
+
@@ -0,0 +1,213 @@
+"""Cache the results of simulation runs on disk.
+
+Used in the Logic Simulator project to skip simulations that have already
+been run, e.g. when continuous integration or the command line interface
+runs the same circuit with the same switches for the same cycles again.
+
+A run is identified by a key, a hash of everything that decides its result:
+the devices and connections of the circuit, the monitored signals, the seed
+of the cold start-up, the initial switch states and the stimulus events.
+For every key the cache can hold runs of several lengths. Each run is
+stored as two files in the cache directory, named after the key and the
+number of cycles: a compressed trace archive of the monitors (see
+trace_archive) and a snapshot of the network state after the last cycle
+(see Devices.snapshot).
+
+A run of N cycles is then a hit if a run of N cycles is cached. Otherwise
+it resumes from the longest cached run of fewer cycles, restoring its
+traces and state and simulating only the remaining cycles.
+
+The total size of the cache directory is kept under a cap by deleting the
+least recently used runs. The modification time of the files records when
+a run was last stored or used.
+
+Classes
+-------
+ResultCache - stores and restores the results of simulation runs.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from trace_archive import TraceReader, save_monitors
+
+entry_pattern = re.compile(r"([0-9a-f]{32})-([0-9]+)\.(trace|state)$")
+
+
+class ResultCache:
+
+    """Store and restore the results of simulation runs.
+
+    Parameters
+    ----------
+    directory: path of the cache directory, created if needed.
+    max_bytes: size cap of the cache directory in bytes.
+
+    Public methods
+    --------------
+    get_key(self, monitors, stimulus=None): Returns the key of a run from
+                                            cycle 0, or None if the run
+                                            cannot be cached.
+
+    load(self, key, cycles, monitors, min_cycles=1): Restores the longest
+         cached run of min_cycles to cycles cycles and returns its number
+         of cycles.
+
+    store(self, key, cycles, monitors): Stores the traces and network state
+                                        of a run of cycles cycles.
+
+    evict(self): Deletes the least recently used runs until the cache is
+                 under its size cap.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        """Create the cache directory if it does not exist."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, monitors, stimulus=None):
+        """Return the key of a run from cycle 0 of the monitored circuit.
+
+        The key must be taken before the cold start-up, with the switches in
+        their initial states. stimulus is the stimulus.Stimulus() instance
+        applied during the run, if any. Return None if the run cannot be
+        reproduced, because the power-up state is random and not seeded, or
+        if the monitors have side effects that a cached run would skip, such
+        as activity statistics or a trace archive being written.
+        """
+        devices = monitors.devices
+        names = monitors.names
+        if monitors.activity is not None or monitors.archive is not None:
+            return None
+        if devices.seed is None and devices.find_devices(devices.D_TYPE) + \
+                devices.find_devices(devices.CLOCK):
+            return None
+
+        circuit = []
+        for device in devices.devices_list:
+            connections = sorted(
+                [devices.get_signal_name(device.device_id, input_id),
+                 None if connection is None else
+                 devices.get_signal_name(*connection)]
+                for input_id, connection in device.inputs.items())
+            circuit.append([names.get_name_string(device.device_id),
+                            names.get_name_string(device.device_kind),
+                            device.clock_half_period, device.rc_cycles,
+                            device.switch_state, connections])
+        events = []
+        if stimulus is not None:
+            events = [[cycle, names.get_name_string(switch_id), value, period,
+                       until] for cycle, order, switch_id, value, period,
+                      until in stimulus.events]
+        description = {
+            "circuit": circuit, "signals": monitors.get_signal_names()[0],
+            "full_state": monitors.full_state, "seed": devices.seed,
+            "stimulus": events}
+        return hashlib.sha256(json.dumps(description).encode()).hexdigest()[
+            :32]
+
+    def load(self, key, cycles, monitors, min_cycles=1):
+        """Restore the longest cached run of the key of at most cycles cycles.
+
+        Runs shorter than min_cycles are left out, e.g. when the current run
+        is already as far. The monitor traces and the network state are
+        replaced by those of the cached run, which then counts as the most
+        recently used. Return the number of cycles restored, or 0 if no such
+        run is cached.
+        """
+        cached_cycles = [entry_cycles for entry_key, entry_cycles
+                         in self.get_entries() if entry_key == key and
+                         min_cycles <= entry_cycles <= cycles]
+        for entry_cycles in sorted(cached_cycles, reverse=True):
+            [trace_path, state_path] = self.get_paths(key, entry_cycles)
+            try:
+                reader = TraceReader(trace_path)
+                with open(state_path, "rb") as state_file:
+                    state = state_file.read()
+                traces = {}
+                for device_id, output_id in monitors.monitors_dictionary:
+                    traces[(device_id, output_id)] = reader.get_trace(
+                        monitors.devices.get_signal_name(device_id,
+                                                         output_id))
+                if reader.cycles != entry_cycles or None in traces.values():
+                    raise ValueError("cached run does not match its key")
+                monitors.network.restore(state)
+            except (OSError, ValueError):
+                continue  # damaged or evicted by another process
+            monitors.load_traces(traces)
+            # Checkpoint the restored state, to replay monitors added later
+            monitors.checkpoints.update(entry_cycles, force=True)
+            for path in [trace_path, state_path]:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+            return entry_cycles
+        return 0
+
+    def store(self, key, cycles, monitors):
+        """Store the traces and network state of a run of cycles cycles.
+
+        The files are written under temporary names and then renamed, so
+        that other processes sharing the directory never read part of a run.
+        Runs are then evicted if the cache is over its size cap.
+        """
+        temporary_suffix = ".{}.tmp".format(os.getpid())
+        [trace_path, state_path] = self.get_paths(key, cycles)
+        try:
+            save_monitors(trace_path + temporary_suffix, monitors)
+            with open(state_path + temporary_suffix, "wb") as state_file:
+                state_file.write(monitors.network.snapshot())
+            os.replace(state_path + temporary_suffix, state_path)
+            os.replace(trace_path + temporary_suffix, trace_path)
+        finally:
+            for path in [trace_path, state_path]:
+                if os.path.exists(path + temporary_suffix):
+                    os.remove(path + temporary_suffix)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used runs until under the size cap."""
+        entries = {}  # {(key, cycles): [last use, size, paths]}
+        for file_name in os.listdir(self.directory):
+            match = entry_pattern.match(file_name)
+            if match is None:
+                continue
+            path = os.path.join(self.directory, file_name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entry = entries.setdefault((match.group(1), int(match.group(2))),
+                                       [0, 0, []])
+            entry[0] = max(entry[0], status.st_mtime_ns)
+            entry[1] += status.st_size
+            entry[2].append(path)
+
+        total = sum(entry[1] for entry in entries.values())
+        for last_use, size, paths in sorted(entries.values()):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def get_entries(self):
+        """Return a list of [key, cycles] for every cached run."""
+        entries = []
+        for file_name in os.listdir(self.directory):
+            match = entry_pattern.match(file_name)
+            if match is not None and match.group(3) == "trace":
+                entries.append([match.group(1), int(match.group(2))])
+        return entries
+
+    def get_paths(self, key, cycles):
+        """Return the trace archive and state file paths of a run."""
+        stem = os.path.join(self.directory, "{}-{}".format(key, cycles))
+        return [stem + ".trace", stem + ".state"]
@@ -61,12 +61,14 @@ class Scanner:
 
         self.symbol_type_list = [
             "COMMA", "SEMICOLON", "EQUALS", "KEYWORD", "NUMBER", "NAME",
-            "DOT", "DEVICE", "GATE", "PARAM", "DTYPE_INPUT", "DTYPE_OUTPUT", "EOF"
+            "DOT", "DEVICE", "GATE", "PARAM", "DTYPE_INPUT", "DTYPE_OUTPUT", "EOF",
+            "STAR"
         ]
 
         self.COMMA, self.SEMICOLON, self.EQUALS, self.KEYWORD, self.NUMBER, \
         self.NAME, self.DOT, self.DEVICE, self.GATE, self.PARAM, \
-        self.DTYPE_INPUT, self.DTYPE_OUTPUT, self.EOF = self.symbol_type_list
+        self.DTYPE_INPUT, self.DTYPE_OUTPUT, self.EOF, \
+        self.STAR = self.symbol_type_list
 
         self.keywords_list = ["DEFINE", "AS", "WITH", "CONNECT", "MONITOR", "END"]
         self.param_list = ["inputs", "initial", "cycle_rep", "rc_cycles"]
@@ -172,7 +174,8 @@ class Scanner:
             "=": self.EQUALS,
             ",": self.COMMA,
             ".": self.DOT,
-            ";": self.SEMICOLON
+            ";": self.SEMICOLON,
+            "*": self.STAR
         }
         
         type_mapping = {
@@ -0,0 +1,63 @@
+"""Define the signal codes and the lookup tables of the signal algebra.
+
+Used in the Logic Simulator project to update, invert and evaluate signals
+by table lookups instead of branches, in the network and in the modules
+that read its traces.
+
+A signal is one of five codes. LOW and HIGH are settled levels, RISING and
+FALLING are edges that settle to HIGH and LOW in the next iteration, and
+BLANK marks cycles with no recorded value in traces.
+
+Functions
+---------
+gate_target - returns the target output of a logic gate.
+"""
+
+SIGNAL_TYPES = [LOW, HIGH, RISING, FALLING, BLANK] = range(5)
+
+# TRANSITIONS[signal][target] is the signal updated towards the target
+# level, LOW (0) or HIGH (1); index with target != LOW for any other target,
+# which counts as HIGH. A signal that cannot be updated gives None
+TRANSITIONS = {
+    LOW: (LOW, RISING),
+    HIGH: (FALLING, HIGH),
+    RISING: (FALLING, HIGH),
+    FALLING: (LOW, RISING),
+    BLANK: (None, None),
+}
+
+# INVERSE[level] is the inverse of a settled level
+INVERSE = {LOW: HIGH, HIGH: LOW}
+
+# Maps a signal code to its logic level: HIGH and RISING are 1, as the
+# signal is settled at the new level by the end of the cycle. Used with
+# bytes.translate on traces
+LEVEL_TABLE = bytes([1 if signal in [HIGH, RISING] else 0
+                     for signal in range(256)])
+
+# GATE_RULES[kind] is the pair (x, y) of a gate: if all its inputs are x,
+# its output is y, else the inverse of y. XOR has no such rule
+GATE_RULES = {
+    "AND": (HIGH, HIGH),
+    "OR": (LOW, LOW),
+    "NAND": (HIGH, LOW),
+    "NOR": (LOW, HIGH),
+    "XOR": (None, None),
+}
+
+
+def gate_target(x, y, input_signals):
+    """Return the target output of a logic gate from its input signals.
+
+    The rule is: if all inputs are x, the output is y, else the inverse of
+    y. A rule of x = y = None is XOR, which is HIGH if its two inputs
+    differ.
+    """
+    if x is None:
+        if input_signals[0] == input_signals[1]:
+            return LOW
+        return HIGH
+    for input_signal in input_signals:
+        if input_signal != x:
+            return INVERSE[y]
+    return y
@@ -0,0 +1,576 @@
+"""Run the simulator in a separate process with shared-memory traces.
+
+Used in the Logic Simulator project so that the GUI can keep rendering
+while the simulation uses another processor core, free of the GIL.
+
+The engine process parses the definition file itself and owns its own
+Network and Monitors, which record the full traces and take checkpoints as
+in the GUI process. Commands are sent over a pipe and the latest cycles of
+every trace are published through one multiprocessing.shared_memory block
+laid out as:
+
+    header        cycles completed, first cycle held, number of outputs,
+                  running flag
+    net values    the current signal of every output, one byte each
+    trace slots   slot_count rings of capacity bytes, one per monitor
+
+Cycle c of a trace is held at position c % capacity of its ring, so runs
+are not limited by the capacity. The engine writes the signals of a chunk
+of cycles into the rings and only then updates the cycle count in the
+header, so the held cycles below the published count can be read without
+locks. Before overwriting the oldest cycles it moves the first cycle held
+on, and readers check it again after reading. Older cycles are fetched
+from the engine's Monitors when it is idle.
+
+Classes
+-------
+SimulationEngine - runs commands in the engine process.
+EngineProcess - starts the engine process and sends it commands.
+
+Functions
+---------
+run_engine - entry point of the engine process.
+write_ring - writes the signals of consecutive cycles into a ring.
+read_ring - reads the signals of consecutive cycles from a ring.
+"""
+
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from periodicity import PeriodDetector
+from stimulus import Stimulus
+from watchpoints import Watchpoints
+
+# Cycles completed, first cycle held, number of outputs, running flag
+HEADER_FORMAT = "<qqII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# The statuses of Monitors.run_cycles
+[COMPLETED, CANCELLED, OSCILLATING, WATCH_FIRED] = range(4)
+
+
+def run_engine(path, connection, memory_name, slot_count, capacity,
+               chunk_cycles):
+    """Parse the definition file and serve commands until told to quit."""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        engine = SimulationEngine(path, connection, memory.buf, slot_count,
+                                  capacity, chunk_cycles)
+        engine.serve()
+    finally:
+        memory.close()
+
+
+def write_ring(buffer, offset, capacity, start, data):
+    """Write the signals of cycles start onwards into the ring at offset.
+
+    data must not be longer than capacity.
+    """
+    position = start % capacity
+    first_part = min(len(data), capacity - position)
+    buffer[offset + position:offset + position + first_part] = \
+        data[:first_part]
+    buffer[offset:offset + len(data) - first_part] = data[first_part:]
+
+
+def read_ring(buffer, offset, capacity, start, stop):
+    """Return the signals of cycles start to stop - 1 from the ring at offset.
+
+    stop - start must not be more than capacity.
+    """
+    position = start % capacity
+    end = position + stop - start
+    if end <= capacity:
+        return bytes(buffer[offset + position:offset + end])
+    return bytes(buffer[offset + position:offset + capacity]) + \
+        bytes(buffer[offset:offset + end - capacity])
+
+
+class SimulationEngine:
+
+    """Run commands in the engine process.
+
+    Parameters
+    ----------
+    path: path of the definition file.
+    connection: engine end of the command pipe.
+    buffer: memoryview of the shared memory block.
+    slot_count: maximum number of monitors.
+    capacity: number of cycles held per trace slot.
+    chunk_cycles: number of cycles between publications of the cycle count.
+
+    Public methods
+    --------------
+    serve(self): Receives and runs commands until told to quit.
+
+    publish(self, running=True): Publishes the net values and the number of
+                                 completed cycles.
+
+    add_slot(self, device_id, output_id): Gives a monitor a free trace slot.
+
+    write_traces(self, cycle): Copies the recorded cycles up to cycle to the
+                               trace slots.
+
+    step(self, cycle): Publishes the traces every chunk_cycles cycles.
+
+    run(self, cycles, cold_start): Simulates the network, publishing traces.
+
+    make_monitor(self, signal_name): Adds a monitor in a free trace slot.
+
+    remove_monitor(self, signal_name): Removes a monitor and frees its slot.
+
+    get_trace(self, signal_name, start, stop): Returns the recorded signals
+                                               of a monitor.
+
+    set_stimulus(self, events): Replaces the switch events of the stimulus.
+
+    set_watches(self, expressions): Replaces the watch expressions.
+
+    set_switch(self, signal_name, value): Sets the state of a switch.
+
+    set_seed(self, seed): Seeds the power-up state of cold starts.
+    """
+
+    def __init__(self, path, connection, buffer, slot_count, capacity,
+                 chunk_cycles):
+        """Parse the definition file and lay out the shared buffer."""
+        self.connection = connection
+        self.buffer = buffer
+        self.slot_count = slot_count
+        self.capacity = capacity
+        self.chunk_cycles = chunk_cycles
+
+        self.names = Names()
+        self.devices = Devices(self.names)
+        self.network = Network(self.names, self.devices)
+        self.monitors = Monitors(self.names, self.devices, self.network)
+        parser = Parser(self.names, self.devices, self.network, self.monitors,
+                        Scanner(path, self.names))
+        self.parsed = parser.parse_network()
+        self.stimulus = Stimulus(self.names, self.devices)
+        self.watchpoints = Watchpoints(self.names, self.devices)
+
+        self.output_refs = []  # [(device.outputs, output_id)] in net order
+        for device in self.devices.devices_list:
+            for output_id in device.outputs:
+                self.output_refs.append((device.outputs, output_id))
+        self.net_start = HEADER_SIZE
+        self.trace_start = HEADER_SIZE + len(self.output_refs)
+
+        self.cycles_completed = 0
+        self.first_cycle = 0  # first cycle held in the trace slots
+        self.next_publish = 0  # cycle of the next publication during a run
+        self.slots = {}  # {(device_id, output_id): slot}
+        for device_id, output_id in list(self.monitors.monitors_dictionary):
+            self.add_slot(device_id, output_id)
+        self.publish(running=False)
+
+    def serve(self):
+        """Receive and run commands until told to quit."""
+        if not self.parsed:
+            self.connection.send(("error", "definition file has errors"))
+            return
+        self.connection.send(("ok", [
+            (self.devices.get_signal_name(device_id, output_id), slot)
+            for (device_id, output_id), slot in self.slots.items()]))
+
+        commands = {"run": self.run, "make_monitor": self.make_monitor,
+                    "remove_monitor": self.remove_monitor,
+                    "get_trace": self.get_trace,
+                    "set_switch": self.set_switch, "set_seed": self.set_seed,
+                    "set_stimulus": self.set_stimulus,
+                    "set_watches": self.set_watches}
+        while True:
+            command, arguments = self.connection.recv()
+            if command == "quit":
+                return
+            if command == "cancel":  # the run it was meant for has ended
+                continue
+            reply = commands[command](*arguments)
+            self.connection.send(("ok", reply))
+
+    def publish(self, running=True):
+        """Publish the net values and the number of completed cycles."""
+        self.buffer[self.net_start:self.trace_start] = bytes(
+            [outputs[output_id] for outputs, output_id in self.output_refs])
+        struct.pack_into(HEADER_FORMAT, self.buffer, 0, self.cycles_completed,
+                         self.first_cycle, len(self.output_refs), running)
+
+    def add_slot(self, device_id, output_id):
+        """Give a monitor a free trace slot.
+
+        The monitor is also made in the engine's Monitors, which record it.
+        Its held cycles from before the current cycle are reconstructed from
+        the checkpoints, see Monitors.get_signal_trace. Return the slot, or
+        None if all slots are taken.
+        """
+        free_slots = set(range(self.slot_count)) - set(self.slots.values())
+        if not free_slots:
+            self.monitors.remove_monitor(device_id, output_id)
+            return None
+        slot = min(free_slots)
+        self.slots[(device_id, output_id)] = slot
+        self.monitors.make_monitor(device_id, output_id,
+                                   self.cycles_completed)
+        signal_list = self.monitors.get_signal_trace(
+            device_id, output_id, self.first_cycle, self.cycles_completed)
+        write_ring(self.buffer, self.trace_start + slot * self.capacity,
+                   self.capacity, self.first_cycle, bytes(signal_list))
+        return slot
+
+    def write_traces(self, cycle):
+        """Copy the cycles recorded since the last publication to the slots.
+
+        cycle becomes the number of completed cycles, to be published.
+        """
+        first_cycle = max(self.first_cycle, cycle - self.capacity)
+        if first_cycle > self.first_cycle:
+            # Let readers know before overwriting the oldest cycles
+            self.first_cycle = first_cycle
+            self.publish()
+        start = max(self.cycles_completed, first_cycle)
+        for (device_id, output_id), slot in self.slots.items():
+            signal_list = self.monitors.monitors_dictionary[(device_id,
+                                                             output_id)]
+            write_ring(self.buffer, self.trace_start + slot * self.capacity,
+                       self.capacity, start, bytes(signal_list[start:cycle]))
+        self.cycles_completed = cycle
+
+    def step(self, cycle):
+        """Publish the traces every chunk_cycles cycles during a run.
+
+        Called by Monitors.run_cycles before every cycle. Return True to
+        stop the run if a cancel command has been received.
+        """
+        if cycle < self.next_publish:
+            return False
+        self.next_publish = cycle + self.chunk_cycles
+        self.write_traces(cycle)
+        self.publish()
+        return self.connection.poll() and \
+            self.connection.recv()[0] == "cancel"
+
+    def run(self, cycles, cold_start):
+        """Simulate the network for a number of cycles, publishing traces.
+
+        A cold start begins again from cycle 0. The cycles are simulated by
+        Monitors.run_cycles, with the same stimulus, watch expressions,
+        checkpoints and extrapolation of periodic states as in the GUI
+        process. The engine stops early if it receives a cancel command.
+        Return [status, fired], where fired lists the watch expressions
+        that became true.
+        """
+        if cold_start:
+            self.cycles_completed = 0
+            self.first_cycle = 0
+            self.devices.cold_startup()
+            self.monitors.reset_monitors()
+            self.watchpoints.reset()
+            self.stimulus.reset()
+        self.publish()
+        self.next_publish = self.cycles_completed + self.chunk_cycles
+        detector = PeriodDetector(self.network, self.monitors)
+        [cycle, status, fired] = self.monitors.run_cycles(
+            self.cycles_completed, self.cycles_completed + cycles,
+            self.stimulus, self.watchpoints, detector, callback=self.step)
+        self.write_traces(cycle)
+        self.publish(running=False)
+        return [status, fired]
+
+    def make_monitor(self, signal_name):
+        """Add a monitor on the named signal in a free trace slot.
+
+        Return the slot, or None if the signal cannot be monitored.
+        """
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        device = self.devices.get_device(device_id)
+        if device is None or output_id not in device.outputs:
+            return None
+        if (device_id, output_id) in self.slots:
+            return self.slots[(device_id, output_id)]
+        return self.add_slot(device_id, output_id)
+
+    def remove_monitor(self, signal_name):
+        """Remove the monitor on the named signal.
+
+        Return True if successful.
+        """
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        self.monitors.remove_monitor(device_id, output_id)
+        return self.slots.pop((device_id, output_id), None) is not None
+
+    def get_trace(self, signal_name, start, stop):
+        """Return the signals of the named monitor for start to stop - 1.
+
+        Cycles from before the monitor was added are reconstructed, see
+        Monitors.get_signal_trace. Return None if there is no such monitor.
+        """
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        return self.monitors.get_signal_trace(device_id, output_id, start,
+                                              stop)
+
+    def set_switch(self, signal_name, value):
+        """Set the named switch to value. Return True if successful."""
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        return self.devices.set_switch(device_id, value)
+
+    def set_seed(self, seed):
+        """Seed the power-up state of cold starts, see Devices.set_seed."""
+        self.devices.set_seed(seed)
+        return True
+
+    def set_stimulus(self, events):
+        """Replace the switch events of the stimulus.
+
+        events is a list of [cycle, switch name, value, period, until]. The
+        events due before the current cycle are skipped, so the next run
+        carries on from there. Return True if every switch exists.
+        """
+        self.stimulus.clear()
+        success = True
+        for cycle, switch_name, value, period, until in events:
+            success = self.stimulus.add_event(
+                cycle, self.names.query(switch_name), value, period,
+                until) and success
+        self.stimulus.skip(self.cycles_completed)
+        return success
+
+    def set_watches(self, expressions):
+        """Replace the watch expressions. Return True if all are valid."""
+        self.watchpoints.remove_all()
+        return all([self.watchpoints.add_watch(expression) ==
+                    self.watchpoints.NO_ERROR for expression in expressions])
+
+
+class EngineProcess:
+
+    """Start the engine process and send it commands.
+
+    An EngineProcess can stand in for a monitors.Monitors() instance when
+    plotting, as it provides monitors_dictionary, devices and
+    get_signal_trace. Runs are started without waiting, and poll() reports
+    when they end; all other commands wait for their reply, so they must
+    not be sent during a run.
+
+    The shared memory holds the latest capacity cycles of every monitor.
+    Older cycles are fetched from the engine between runs, and are BLANK
+    during a run.
+
+    Parameters
+    ----------
+    path: path of the definition file.
+    names: instance of the names.Names() class, parsed from the same file.
+    devices: instance of the devices.Devices() class, parsed from the same
+             file, used to name signals.
+    slot_count: maximum number of monitors.
+    capacity: number of cycles held in the shared memory per monitor.
+    chunk_cycles: number of cycles between publications of the cycle count.
+
+    Public methods
+    --------------
+    command(self, command, *arguments): Sends a command and returns the
+                                        engine's reply.
+
+    start_run(self, cycles, cold_start=True): Starts a run without waiting.
+
+    poll(self): Returns the status of a finished run, or None, and keeps
+                the watch expressions that fired in fired.
+
+    wait(self, timeout=None): Waits for the run to finish and returns its
+                              status.
+
+    cancel(self): Asks the engine to stop the current run.
+
+    get_cycles(self): Returns the number of completed cycles.
+
+    get_signal_trace(self, device_id, output_id, start=0, stop=None,
+                     replay=True): Returns the recorded signals of a monitor.
+
+    get_net_values(self): Returns the current signal of every output.
+
+    make_monitor(self, device_id, output_id): Adds a monitor.
+
+    remove_monitor(self, device_id, output_id): Removes a monitor.
+
+    set_switch(self, device_id, value): Sets the state of a switch.
+
+    set_seed(self, seed): Seeds the power-up state of cold starts.
+
+    set_stimulus(self, stimulus): Copies the switch events of a stimulus.
+
+    set_watches(self, expressions): Replaces the watch expressions.
+
+    close(self): Stops the engine process and frees the shared memory.
+    """
+
+    def __init__(self, path, names, devices, slot_count=16,
+                 capacity=1 << 20, chunk_cycles=1000):
+        """Create the shared memory and start the engine process.
+
+        Raise ValueError if the engine cannot parse the definition file.
+        """
+        self.names = names
+        self.devices = devices
+        self.capacity = capacity
+
+        self.net_list = []  # [(device_id, output_id)] in net order
+        for device in devices.devices_list:
+            for output_id in device.outputs:
+                self.net_list.append((device.device_id, output_id))
+        self.trace_start = HEADER_SIZE + len(self.net_list)
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=self.trace_start + slot_count * capacity)
+
+        self.connection, engine_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=run_engine, daemon=True,
+            args=(path, engine_connection, self.memory.name, slot_count,
+                  capacity, chunk_cycles))
+        self.process.start()
+        self.running = False
+        self.fired = []  # watch expressions that stopped the last run
+
+        reply, value = self.connection.recv()
+        if reply != "ok":
+            self.close()
+            raise ValueError(value)
+        self.monitors_dictionary = {}  # {(device_id, output_id): slot}
+        for signal_name, slot in value:
+            key = tuple(devices.get_signal_ids(signal_name))
+            self.monitors_dictionary[key] = slot
+
+    def command(self, command, *arguments):
+        """Send a command and return the engine's reply."""
+        if self.running:
+            raise RuntimeError("the engine is running")
+        self.connection.send((command, arguments))
+        return self.connection.recv()[1]
+
+    def start_run(self, cycles, cold_start=True):
+        """Start simulating for a number of cycles without waiting."""
+        if self.running:
+            raise RuntimeError("the engine is running")
+        self.connection.send(("run", (cycles, cold_start)))
+        self.running = True
+
+    def poll(self):
+        """Return the status of the run if it has finished, or None."""
+        if self.running and self.connection.poll():
+            self.running = False
+            [status, self.fired] = self.connection.recv()[1]
+            return status
+        return None
+
+    def wait(self, timeout=None):
+        """Wait for the run to finish and return its status, or None."""
+        if self.running and self.connection.poll(timeout):
+            return self.poll()
+        return None
+
+    def cancel(self):
+        """Ask the engine to stop the current run."""
+        if self.running:
+            self.connection.send(("cancel", ()))
+
+    def get_cycles(self):
+        """Return the number of cycles published by the engine."""
+        return struct.unpack_from(HEADER_FORMAT, self.memory.buf)[0]
+
+    def get_signal_trace(self, device_id, output_id, start=0, stop=None,
+                         replay=True):
+        """Return the recorded signals of a monitor for start to stop - 1.
+
+        Cycles no longer held in the shared memory are fetched from the
+        engine if it is idle and replay is True, and are BLANK otherwise.
+        Return None if the monitor does not exist.
+        """
+        if (device_id, output_id) not in self.monitors_dictionary:
+            return None
+        [cycles, first_cycle] = struct.unpack_from(HEADER_FORMAT,
+                                                   self.memory.buf)[:2]
+        if stop is None or stop > cycles:
+            stop = cycles
+        if stop <= start:
+            return []
+        held = min(max(start, first_cycle), stop)
+        signal_list = [self.devices.BLANK] * (held - start)
+        if signal_list and replay and not self.running:
+            signal_name = self.devices.get_signal_name(device_id, output_id)
+            signal_list = self.command("get_trace", signal_name, start, held)
+        offset = self.trace_start + \
+            self.monitors_dictionary[(device_id, output_id)] * self.capacity
+        held_list = list(read_ring(self.memory.buf, offset, self.capacity,
+                                   held, stop))
+        # Cycles overwritten by the engine while they were read are BLANK
+        first_cycle = struct.unpack_from(HEADER_FORMAT, self.memory.buf)[1]
+        overwritten = min(max(first_cycle - held, 0), len(held_list))
+        held_list[:overwritten] = [self.devices.BLANK] * overwritten
+        return signal_list + held_list
+
+    def get_net_values(self):
+        """Return {(device_id, output_id): signal} for every output."""
+        values = self.memory.buf[HEADER_SIZE:self.trace_start]
+        return dict(zip(self.net_list, values))
+
+    def make_monitor(self, device_id, output_id):
+        """Add a monitor in the engine. Return True if successful."""
+        slot = self.command("make_monitor", self.devices.get_signal_name(
+            device_id, output_id))
+        if slot is None:
+            return False
+        self.monitors_dictionary[(device_id, output_id)] = slot
+        return True
+
+    def remove_monitor(self, device_id, output_id):
+        """Remove a monitor from the engine. Return True if successful."""
+        if self.monitors_dictionary.pop((device_id, output_id), None) is None:
+            return False
+        return self.command("remove_monitor", self.devices.get_signal_name(
+            device_id, output_id))
+
+    def set_switch(self, device_id, value):
+        """Set a switch in the engine. Return True if successful."""
+        return self.command("set_switch", self.devices.get_signal_name(
+            device_id, None), value)
+
+    def set_seed(self, seed):
+        """Seed the power-up state of cold starts in the engine."""
+        return self.command("set_seed", seed)
+
+    def set_stimulus(self, stimulus):
+        """Copy the switch events of a stimulus.Stimulus() to the engine.
+
+        The events due before the engine's current cycle are skipped. Return
+        True if successful.
+        """
+        return self.command("set_stimulus", [
+            [cycle, self.devices.get_signal_name(switch_id, None), value,
+             period, until] for cycle, order, switch_id, value, period, until
+            in stimulus.events])
+
+    def set_watches(self, expressions):
+        """Replace the watch expressions of the engine.
+
+        Return True if they are all valid.
+        """
+        return self.command("set_watches", list(expressions))
+
+    def close(self):
+        """Stop the engine process and free the shared memory."""
+        if self.process.is_alive():
+            self.cancel()
+            self.running = False
+            self.connection.send(("quit", ()))
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,141 @@
+"""Run the simulation on a background thread.
+
+Used in the Logic Simulator project to keep the GUI responsive during long
+runs, with progress reports and a way to cancel.
+
+Classes
+-------
+SimulationWorker - simulates the network for a number of cycles on a thread.
+"""
+
+import collections
+import threading
+import time
+
+from periodicity import PeriodDetector
+
+
+class SimulationWorker(threading.Thread):
+
+    """Simulate the network for a number of cycles on a background thread.
+
+    Each cycle does the same work as the command line interface, see
+    Monitors.run_cycles: apply the stimulus, take a checkpoint if one is
+    due, execute the network, record the monitors and check the watch
+    expressions, or extrapolate periodic states if there are none.
+
+    Completed trace chunks are handed to the plotting code without locks:
+    the monitor traces are only ever appended to, and every chunk_cycles
+    cycles the worker appends the number of completed cycles to the chunks
+    deque. The plotting code pops these counts and only reads traces up to
+    the latest one, which are complete.
+
+    Callbacks are made from the worker thread, so a GUI should pass
+    functions that forward to its main thread, e.g. using wx.CallAfter.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    watchpoints: instance of the watchpoints.Watchpoints() class.
+    cycles: number of cycles to simulate.
+    start_cycle: number of cycles completed before this run.
+    progress_callback: called with the number of completed cycles, at most
+                       once every progress_interval seconds.
+    done_callback: called with the status and the list of watch expressions
+                   that fired when the worker stops. If the run raises an
+                   exception, the status is FAILED and the exception is kept
+                   in error.
+    chunk_cycles: number of cycles per trace chunk handed to the plot.
+    progress_interval: minimum time in seconds between progress reports.
+    stimulus: instance of the stimulus.Stimulus() class whose switch events
+              are applied during the run, or None.
+
+    Public methods
+    --------------
+    run(self): Simulates the network; called by start() on the new thread.
+
+    step(self, cycle): Hands over chunks and reports progress; called
+                       before every cycle.
+
+    cancel(self): Asks the worker to stop at the end of the current cycle.
+    """
+
+    def __init__(self, network, monitors, watchpoints, cycles, start_cycle,
+                 progress_callback=None, done_callback=None,
+                 chunk_cycles=1000, progress_interval=0.1, stimulus=None):
+        """Initialise the worker and its chunk deque."""
+        super().__init__(daemon=True)
+        self.network = network
+        self.monitors = monitors
+        self.watchpoints = watchpoints
+        self.cycles = cycles
+        self.start_cycle = start_cycle
+        self.progress_callback = progress_callback
+        self.done_callback = done_callback
+        self.chunk_cycles = chunk_cycles
+        self.progress_interval = progress_interval
+        self.stimulus = stimulus
+
+        [self.COMPLETED, self.CANCELLED, self.OSCILLATING,
+         self.WATCH_FIRED] = [monitors.COMPLETED, monitors.CANCELLED,
+                              monitors.OSCILLATING, monitors.WATCH_FIRED]
+        self.FAILED = 4  # after the statuses of Monitors.run_cycles
+
+        self.cycles_completed = start_cycle
+        self.chunks = collections.deque()  # completed cycle counts
+        self.status = None
+        self.fired = []
+        self.error = None  # exception that ended the run with FAILED
+        self.last_report = None  # time of the last progress report
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Ask the worker to stop at the end of the current cycle."""
+        self.cancel_event.set()
+
+    def step(self, cycle):
+        """Hand over chunks and report progress before simulating a cycle.
+
+        Called by Monitors.run_cycles. Return True to stop the run if the
+        worker has been cancelled.
+        """
+        if cycle // self.chunk_cycles > \
+                self.cycles_completed // self.chunk_cycles:
+            self.chunks.append(cycle)
+        self.cycles_completed = cycle
+        if self.progress_callback is not None and \
+                time.monotonic() - self.last_report >= self.progress_interval:
+            self.last_report = time.monotonic()
+            self.progress_callback(cycle)
+        return self.cancel_event.is_set()
+
+    def run(self):
+        """Simulate the network for the given number of cycles."""
+        # The done callback is always made, so a GUI never stays running
+        try:
+            # Reconstruct the history of monitors added since the last run
+            # now, before the plotting code reads it and the network state
+            # moves on
+            for device_id, output_id in list(
+                    self.monitors.monitors_dictionary):
+                self.monitors.get_signal_trace(device_id, output_id, 0,
+                                               self.start_cycle)
+            self.last_report = time.monotonic()
+            detector = PeriodDetector(self.network, self.monitors)
+            [self.cycles_completed, self.status,
+             self.fired] = self.monitors.run_cycles(
+                 self.start_cycle, self.start_cycle + self.cycles,
+                 self.stimulus, self.watchpoints, detector,
+                 callback=self.step)
+        except Exception as error:
+            self.status = self.FAILED
+            self.error = error
+        finally:
+            if self.status is None:
+                self.status = self.FAILED  # e.g. interrupted
+            if self.progress_callback is not None:
+                self.progress_callback(self.cycles_completed)
+            self.chunks.append(self.cycles_completed)
+            if self.done_callback is not None:
+                self.done_callback(self.status, self.fired)
@@ -0,0 +1,189 @@
+"""Read stimulus files and apply their switch changes during a run.
+
+Used in the Logic Simulator project to change switches at given cycles
+without stopping the simulation.
+
+A stimulus file lists one event per line as "cycle switch value", e.g.
+
+    # Release the reset after 10 cycles
+    0 RESET 1
+    10 RESET 0
+    # Drive a 1 in every 8 cycles on the enable, up to cycle 1000
+    0 EN 1 EVERY 8 UNTIL 1000
+    1 EN 0 EVERY 8
+
+An event followed by "EVERY period" repeats every period cycles, and
+"UNTIL cycle" stops it before the given cycle. Text after a "#" is a
+comment.
+
+Classes
+-------
+Stimulus - stores switch events and applies them as the cycles pass.
+"""
+
+import heapq
+
+
+class Stimulus:
+
+    """Store switch events and apply them as the cycles pass.
+
+    Pending events are kept in a heap ordered by cycle, with events of the
+    same cycle in file order. A repeating event is pushed back with its next
+    cycle once applied, so a long pattern never has to be expanded. The
+    simulation loop only has to compare the current cycle with the cycle of
+    the next event.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+
+    Public methods
+    --------------
+    load(self, path): Reads the events of a stimulus file.
+
+    add_event(self, cycle, switch_id, value, period=None, until=None): Adds a
+                  switch event, repeating every period cycles if given.
+
+    clear(self): Deletes all events.
+
+    reset(self): Starts applying the events from cycle 0 again.
+
+    skip(self, cycle): Drops the events due before the given cycle without
+                       applying them.
+
+    next_cycle(self): Returns the cycle of the next event to apply.
+
+    apply(self, cycle): Applies the events due by the given cycle and returns
+                        the cycle of the next event.
+    """
+
+    def __init__(self, names, devices):
+        """Initialise the event lists and stimulus errors."""
+        self.names = names
+        self.devices = devices
+
+        # events holds [cycle, order, switch_id, value, period, until] for
+        # every event added, queue holds the pending events as a heap
+        self.events = []
+        self.queue = []
+        self.error_line = None  # line number of the last load error
+
+        [self.NO_ERROR, self.SYNTAX_ERROR,
+         self.NOT_SWITCH] = self.names.unique_error_codes(3)
+
+    def load(self, path):
+        """Read the events of the stimulus file at path.
+
+        Return NO_ERROR if successful, or the corresponding error if not, with
+        the line number of the error in error_line.
+        """
+        with open(path) as stimulus_file:
+            lines = stimulus_file.readlines()
+        for line_number, line in enumerate(lines, 1):
+            self.error_line = line_number
+            words = line.split("#")[0].split()
+            if not words:
+                continue
+            event = self.read_event(words)
+            if event is None:
+                return self.SYNTAX_ERROR
+            [cycle, switch_name, value, period, until] = event
+            switch_id = self.names.query(switch_name)
+            if not self.add_event(cycle, switch_id, value, period, until):
+                return self.NOT_SWITCH
+        self.error_line = None
+        return self.NO_ERROR
+
+    @staticmethod
+    def read_event(words):
+        """Return [cycle, switch name, value, period, until] from the words.
+
+        Return None if the words are not a valid event.
+        """
+        if len(words) not in [3, 5, 7] or not words[0].isdigit() or \
+                words[2] not in ["0", "1"]:
+            return None
+        numbers = words[4::2]
+        if [keyword.upper() for keyword in words[3::2]] != \
+                ["EVERY", "UNTIL"][:len(numbers)] or \
+                not all(number.isdigit() for number in numbers):
+            return None
+        [period, until] = [int(number) for number in numbers] + \
+            [None] * (2 - len(numbers))
+        if period == 0:
+            return None
+        return [int(words[0]), words[1], int(words[2]), period, until]
+
+    def add_event(self, cycle, switch_id, value, period=None, until=None):
+        """Add an event setting the switch to value at the start of cycle.
+
+        The event repeats every period cycles if period is given, before the
+        until cycle if that is given. Return True if successful.
+        """
+        device = None
+        if switch_id is not None:
+            device = self.devices.get_device(switch_id)
+        if device is None or device.device_kind != self.devices.SWITCH:
+            return False
+        if until is not None and cycle >= until:
+            return True  # the event never happens
+        event = [cycle, len(self.events), switch_id, value, period, until]
+        self.events.append(event)
+        heapq.heappush(self.queue, list(event))
+        return True
+
+    def clear(self):
+        """Delete all events."""
+        self.events = []
+        self.queue = []
+
+    def reset(self):
+        """Start applying the events from cycle 0 again."""
+        self.queue = [list(event) for event in self.events]
+        heapq.heapify(self.queue)
+
+    def skip(self, cycle):
+        """Drop the events due before the given cycle without applying them.
+
+        Repeating events move on to their first repeat at or after cycle.
+        """
+        queue = self.queue
+        while queue and queue[0][0] < cycle:
+            event = queue[0]
+            [event_cycle, order, switch_id, value, period, until] = event
+            if period is None:
+                heapq.heappop(queue)
+                continue
+            event[0] = event_cycle + period * -((event_cycle - cycle) // period)
+            if until is not None and event[0] >= until:
+                heapq.heappop(queue)
+            else:
+                heapq.heapreplace(queue, event)
+
+    def next_cycle(self):
+        """Return the cycle of the next event, or None if there are none."""
+        if self.queue:
+            return self.queue[0][0]
+        return None
+
+    def apply(self, cycle):
+        """Apply every event due at or before the start of the given cycle.
+
+        Return the cycle of the next event, or None if there are no more.
+        """
+        queue = self.queue
+        while queue and queue[0][0] <= cycle:
+            event = queue[0]
+            [event_cycle, order, switch_id, value, period, until] = event
+            self.devices.set_switch(switch_id, value)
+            if period is None:
+                heapq.heappop(queue)
+                continue
+            event[0] = event_cycle + period
+            if until is not None and event[0] >= until:
+                heapq.heappop(queue)
+            else:
+                heapq.heapreplace(queue, event)
+        return self.next_cycle()
@@ -0,0 +1,249 @@
+"""Simulate a circuit at many parameter points on several processes.
+
+Used in the Logic Simulator project to characterise a design over a range
+of clock half periods (cycle_rep), RC durations (rc_cycles) and switch
+initial states, parsing the definition file only once.
+
+The parsed circuit is pickled once and handed to every worker process when
+it starts. For each parameter point a worker unpickles a fresh copy of the
+circuit, applies the overrides of the point, cold starts it and simulates
+it, so the points are independent of each other and of the worker that ran
+them, and the throughput grows with the number of processes.
+
+Classes
+-------
+Sweep - simulates a circuit at many parameter points in a process pool.
+
+Functions
+---------
+simulate_point - simulates one parameter point in a worker process.
+run_sweep - runs the sweep given on the command line and prints a table.
+"""
+
+import concurrent.futures
+import functools
+import itertools
+import operator
+import os
+import pickle
+import sys
+
+from batch import parse_circuit, EXIT_OK, EXIT_ERROR
+from periodicity import PeriodDetector
+from signals import LEVEL_TABLE
+
+[COMPLETED, OSCILLATING] = range(2)
+
+circuit_data = None  # pickled circuit of the current worker process
+
+
+def load_circuit_data(data):
+    """Store the pickled circuit in a new worker process."""
+    global circuit_data
+    circuit_data = data
+
+
+def simulate_point(point, seed=None, cycles=0, keep_traces=False):
+    """Simulate one parameter point of the circuit in circuit_data.
+
+    point maps device names to their override values. If seed is given, the
+    cold start-up is seeded with it, so the run can be reproduced. Otherwise
+    the seed of the parsed circuit, if any, is used. Return a
+    dictionary holding the point, the seed, the status, the number of cycles
+    completed and the summary of every monitored signal, plus its trace if
+    keep_traces is True.
+    """
+    [names, devices, network, monitors] = pickle.loads(circuit_data)
+    for device_name, value in point.items():
+        device = devices.get_device(names.query(device_name))
+        if device.device_kind == devices.CLOCK:
+            device.clock_half_period = value
+        elif device.device_kind == devices.RC:
+            device.rc_cycles = value
+        else:
+            device.switch_state = value
+    # Reseed even without a seed, or every point would get the power-up state
+    # of the pickled generator
+    if seed is None:
+        seed = devices.seed
+    devices.set_seed(seed)
+    devices.cold_startup()
+
+    # Points are never extended by new monitors, so take no checkpoints
+    detector = PeriodDetector(network, monitors)
+    [cycles_completed, status, fired] = monitors.run_cycles(
+        0, cycles, detector=detector, checkpoint=False)
+    status = OSCILLATING if status == monitors.OSCILLATING else COMPLETED
+
+    signals = {}
+    traces = {}
+    for device_id, output_id in monitors.monitors_dictionary:
+        signal_name = devices.get_signal_name(device_id, output_id)
+        trace = monitors.get_signal_trace(device_id, output_id)
+        # RISING counts as high and FALLING as low, see signals.LEVEL_TABLE
+        levels = bytes(trace).translate(LEVEL_TABLE)
+        signals[signal_name] = {
+            "high": levels.count(1),
+            "transitions": sum(map(operator.ne, levels, levels[1:])),
+            "final": trace[-1] if trace else None}
+        if keep_traces:
+            traces[signal_name] = list(trace)
+
+    result = {"point": dict(point), "seed": seed, "status": status,
+              "cycles": cycles_completed, "signals": signals}
+    if keep_traces:
+        result["traces"] = traces
+    return result
+
+
+class Sweep:
+
+    """Simulate a circuit at many parameter points in a process pool.
+
+    A parameter point is a dictionary mapping device names to values: the
+    half period of a clock, the number of high cycles of an RC device, or
+    the initial state of a switch. Devices not in a point keep the values of
+    the definition file.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    check_point(self, point): Returns NO_ERROR if the point can be swept, or
+                              the corresponding error.
+
+    grid(self, parameters): Returns every combination of the given device
+                            values as a list of points.
+
+    run(self, points, cycles, processes=None, keep_traces=False,
+        seeds=None): Simulates every point and returns the results in the
+                     order of the points.
+    """
+
+    def __init__(self, names, devices, network, monitors):
+        """Initialise the circuit and sweep errors."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+
+        [self.NO_ERROR, self.NOT_PARAMETER,
+         self.BAD_VALUE] = self.names.unique_error_codes(3)
+
+    def check_point(self, point):
+        """Return NO_ERROR if every override of the point is valid.
+
+        Return NOT_PARAMETER if a name is not a clock, RC or switch, or
+        BAD_VALUE if a value is out of range for its device.
+        """
+        for device_name, value in point.items():
+            device_id = self.names.query(device_name)
+            device = None
+            if device_id is not None:
+                device = self.devices.get_device(device_id)
+            if device is None or device.device_kind not in [
+                    self.devices.CLOCK, self.devices.RC,
+                    self.devices.SWITCH]:
+                return self.NOT_PARAMETER
+            if device.device_kind == self.devices.SWITCH:
+                if value not in [self.devices.LOW, self.devices.HIGH]:
+                    return self.BAD_VALUE
+            elif not isinstance(value, int) or value <= 0:
+                return self.BAD_VALUE
+        return self.NO_ERROR
+
+    @staticmethod
+    def grid(parameters):
+        """Return every combination of the device values as a list of points.
+
+        parameters maps device names to lists of values, e.g.
+        {"clk": [2, 4], "sw1": [0, 1]} gives four points.
+        """
+        device_names = list(parameters)
+        return [dict(zip(device_names, values)) for values in
+                itertools.product(*[parameters[device_name]
+                                    for device_name in device_names])]
+
+    def run(self, points, cycles, processes=None, keep_traces=False,
+            seeds=None):
+        """Simulate every point for a number of cycles.
+
+        processes is the number of worker processes, by default one per CPU.
+        With processes=0 the points are simulated in this process. seeds
+        gives the cold start-up seed of every point. Return the
+        list of results of simulate_point, in the order of the points. Raise
+        ValueError if a point is not valid.
+        """
+        for point in points:
+            if self.check_point(point) != self.NO_ERROR:
+                raise ValueError("invalid parameter point {}".format(point))
+        data = pickle.dumps([self.names, self.devices, self.network,
+                             self.monitors])
+        simulate = functools.partial(simulate_point, cycles=cycles,
+                                     keep_traces=keep_traces)
+        if seeds is None:
+            seeds = [None] * len(points)
+        if processes == 0:
+            load_circuit_data(data)
+            return list(map(simulate, points, seeds))
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = max(min(processes, len(points)), 1)
+        # A few chunks per process keep every process busy to the end
+        chunksize = max(len(points) // (4 * processes), 1)
+        with concurrent.futures.ProcessPoolExecutor(
+                processes, initializer=load_circuit_data,
+                initargs=(data,)) as executor:
+            return list(executor.map(simulate, points, seeds,
+                                     chunksize=chunksize))
+
+
+def run_sweep(path, cycles, settings, processes=None, seed=None):
+    """Run the sweep given on the command line and print a table of results.
+
+    settings is a list of "device=value,value,..." strings, swept over every
+    combination. One comma separated line is printed per monitored signal
+    and point, every point cold started with the given seed. Return the exit
+    status, as for batch runs.
+    """
+    circuit = parse_circuit(path)
+    if circuit is None:
+        return EXIT_ERROR
+    circuit[1].set_seed(seed)
+    sweep = Sweep(*circuit)
+
+    parameters = {}
+    for setting in settings:
+        device_name, separator, values = setting.partition("=")
+        try:
+            parameters[device_name] = [int(value) for value in
+                                       values.split(",")]
+        except ValueError:
+            separator = ""
+        if not separator:
+            print("Error: expected --set device=value,value,... but got",
+                  setting, file=sys.stderr)
+            return EXIT_ERROR
+    points = sweep.grid(parameters)
+    for point in points:
+        if sweep.check_point(point) != sweep.NO_ERROR:
+            print("Error: cannot sweep", point, file=sys.stderr)
+            return EXIT_ERROR
+
+    results = sweep.run(points, cycles, processes)
+    print(",".join(list(parameters) + ["status", "cycles", "signal", "high",
+                                       "transitions", "final"]))
+    for result in results:
+        status = ["completed", "oscillating"][result["status"]]
+        for signal_name, summary in result["signals"].items():
+            print(",".join([str(value) for value in result["point"].values()] +
+                           [status, str(result["cycles"]), signal_name,
+                            str(summary["high"]), str(summary["transitions"]),
+                            str(summary["final"])]))
+    return EXIT_OK
@@ -0,0 +1,129 @@
+"""Test the activity module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from activity import Activity
+from batch import parse_circuit
+
+
+@pytest.fixture
+def new_network():
+    """Return a network with a switch driving a NAND gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1_ID, NAND1_ID, I1] = new_names.lookup(["Sw1", "Nand1", "I1"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(NAND1_ID, new_devices.NAND, 1)
+    new_network.make_connection(SW1_ID, None, NAND1_ID, I1)
+    return new_network
+
+
+def run(network, activity, switch_levels):
+    """Set Sw1 to each level in turn and simulate one cycle per level."""
+    devices = network.devices
+    [SW1_ID] = devices.names.lookup(["Sw1"])
+    for level in switch_levels:
+        devices.set_switch(SW1_ID, level)
+        assert network.execute_network()
+        activity.update()
+
+
+def test_get_statistics(new_network):
+    """Test if toggles, duty cycle, runs and change cycles are correct."""
+    new_activity = Activity(new_network.devices)
+    run(new_network, new_activity, [0, 0, 1, 1, 1, 0, 1, 1, 1, 1])
+
+    assert new_activity.get_statistics() == [
+        ["Sw1", 3, 0.7, 4, 2, 6],
+        ["Nand1", 3, 0.3, 4, 2, 6]]
+
+
+def test_constant_signals(new_network):
+    """Test if signals that never change have a single stable run."""
+    new_activity = Activity(new_network.devices)
+    run(new_network, new_activity, [0] * 5)
+
+    assert new_activity.get_statistics() == [
+        ["Sw1", 0, 0.0, 5, None, None],
+        ["Nand1", 0, 1.0, 5, None, None]]
+
+    new_activity.reset()
+    assert new_activity.get_statistics() == [
+        ["Sw1", 0, 0.0, 0, None, None],
+        ["Nand1", 0, 0.0, 0, None, None]]
+
+
+def test_display_statistics(capsys, new_network):
+    """Test if the statistics table is printed in the console."""
+    new_activity = Activity(new_network.devices)
+    run(new_network, new_activity, [0, 1, 1, 0])
+    new_activity.display_statistics()
+
+    out, _ = capsys.readouterr()
+    lines = out.split("\n")
+    assert lines[0].split() == ["Signal", "Toggles", "Duty", "Longest",
+                                "First", "Last"]
+    assert lines[1].split() == ["Sw1", "2", "50.0%", "2", "1", "3"]
+    assert lines[2].split() == ["Nand1", "2", "50.0%", "2", "1", "3"]
+    assert lines[3] == "Cycles: 4"
+
+
+def test_monitors_update_activity():
+    """Test if record_signals updates statistics without any monitors."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    [CL_ID] = names.lookup(["Clock1"])
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+
+    activity = monitors.enable_activity()
+    for _ in range(8):
+        network.execute_network()
+        monitors.record_signals()
+
+    assert monitors.monitors_dictionary == {}
+    [[name, toggles, duty_cycle, longest_run, first, last]] = \
+        activity.get_statistics()
+    assert name == "Clock1"
+    assert toggles in [3, 4]
+    assert duty_cycle == 0.5
+    assert longest_run == 2
+
+    monitors.reset_monitors()
+    assert activity.cycles == 0
+
+
+@pytest.mark.parametrize("path", ["final_ex0.txt", "final_ex2.txt",
+                                  "final_ex4.txt"])
+def test_changed_devices(path):
+    """Test if visiting only changed devices gives the full-scan results."""
+    [names, devices, network, monitors] = parse_circuit(path)
+    devices.set_seed(3)
+    devices.cold_startup()
+    activity = monitors.enable_activity()
+    full_scan = Activity(devices)
+    switches = devices.find_devices(devices.SWITCH)
+    for cycle in range(80):
+        if cycle % 9 == 0:
+            switch_id = switches[cycle // 9 % len(switches)]
+            devices.set_switch(switch_id, 1 - devices.get_device(
+                switch_id).switch_state)
+        network.execute_network()
+        full_scan.update()
+        monitors.record_signals()
+        assert not network.changed_devices
+    assert activity.get_statistics() == full_scan.get_statistics()
+
+    # Only the outputs of the devices reported are visited
+    switch = devices.get_device(switches[0])
+    devices.set_switch(switches[0], 1 - switch.switch_state)
+    network.execute_network()
+    activity.update(set())
+    full_scan.update()
+    assert activity.get_statistics() != full_scan.get_statistics()
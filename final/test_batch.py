@@ -0,0 +1,173 @@
+"""Test the batch and stimulus modules."""
+import pytest
+
+from names import Names
+from devices import Devices
+from stimulus import Stimulus
+from trace_archive import TraceReader
+from batch import run_batch, EXIT_OK, EXIT_ERROR, EXIT_OSCILLATING
+
+SWITCH_DEFINITION = """
+DEFINE
+    sw AS SWITCH WITH initial = 0,
+    and1 AS AND WITH inputs = 2;
+CONNECT
+    and1.I1 = sw,
+    and1.I2 = sw;
+MONITOR
+    and1;
+END;
+"""
+
+OSCILLATING_DEFINITION = """
+DEFINE
+    sw AS SWITCH WITH initial = 1,
+    nand1 AS NAND WITH inputs = 2;
+CONNECT
+    nand1.I1 = sw,
+    nand1.I2 = nand1;
+MONITOR
+    nand1;
+END;
+"""
+
+
+@pytest.fixture
+def switch_files(tmp_path):
+    """Return the paths of a switch circuit and a stimulus toggling it."""
+    definition = tmp_path / "circuit.txt"
+    definition.write_text(SWITCH_DEFINITION)
+    stimulus = tmp_path / "stimulus.txt"
+    stimulus.write_text("# Pulse the switch\n5 sw 0\n3 sw 1  # first\n")
+    return definition, stimulus
+
+
+def test_stimulus_apply():
+    """Test if stimulus events are applied in cycle order."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    [SW_ID, CL_ID] = new_names.lookup(["Sw1", "Clock1"])
+    new_devices.make_device(SW_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 2)
+
+    stimulus = Stimulus(new_names, new_devices)
+    assert stimulus.add_event(4, SW_ID, 0)
+    assert stimulus.add_event(2, SW_ID, 1)
+    assert not stimulus.add_event(3, CL_ID, 1)
+    assert not stimulus.add_event(3, None, 1)
+
+    switch = new_devices.get_device(SW_ID)
+    assert stimulus.apply(0) == 2
+    assert switch.switch_state == new_devices.LOW
+    assert stimulus.apply(3) == 4
+    assert switch.switch_state == new_devices.HIGH
+    assert stimulus.apply(10) is None
+    assert switch.switch_state == new_devices.LOW
+
+
+def test_stimulus_repeats(tmp_path):
+    """Test if repeating events are applied every period until they stop."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    [SW_ID] = new_names.lookup(["sw"])
+    new_devices.make_device(SW_ID, new_devices.SWITCH, 0)
+    switch = new_devices.get_device(SW_ID)
+
+    path = tmp_path / "stimulus.txt"
+    path.write_text("0 sw 1 every 4 UNTIL 10\n2 sw 0 EVERY 4\n")
+    stimulus = Stimulus(new_names, new_devices)
+    assert stimulus.load(path) == stimulus.NO_ERROR
+
+    levels = []
+    next_event = stimulus.next_cycle()
+    for cycle in range(16):
+        if cycle == next_event:
+            next_event = stimulus.apply(cycle)
+        levels.append(switch.switch_state)
+    assert levels == [1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0]
+
+    stimulus.reset()
+    stimulus.skip(5)
+    assert stimulus.next_cycle() == 6
+    assert stimulus.apply(8) == 10
+    assert switch.switch_state == new_devices.HIGH
+
+
+@pytest.mark.parametrize("text, error_name, line", [
+    ("0 sw 1\n1 sw\n", "SYNTAX_ERROR", 2),
+    ("# comment\n\nx sw 1\n", "SYNTAX_ERROR", 3),
+    ("0 sw 2\n", "SYNTAX_ERROR", 1),
+    ("0 sw 1 EVERY 0\n", "SYNTAX_ERROR", 1),
+    ("0 sw 1 UNTIL 5\n", "SYNTAX_ERROR", 1),
+    ("0 sw 1 EVERY 2 UNTIL\n", "SYNTAX_ERROR", 1),
+    ("0 and1 1\n", "NOT_SWITCH", 1),
+    ("0 nothing 1\n", "NOT_SWITCH", 1),
+])
+def test_stimulus_errors(tmp_path, text, error_name, line):
+    """Test if stimulus file errors are reported with their line."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    [SW_ID, AND_ID] = new_names.lookup(["sw", "and1"])
+    new_devices.make_device(SW_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(AND_ID, new_devices.AND, 2)
+
+    path = tmp_path / "stimulus.txt"
+    path.write_text(text)
+    stimulus = Stimulus(new_names, new_devices)
+    assert stimulus.load(path) == getattr(stimulus, error_name)
+    assert stimulus.error_line == line
+
+
+def test_batch_run(switch_files, tmp_path, capsys):
+    """Test if a batch run applies the stimulus and writes the traces."""
+    definition, stimulus = switch_files
+    out_path = tmp_path / "run.trace"
+    assert run_batch(definition, 8, stimulus, out_path) == EXIT_OK
+    assert capsys.readouterr().out == ""
+
+    reader = TraceReader(out_path)
+    assert reader.signal_names == ["and1"]
+    assert reader.get_trace("and1") == [0, 0, 0, 1, 1, 0, 0, 0]
+
+
+def test_batch_errors(switch_files, tmp_path):
+    """Test if batch runs return the error and oscillation statuses."""
+    definition, stimulus = switch_files
+    assert run_batch(tmp_path / "missing.txt", 5) == EXIT_ERROR
+    assert run_batch(definition, 5, tmp_path / "missing.txt") == EXIT_ERROR
+
+    bad_definition = tmp_path / "bad.txt"
+    bad_definition.write_text("DEFINE sw AS;\nEND;\n")
+    assert run_batch(bad_definition, 5) == EXIT_ERROR
+
+    stimulus.write_text("3 and1 1\n")
+    assert run_batch(definition, 5, stimulus) == EXIT_ERROR
+
+    oscillating = tmp_path / "oscillating.txt"
+    oscillating.write_text(OSCILLATING_DEFINITION)
+    out_path = tmp_path / "run.trace"
+    assert run_batch(oscillating, 5, None, out_path) == EXIT_OSCILLATING
+    assert TraceReader(out_path).cycles == 0
+
+
+def test_batch_seed(tmp_path):
+    """Test if seeded batch runs of a random power-up state are the same."""
+    definition = tmp_path / "clock.txt"
+    definition.write_text("""
+DEFINE
+    clk AS CLOCK WITH cycle_rep = 50,
+    d1 AS DTYPE,
+    sw AS SWITCH WITH initial = 0;
+CONNECT
+    d1.CLK = sw, d1.DATA = sw, d1.SET = sw, d1.CLEAR = sw;
+MONITOR
+    clk, d1.Q;
+END;
+""")
+    traces = []
+    for run in range(2):
+        out_path = tmp_path / "run{}.trace".format(run)
+        assert run_batch(definition, 60, None, out_path, seed=9) == EXIT_OK
+        reader = TraceReader(out_path)
+        traces.append([reader.get_trace("clk"), reader.get_trace("d1.Q")])
+    assert traces[0] == traces[1]
@@ -0,0 +1,128 @@
+"""Test the checkpoints module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from checkpoints import Checkpoints
+
+
+@pytest.fixture
+def clocked_network():
+    """Return a network with a clock driving a D-type through a switch."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1_ID, CL_ID, D_ID] = new_names.lookup(["Sw1", "Clock1", "D1"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 3)
+    new_devices.make_device(D_ID, new_devices.D_TYPE)
+
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.DATA_ID)
+    new_network.make_connection(CL_ID, None, D_ID, new_devices.CLK_ID)
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.SET_ID)
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.CLEAR_ID)
+    return new_network
+
+
+def run(network, checkpoints, first_cycle, cycles, record):
+    """Run the network, taking checkpoints and recording (device, port)."""
+    trace = []
+    for cycle in range(cycles):
+        checkpoints.update(first_cycle + cycle, force=(cycle == 0))
+        assert network.execute_network()
+        trace.append(network.get_output_signal(*record))
+    return trace
+
+
+def test_update_and_nearest_checkpoint(clocked_network):
+    """Test if checkpoints are taken periodically and at forced cycles."""
+    network = clocked_network
+    checkpoints = Checkpoints(network.devices, network, interval=10)
+
+    run(network, checkpoints, 0, 25, (network.names.query("Clock1"), None))
+    run(network, checkpoints, 25, 10, (network.names.query("Clock1"), None))
+
+    assert checkpoints.checkpoint_cycles == [0, 10, 20, 25, 30]
+    assert checkpoints.nearest_checkpoint(0) == 0
+    assert checkpoints.nearest_checkpoint(19) == 10
+    assert checkpoints.nearest_checkpoint(27) == 25
+    assert checkpoints.nearest_checkpoint(100) == 30
+
+    # After skipped cycles, a checkpoint is due if a multiple was skipped
+    checkpoints.update(37)
+    checkpoints.update(43)
+    checkpoints.update(45)
+    assert checkpoints.checkpoint_cycles == [0, 10, 20, 25, 30, 43]
+
+    checkpoints.reset()
+    assert checkpoints.nearest_checkpoint(5) is None
+
+
+def test_replay_signal(clocked_network):
+    """Test if replayed cycles match the original run, across switch changes."""
+    network = clocked_network
+    devices = network.devices
+    [SW1_ID, D_ID] = network.names.lookup(["Sw1", "D1"])
+    checkpoints = Checkpoints(devices, network, interval=7)
+
+    trace = run(network, checkpoints, 0, 20, (D_ID, devices.Q_ID))
+    devices.set_switch(SW1_ID, devices.HIGH)
+    trace += run(network, checkpoints, 20, 20, (D_ID, devices.Q_ID))
+    live_state = devices.save_state()
+
+    assert checkpoints.replay_signal(D_ID, devices.Q_ID, 0, 40) == trace
+    assert checkpoints.replay_signal(D_ID, devices.Q_ID, 15, 25) == trace[15:25]
+
+    # The live simulation state is left untouched
+    assert devices.save_state() == live_state
+    assert devices.get_device(SW1_ID).switch_state == devices.HIGH
+
+
+def test_truncate_and_branch(clocked_network):
+    """Test if a restored snapshot and truncated checkpoints branch a run."""
+    network = clocked_network
+    checkpoints = Checkpoints(network.devices, network, interval=4)
+    [D_ID] = network.names.lookup(["D1"])
+    record = (D_ID, network.devices.Q_ID)
+
+    first = run(network, checkpoints, 0, 6, record)
+    data = network.snapshot()
+    later = run(network, checkpoints, 6, 6, record)
+    assert checkpoints.checkpoint_cycles == [0, 4, 6, 8]
+
+    network.restore(data)
+    checkpoints.truncate(6)
+    assert checkpoints.checkpoint_cycles == [0, 4]
+    assert run(network, checkpoints, 6, 6, record) == later
+    assert checkpoints.replay_signal(*record, 0, 6) == first
+
+
+def test_thinning_and_switches(clocked_network):
+    """Test if a long run keeps a bounded number of checkpoints."""
+    network = clocked_network
+    devices = network.devices
+    checkpoints = Checkpoints(devices, network, interval=4, max_checkpoints=8)
+    [SW1_ID] = network.names.lookup(["Sw1"])
+    record = (SW1_ID, None)
+
+    trace = []
+    for cycle in range(1000):
+        if cycle in [300, 700]:
+            devices.set_switch(SW1_ID, int(cycle == 300))
+            checkpoints.add_switches(cycle)
+        checkpoints.update(cycle, force=(cycle == 0))
+        assert network.execute_network()
+        trace.append(network.get_output_signal(*record))
+
+    # The forced checkpoint at 0 is kept, the periodic ones are thinned
+    assert len(checkpoints.checkpoint_cycles) <= 9
+    assert checkpoints.interval > 4
+    assert checkpoints.switch_cycles == [300, 700]
+    # Replays still see the switch changes between checkpoints
+    assert checkpoints.replay_signal(*record, 250, 750) == trace[250:750]
+
+    checkpoints.reset()
+    assert checkpoints.interval == 4
+    assert checkpoints.switch_cycles == []
@@ -148,3 +148,82 @@ def test_set_switch(new_devices):
     # Set switch Sw1 to LOW
     new_devices.set_switch(SW1_ID, new_devices.LOW)
     assert switch_object.switch_state == new_devices.LOW
+
+
+def test_save_and_load_state(devices_with_items):
+    """Test if load_state restores the state returned by save_state."""
+    devices = devices_with_items
+    names = devices.names
+    [SW1_ID, AND1_ID] = names.lookup(["Sw1", "And1"])
+
+    state = devices.save_state()
+    devices.set_switch(SW1_ID, devices.HIGH)
+    devices.get_device(AND1_ID).outputs[None] = devices.HIGH
+    assert devices.save_state() != state
+
+    devices.load_state(state)
+    assert devices.save_state() == state
+    assert devices.get_device(SW1_ID).switch_state == devices.LOW
+
+
+def test_snapshot_and_restore(devices_with_items):
+    """Test if restore brings back the state returned by snapshot."""
+    devices = devices_with_items
+    names = devices.names
+    [SW1_ID, AND1_ID, CL_ID, D_ID, RC_ID] = names.lookup(
+        ["Sw1", "And1", "Clock1", "D1", "Rc1"])
+    devices.make_device(CL_ID, devices.CLOCK, 5)
+    devices.make_device(D_ID, devices.D_TYPE)
+    devices.make_device(RC_ID, devices.RC, 3)
+    devices.get_device(RC_ID).cycle_counter = 1 << 40
+
+    data = devices.snapshot()
+    assert isinstance(data, bytes)
+    state = devices.save_state()
+    devices.set_switch(SW1_ID, devices.HIGH)
+    devices.get_device(AND1_ID).outputs[None] = devices.HIGH
+    devices.cold_startup()
+
+    devices.restore(data)
+    assert devices.save_state() == state
+
+    with pytest.raises(ValueError):
+        devices.restore(data[:-1])
+    with pytest.raises(ValueError):
+        devices.restore(b"LSSTATE1" + data[8:])
+    [AND2_ID] = names.lookup(["And2"])
+    devices.make_device(AND2_ID, devices.AND, 2)
+    with pytest.raises(ValueError):
+        devices.restore(data)
+
+
+def test_seeded_cold_startup():
+    """Test if a seed repeats the power-up state in any device order."""
+    states = []
+    for device_names in [["Clock1", "D1", "Clock2", "D2"],
+                         ["D2", "Clock2", "D1", "Clock1"]]:
+        new_names = Names()
+        new_devices = Devices(new_names)
+        device_ids = new_names.lookup(device_names)
+        for device_name, device_id in zip(device_names, device_ids):
+            if device_name.startswith("Clock"):
+                new_devices.make_device(device_id, new_devices.CLOCK, 1000)
+            else:
+                new_devices.make_device(device_id, new_devices.D_TYPE)
+        new_devices.set_seed(42)
+        new_devices.cold_startup()
+        state = {}
+        for device_name, device_id in zip(device_names, device_ids):
+            device = new_devices.get_device(device_id)
+            state[device_name] = (device.clock_counter, device.dtype_memory,
+                                  device.outputs.get(None))
+        states.append(state)
+
+        # Every seeded cold start-up gives the same state
+        new_devices.cold_startup()
+        assert new_devices.get_device(device_ids[0]).clock_counter == \
+            state[device_names[0]][0]
+
+    assert states[0] == states[1]
+    # The clocks have their own streams, so their phases differ
+    assert states[0]["Clock1"] != states[0]["Clock2"]
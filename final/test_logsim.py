@@ -0,0 +1,38 @@
+"""Test the logsim module and the shared message catalog."""
+import subprocess
+import sys
+
+import i18n
+
+
+def test_import_without_gui():
+    """Test if importing logsim loads no GUI modules or message catalog."""
+    code = ("import sys, logsim, i18n; "
+            "print(sorted({'wx', 'gui', 'OpenGL', 'matplotlib'} "
+            "& set(sys.modules)), i18n.translation)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                            text=True, check=True)
+    assert result.stdout.split() == ["[]", "None"]
+
+
+def test_shared_translation(monkeypatch):
+    """Test if the catalog is loaded once and shared by every message."""
+    monkeypatch.setenv("LANG", "en_GB.UTF-8")
+    monkeypatch.setattr(i18n, "translation", None)
+
+    assert i18n._("Cycles") == "Cycles"
+    translation = i18n.translation
+    assert translation is not None
+    assert i18n.get_translation() is translation
+
+
+def test_options_require_command_line():
+    """Test if command line session options without -c are rejected."""
+    for options in [["-q"], ["-s", "script.txt"], ["--out", "trace.lst"],
+                    ["--cache", "cache"], ["--cycles", "10"]]:
+        result = subprocess.run(
+            [sys.executable, "logsim.py"] + options + ["final_ex0.txt"],
+            capture_output=True, text=True, check=False)
+        assert result.returncode == 1
+        assert "requires -c" in result.stdout
+        assert "Usage:" in result.stdout
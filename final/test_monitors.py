@@ -5,6 +5,8 @@ from names import Names
 from network import Network
 from devices import Devices
 from monitors import Monitors
+from stimulus import Stimulus
+from watchpoints import Watchpoints
 
 
 @pytest.fixture
@@ -197,3 +199,174 @@ def test_display_signals(capsys, new_monitors):
             "Clock1: -__--__--__--__--__-" in traces)
 
     assert "" in traces  # additional empty line at the end
+
+
+def test_format_signals_windows(new_monitors):
+    """Test if trace windows are wrapped and summarised correctly."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID] = names.lookup(["Sw1"])
+
+    for cycle in range(40):
+        devices.set_switch(SW1_ID, int(cycle >= 30))
+        network.execute_network()
+        new_monitors.record_signals()
+
+    assert new_monitors.format_signals(28, 32) == ("     28\n"
+                                                   "Sw1: __--\n"
+                                                   "Sw2: ____\n"
+                                                   "Or1: __--\n")
+    lines = new_monitors.format_signals(0, 12, width=11).split("\n")
+    assert lines[:4] == ["     0", "Sw1: ______", "Sw2: ______",
+                         "Or1: ______"]
+    assert lines[4] == "     6"
+    assert len(lines) == 9
+
+    summary = new_monitors.format_signals(summary=True).split("\n")
+    assert summary[:3] == ["Sw1: _<30>_----------", "Sw2: _<40>_",
+                           "Or1: _<30>_----------"]
+
+
+def test_monitor_all_signals(new_monitors):
+    """Test if full-state recording stores every output each cycle."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+
+    HIGH = devices.HIGH
+    LOW = devices.LOW
+    BLANK = devices.BLANK
+
+    new_monitors.monitor_all_signals()
+
+    assert new_monitors.net_list == [(SW1_ID, None), (SW2_ID, None),
+                                     (OR1_ID, None)]
+
+    network.execute_network()
+    new_monitors.record_signals()
+    devices.set_switch(SW1_ID, HIGH)
+    network.execute_network()
+    new_monitors.record_signals()
+
+    assert new_monitors.get_state_cycles() == 2
+    assert len(new_monitors.state_trace) == 2 * 3
+    assert new_monitors.monitors_dictionary[(SW1_ID, None)] == [LOW, HIGH]
+    assert new_monitors.monitors_dictionary[(OR1_ID, None)] == [LOW, HIGH]
+    assert new_monitors.monitors_dictionary[(OR1_ID, None)][-1] == HIGH
+
+    # A zapped and re-added monitor keeps its full history
+    new_monitors.remove_monitor(SW2_ID, None)
+    assert new_monitors.make_monitor(SW2_ID, None, 2) == new_monitors.NO_ERROR
+    assert new_monitors.monitors_dictionary[(SW2_ID, None)] == [LOW, LOW]
+    assert BLANK not in new_monitors.monitors_dictionary[(SW2_ID, None)]
+
+    new_monitors.reset_monitors()
+    assert new_monitors.get_state_cycles() == 0
+    assert new_monitors.monitors_dictionary[(SW1_ID, None)] == []
+
+
+def test_display_signals_full_state(capsys, new_monitors):
+    """Test if full-state traces are displayed like ordinary monitors."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID] = names.lookup(["Sw1"])
+
+    new_monitors.monitor_all_signals()
+    for _ in range(3):
+        network.execute_network()
+        new_monitors.record_signals()
+    devices.set_switch(SW1_ID, devices.HIGH)
+    for _ in range(3):
+        network.execute_network()
+        new_monitors.record_signals()
+
+    new_monitors.display_signals()
+    out, _ = capsys.readouterr()
+    traces = out.split("\n")
+    assert "Sw1: ___---" in traces
+    assert "Sw2: ______" in traces
+    assert "Or1: ___---" in traces
+
+
+def test_get_signal_trace_replays_history(new_monitors):
+    """Test if a monitor added late gets its history from checkpoints."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID, CL_ID] = names.lookup(["Sw1", "Clock1"])
+
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+    new_monitors.make_monitor(CL_ID, None)
+    for cycle in range(12):
+        new_monitors.checkpoints.update(cycle, force=(cycle == 0))
+        network.execute_network()
+        new_monitors.record_signals()
+    clock_trace = list(new_monitors.monitors_dictionary[(CL_ID, None)])
+
+    # Re-add the Clock1 monitor after 12 cycles, then set Sw1 and continue
+    devices.set_switch(SW1_ID, devices.HIGH)
+    new_monitors.remove_monitor(CL_ID, None)
+    new_monitors.make_monitor(CL_ID, None, 12)
+    for cycle in range(12, 14):
+        new_monitors.checkpoints.update(cycle, force=(cycle == 12))
+        network.execute_network()
+        new_monitors.record_signals()
+
+    BLANK = devices.BLANK
+    assert new_monitors.monitors_dictionary[(CL_ID, None)][:12] == [BLANK] * 12
+
+    # Without replay the history is left BLANK and the network untouched
+    state = devices.save_state()
+    assert new_monitors.get_signal_trace(CL_ID, None, 0, 12,
+                                         replay=False) == [BLANK] * 12
+    assert devices.save_state() == state
+
+    # Only the requested window is reconstructed
+    assert new_monitors.get_signal_trace(CL_ID, None, 4, 8) == clock_trace[4:8]
+    assert new_monitors.monitors_dictionary[(CL_ID, None)][:4] == [BLANK] * 4
+    assert new_monitors.get_signal_trace(CL_ID, None)[:12] == clock_trace
+
+    # Sw1 was LOW before the switch was set between the two runs
+    LOW = devices.LOW
+    HIGH = devices.HIGH
+    new_monitors.remove_monitor(SW1_ID, None)
+    new_monitors.make_monitor(SW1_ID, None, 14)
+    assert new_monitors.get_signal_trace(SW1_ID, None, 10, 14) == [LOW, LOW,
+                                                                   HIGH, HIGH]
+
+
+def test_run_cycles(new_monitors):
+    """Test if run_cycles applies stimulus and stops on watches."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    [SW1_ID, OR1_ID] = names.lookup(["Sw1", "Or1"])
+    stimulus = Stimulus(names, devices)
+    stimulus.add_event(3, SW1_ID, 1)
+    watchpoints = Watchpoints(names, devices)
+    devices.cold_startup()
+
+    steps = []
+    [cycle, status, fired] = new_monitors.run_cycles(
+        0, 10, stimulus, watchpoints, callback=steps.append)
+    assert [cycle, status, fired] == [10, new_monitors.COMPLETED, []]
+    assert new_monitors.monitors_dictionary[(OR1_ID, None)] == \
+        [devices.LOW] * 3 + [devices.HIGH] * 7
+    # A forced checkpoint at the start, the switches recorded at the
+    # stimulus event, and idle cycles recorded in bulk
+    assert new_monitors.checkpoints.checkpoint_cycles == [0]
+    assert new_monitors.checkpoints.switch_cycles == [3]
+    assert steps == [0, 3, 4]
+
+    watchpoints.add_watch("Or1 == 0")
+    devices.set_switch(SW1_ID, 0)
+    [cycle, status, fired] = new_monitors.run_cycles(10, 20, stimulus,
+                                                     watchpoints)
+    assert [cycle, status, fired] == [11, new_monitors.WATCH_FIRED,
+                                      ["Or1 == 0"]]
+
+    [cycle, status, fired] = new_monitors.run_cycles(
+        11, 20, callback=lambda cycle: True)
+    assert [cycle, status] == [11, new_monitors.CANCELLED]
@@ -0,0 +1,69 @@
+"""Test the montecarlo module."""
+import pytest
+
+from batch import parse_circuit, EXIT_OK
+from montecarlo import MonteCarlo, run_monte_carlo
+
+# The D-type powers up at random and holds its state, as its clock is tied
+# low, while the switch output does not depend on the power-up state
+MEMORY_DEFINITION = """
+DEFINE
+    sw AS SWITCH WITH initial = 0,
+    d1 AS DTYPE,
+    or1 AS OR WITH inputs = 2;
+CONNECT
+    d1.CLK = sw,
+    d1.DATA = sw,
+    d1.SET = sw,
+    d1.CLEAR = sw,
+    or1.I1 = sw,
+    or1.I2 = sw;
+MONITOR
+    d1.Q, or1;
+END;
+"""
+
+
+@pytest.fixture
+def memory_path(tmp_path):
+    """Return the path of a definition file with a free running D-type."""
+    path = tmp_path / "memory.txt"
+    path.write_text(MEMORY_DEFINITION)
+    return path
+
+
+def test_monte_carlo(memory_path):
+    """Test if power-up dependent signals are found and reproducible."""
+    monte_carlo = MonteCarlo(*parse_circuit(memory_path))
+    [reports, oscillating] = monte_carlo.run(40, 5, seed=3, processes=0)
+    assert oscillating == []
+
+    assert reports["or1"]["finals"] == {0: 40}
+    assert reports["or1"]["converged"] == 0
+    assert reports["or1"]["outliers"] == []
+
+    finals = reports["d1.Q"]["finals"]
+    assert sorted(finals) == [0, 1]
+    assert sum(finals.values()) == 40
+    assert reports["d1.Q"]["converged"] is None
+    assert len(reports["d1.Q"]["outliers"]) == min(finals.values())
+
+    # The same seeds give the same trials, also on worker processes
+    [pool_reports, oscillating] = monte_carlo.run(40, 5, seed=3, processes=2)
+    assert pool_reports == reports
+
+
+def test_converged_cycle():
+    """Test if the convergence cycle is found from the end of the traces."""
+    assert MonteCarlo.converged_cycle([[0, 1, 1], [1, 0, 1]]) == 2
+    assert MonteCarlo.converged_cycle([[0, 1], [0, 1]]) == 0
+    assert MonteCarlo.converged_cycle([[0, 1], [0, 0]]) is None
+
+
+def test_run_monte_carlo(memory_path, capsys):
+    """Test if the command line report has one line per signal."""
+    assert run_monte_carlo(memory_path, 5, 10, 0, 1) == EXIT_OK
+    lines = capsys.readouterr().out.split("\n")
+    assert lines[0].startswith("d1.Q: LOW ")
+    assert "never converged; outlier seeds " in lines[0]
+    assert lines[1] == "or1: LOW 10; converged at cycle 0"
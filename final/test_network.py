@@ -4,6 +4,7 @@ import pytest
 from names import Names
 from devices import Devices
 from network import Network
+from batch import parse_circuit
 
 
 @pytest.fixture
@@ -348,3 +349,256 @@ def test_oscillating_network(new_network):
     network.make_connection(NOR1, None, NOR1, I1)
 
     assert not network.execute_network()
+
+
+def test_memo(new_network):
+    """Test if networks of switches and gates are memoized correctly."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1_ID, SW2_ID, CL_ID, I1, I2] = names.lookup(["Sw1", "Sw2", "Clock1",
+                                                    "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(SW2_ID, devices.SWITCH, 0)
+
+    # A chain of OR gates, each fed by the previous one and a switch
+    chain = []
+    previous_id = SW1_ID
+    for gate_id in names.lookup(["Or{}".format(i) for i in range(9)]):
+        devices.make_device(gate_id, devices.OR, 2)
+        network.make_connection(previous_id, None, gate_id, I1)
+        network.make_connection(SW2_ID, None, gate_id, I2)
+        chain.append(gate_id)
+        previous_id = gate_id
+
+    # Nine levels of gates may not settle within 20 iterations from any
+    # state, so the outputs are part of the key
+    assert network.execute_network()
+    assert network.memo_switches is not None and network.memo_outputs
+    network.connection_count += 1
+    network.iteration_limit = 21
+    assert network.execute_network()
+    assert not network.memo_outputs
+    assert len(network.memo) == 1
+
+    levels = []
+    for switch_states in [(1, 0), (0, 1), (0, 0), (1, 0)]:
+        devices.set_switch(SW1_ID, switch_states[0])
+        devices.set_switch(SW2_ID, switch_states[1])
+        assert network.execute_network()
+        levels.append(network.get_output_signal(chain[-1], None))
+    assert levels == [devices.HIGH, devices.HIGH, devices.LOW, devices.HIGH]
+    assert len(network.memo) == 3
+
+    # A hit copies the outputs in without executing any device
+    devices.set_switch(SW1_ID, 0)
+    network.execute_gate = None
+    assert network.execute_network()
+    assert network.get_output_signal(chain[-1], None) == devices.LOW
+    del network.execute_gate
+
+    # The least recently used keys are evicted
+    network.memo_size = 2
+    devices.set_switch(SW1_ID, 1)
+    devices.set_switch(SW2_ID, 1)
+    assert network.execute_network()
+    assert list(network.memo) == [(0, 0), (1, 1)]
+
+    # Clocks hold state from cycle to cycle, so nothing is memoized
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+    assert network.execute_network()
+    assert network.memo_switches is None and not network.memo
+
+
+def test_memo_feedback():
+    """Test if a latch built from gates gives the same results memoized."""
+    runs = []
+    for memo_size in [0, 1024]:
+        [names, devices, network, monitors] = parse_circuit("final_ex4.txt")
+        network.memo_size = memo_size
+        [SW1_ID, SW2_ID] = names.lookup(["SW1", "SW2"])
+        for switch_states in [(1, 0), (0, 0), (0, 1), (0, 0), (1, 0),
+                              (0, 0), (0, 0), (1, 1), (0, 0)]:
+            devices.set_switch(SW1_ID, switch_states[0])
+            devices.set_switch(SW2_ID, switch_states[1])
+            assert network.execute_network()
+            monitors.record_signals()
+        runs.append([monitors.get_signal_trace(*signal) for signal
+                     in monitors.monitors_dictionary])
+    assert network.memo_outputs
+    assert runs[0] == runs[1]
+
+
+@pytest.mark.parametrize("path", ["final_ex0.txt", "final_ex1.txt",
+                                  "final_ex2.txt", "final_ex3.txt"])
+def test_fast_forward(path):
+    """Test if skipping idle cycles gives the same traces as executing them."""
+    runs = []
+    for fast in [False, True]:
+        [names, devices, network, monitors] = parse_circuit(path)
+        devices.set_seed(4)
+        devices.cold_startup()
+        cycles = executed = 0
+        while cycles < 200:
+            assert network.execute_network()
+            monitors.record_signals()
+            cycles += 1
+            executed += 1
+            if fast:
+                skipped = network.fast_forward(200 - cycles)
+                monitors.record_repeats(skipped)
+                cycles += skipped
+        runs.append([executed, [list(trace) for trace in
+                                monitors.monitors_dictionary.values()]])
+    assert runs[0][1] == runs[1][1]
+    assert len(runs[1][1][0]) == 200
+    assert runs[1][0] <= runs[0][0]
+
+
+def test_fast_forward_slow_clock(new_network):
+    """Test if a slow clock and RC are simulated in time of their events."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [CL_ID, RC_ID, AND_ID, I1, I2] = names.lookup(["Clock1", "Rc1", "And1",
+                                                    "I1", "I2"])
+    devices.make_device(CL_ID, devices.CLOCK, 1000)
+    devices.make_device(RC_ID, devices.RC, 1500)
+    devices.make_device(AND_ID, devices.AND, 2)
+    network.make_connection(CL_ID, None, AND_ID, I1)
+    network.make_connection(RC_ID, None, AND_ID, I2)
+    devices.cold_startup()
+    clock = devices.get_device(CL_ID)
+    clock.outputs[None] = devices.LOW
+    clock.clock_counter = 0
+
+    levels = []
+    executed = 0
+    while len(levels) < 5000:
+        assert network.execute_network()
+        executed += 1
+        signal = network.get_output_signal(AND_ID, None)
+        levels += [signal] * (1 + network.fast_forward(5000 - len(levels) - 1))
+    # The clock rises at cycle 1000 and the RC times out at cycle 1500
+    assert levels == [devices.LOW] * 1000 + [devices.HIGH] * 500 + \
+        [devices.LOW] * 3500
+    assert executed < 20
+
+
+def test_calendar(new_network):
+    """Test if clocks toggle and RC devices time out when scheduled."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    clocks = []
+    for half_period in range(1, 41):
+        [CL_ID] = names.lookup(["Clock{}".format(half_period)])
+        devices.make_device(CL_ID, devices.CLOCK, half_period)
+        clocks.append(devices.get_device(CL_ID))
+    [RC_ID] = names.lookup(["Rc1"])
+    devices.make_device(RC_ID, devices.RC, 25)
+    rc = devices.get_device(RC_ID)
+    devices.cold_startup()
+    counters = [clock.clock_counter for clock in clocks]
+
+    for cycle in range(100):
+        if cycle == 50:
+            # Counters set from outside the network are rescheduled
+            clocks[9].clock_counter = 0
+            counters[9] = 0
+            rc.cycle_counter = 0
+            rc.outputs[None] = devices.HIGH
+        levels = [clock.outputs[None] for clock in clocks]
+        assert network.execute_network()
+        for index, clock in enumerate(clocks):
+            toggled = counters[index] == clock.clock_half_period
+            counters[index] = 1 if toggled else counters[index] + 1
+            assert clock.clock_counter == counters[index]
+            assert (clock.outputs[None] != levels[index]) == toggled
+        assert rc.outputs[None] == (devices.HIGH if cycle in
+                                    list(range(25)) + list(range(50, 75))
+                                    else devices.LOW)
+
+    # Only the next toggle of each clock is left, the RC has timed out
+    assert sorted(index for due_cycle, index, device
+                  in network.calendar) == list(range(len(clocks)))
+
+
+@pytest.mark.parametrize("path", ["final_ex0.txt", "final_ex2.txt",
+                                  "final_ex3.txt"])
+def test_registers(path, monkeypatch):
+    """Test if the register bank executes D-types like execute_d_type."""
+    runs = []
+    for bank in [True, False]:
+        if not bank:
+            monkeypatch.setattr(Network, "prepare_registers",
+                                lambda network: None)
+        [names, devices, network, monitors] = parse_circuit(path)
+        devices.set_seed(6)
+        devices.cold_startup()
+        memories = []
+        for cycle in range(100):
+            assert network.execute_network()
+            monitors.record_signals()
+            memories.append([device.dtype_memory
+                             for device in devices.devices_list])
+        assert (network.registers is not None) == bank
+        runs.append([memories, [list(trace) for trace in
+                                monitors.monitors_dictionary.values()]])
+    assert runs[0] == runs[1]
+
+
+def test_registers_unconnected(new_network):
+    """Test if a D-type with an unconnected input is not put in the bank."""
+    network = new_network
+    devices = network.devices
+    [SW_ID, D_ID] = devices.names.lookup(["Sw1", "D1"])
+    devices.make_device(SW_ID, devices.SWITCH, 0)
+    devices.make_device(D_ID, devices.D_TYPE)
+    for input_id in [devices.CLK_ID, devices.DATA_ID, devices.SET_ID]:
+        network.make_connection(SW_ID, None, D_ID, input_id)
+    assert not network.execute_network()
+    assert network.registers is None
+
+    network.make_connection(SW_ID, None, D_ID, devices.CLEAR_ID)
+    assert network.execute_network()
+    assert len(network.registers) == 1
+
+
+@pytest.mark.parametrize("path", ["final_ex1.txt", "final_ex3.txt",
+                                  "final_ex4.txt"])
+def test_gate_bank(path, monkeypatch):
+    """Test if the gate bank executes gates like execute_gate."""
+    runs = []
+    for bank in [True, False]:
+        if not bank:
+            monkeypatch.setattr(Network, "prepare_gates",
+                                lambda network: None)
+        [names, devices, network, monitors] = parse_circuit(path)
+        network.memo_size = 0
+        devices.set_seed(2)
+        devices.cold_startup()
+        switches = devices.find_devices(devices.SWITCH)
+        for cycle in range(60):
+            # Toggle a switch now and then, to exercise every gate
+            if cycle % 7 == 0 and switches:
+                switch_id = switches[cycle // 7 % len(switches)]
+                devices.set_switch(switch_id, 1 - devices.get_device(
+                    switch_id).switch_state)
+            network.execute_network()
+            monitors.record_signals()
+        assert (network.gates is not None) == bank
+        runs.append([list(trace) for trace in
+                     monitors.monitors_dictionary.values()])
+    assert runs[0] == runs[1]
+
+
+def test_update_signal_blank(new_network):
+    """Test if a BLANK signal is not updated and leaves steady_state alone."""
+    network = new_network
+    devices = network.devices
+    network.steady_state = True
+    assert network.update_signal(devices.BLANK, devices.HIGH) is None
+    assert network.steady_state
+    assert network.update_signal(devices.LOW, devices.HIGH) == devices.RISING
+    assert not network.steady_state
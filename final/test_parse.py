@@ -84,3 +84,24 @@ def test_error_definition_files(error_file_path):
 
 
     
+
+
+def test_monitor_star(tmp_path):
+    ''' Tests that MONITOR * switches on full-state recording of every output'''
+
+    definition = tmp_path / "monitor_star.txt"
+    definition.write_text("DEFINE sw AS SWITCH WITH initial = 1, "
+                          "d1 AS DTYPE, clk AS CLOCK WITH cycle_rep = 2; "
+                          "CONNECT d1.DATA = sw, d1.CLK = clk, d1.SET = sw, "
+                          "d1.CLEAR = sw; MONITOR *; END;")
+
+    names = Names()
+    scanner = Scanner(str(definition), names)
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    parser = Parser(names, devices, network, monitors, scanner)
+
+    assert parser.parse_network()
+    assert monitors.full_state
+    assert monitors.get_signal_names() == [["sw", "d1.Q", "d1.QBAR", "clk"], []]
@@ -0,0 +1,102 @@
+"""Test the periodicity module."""
+import pytest
+
+from batch import parse_circuit, run_batch, EXIT_OK
+from network import Network
+from periodicity import PeriodDetector
+from trace_archive import TraceReader
+from userint import UserInterface
+
+
+def simulate(path, cycles, extrapolate):
+    """Return the monitor traces and executed cycles of a seeded run."""
+    [names, devices, network, monitors] = parse_circuit(path)
+    devices.set_seed(6)
+    devices.cold_startup()
+    detector = PeriodDetector(network, monitors)
+    cycle = executed = 0
+    while cycle < cycles:
+        assert network.execute_network()
+        monitors.record_signals()
+        cycle += 1
+        executed += 1
+        if extrapolate:
+            period = detector.check(cycle)
+            if period is not None:
+                cycle = detector.extrapolate(period, cycle, cycles)
+    return [[list(trace) for trace in monitors.monitors_dictionary.values()],
+            executed]
+
+
+@pytest.mark.parametrize("path", ["final_ex0.txt", "final_ex1.txt",
+                                  "final_ex2.txt", "final_ex3.txt"])
+def test_extrapolate(path):
+    """Test if extrapolated runs match runs simulating every cycle."""
+    [traces, executed] = simulate(path, 1000, False)
+    [extrapolated_traces, extrapolated_executed] = simulate(path, 1000, True)
+    assert extrapolated_traces == traces
+    assert len(traces[0]) == 1000
+    assert extrapolated_executed < 200
+
+
+def test_detector_off():
+    """Test if networks without clocks are never checked."""
+    [names, devices, network, monitors] = parse_circuit("final_ex4.txt")
+    detector = PeriodDetector(network, monitors)
+    for cycle in range(1, 10):
+        assert network.execute_network()
+        assert detector.check(cycle) is None
+    assert detector.states == {}
+
+
+def test_long_batch_run(tmp_path, monkeypatch):
+    """Test if a long batch run only simulates its transient and a period."""
+    executed = []
+    execute_network = Network.execute_network
+
+    def count_cycles(network):
+        executed.append(1)
+        return execute_network(network)
+    monkeypatch.setattr(Network, "execute_network", count_cycles)
+
+    out_path = tmp_path / "run.trace"
+    assert run_batch("final_ex2.txt", 10 ** 6, None, out_path,
+                     seed=1) == EXIT_OK
+    reader = TraceReader(out_path)
+    assert reader.cycles == 10 ** 6
+    assert len(executed) < 200
+    for signal_name in reader.signal_names:
+        trace = reader.get_trace(signal_name)
+        assert trace[-1000:] == trace[-2000:-1000]
+
+
+def test_late_monitor_replay(monkeypatch):
+    """Test if late monitors copy extrapolated spans instead of simulating."""
+    [names, devices, network, monitors] = parse_circuit("final_ex2.txt")
+    devices.set_seed(6)
+    devices.cold_startup()
+    interface = UserInterface(names, devices, network, monitors, quiet=True)
+    interface.command_interface(["r 100000\n"])
+    [A1_ID] = names.lookup(["a1"])
+
+    executed = []
+    execute_network = Network.execute_network
+
+    def count_cycles(network):
+        executed.append(1)
+        return execute_network(network)
+    monkeypatch.setattr(Network, "execute_network", count_cycles)
+    interface.command_interface(["m a1\n"])
+    replayed = monitors.get_signal_trace(A1_ID, None)
+    assert len(executed) < 1000
+    monkeypatch.undo()
+
+    [names, devices, network, monitors] = parse_circuit("final_ex2.txt")
+    devices.set_seed(6)
+    devices.cold_startup()
+    [A1_ID] = names.lookup(["a1"])
+    monitors.make_monitor(A1_ID, None)
+    for cycle in range(100000):
+        assert network.execute_network()
+        monitors.record_signals()
+    assert replayed == list(monitors.get_signal_trace(A1_ID, None))
@@ -0,0 +1,170 @@
+"""Test the result_cache module."""
+import os
+
+import pytest
+
+from batch import parse_circuit, run_batch, EXIT_OK
+from network import Network
+from result_cache import ResultCache
+from stimulus import Stimulus
+from trace_archive import TraceReader
+from userint import UserInterface
+
+CLOCK_DEFINITION = """
+DEFINE
+    clk AS CLOCK WITH cycle_rep = 3,
+    sw AS SWITCH WITH initial = 0,
+    d1 AS DTYPE,
+    and1 AS AND WITH inputs = 2;
+CONNECT
+    and1.I1 = clk, and1.I2 = sw,
+    d1.CLK = clk, d1.DATA = sw, d1.SET = sw, d1.CLEAR = sw;
+MONITOR
+    and1, d1.Q;
+END;
+"""
+
+
+@pytest.fixture
+def circuit_files(tmp_path):
+    """Return the paths of a clocked circuit and a stimulus toggling it."""
+    definition = tmp_path / "circuit.txt"
+    definition.write_text(CLOCK_DEFINITION)
+    stimulus = tmp_path / "stimulus.txt"
+    stimulus.write_text("4 sw 1 EVERY 10\n9 sw 0 EVERY 10\n")
+    return definition, stimulus
+
+
+def read_traces(path):
+    """Return the traces of every signal in a trace archive."""
+    reader = TraceReader(path)
+    return {name: reader.get_trace(name) for name in reader.signal_names}
+
+
+def test_get_key(circuit_files):
+    """Test if keys change with everything that decides the result."""
+    definition, stimulus_path = circuit_files
+    [names, devices, network, monitors] = parse_circuit(definition)
+    cache_dir = definition.parent / "cache"
+    cache = ResultCache(cache_dir)
+    assert os.path.isdir(cache_dir)
+
+    # The power-up state of the clock and D-type is random without a seed
+    assert cache.get_key(monitors) is None
+    devices.set_seed(1)
+    key = cache.get_key(monitors)
+    assert key == cache.get_key(monitors)
+
+    stimulus = Stimulus(names, devices)
+    assert cache.get_key(monitors, stimulus) == key
+    stimulus.load(stimulus_path)
+    assert cache.get_key(monitors, stimulus) not in [key, None]
+    devices.set_seed(2)
+    assert cache.get_key(monitors) != key
+    devices.set_seed(1)
+    [SW_ID] = names.lookup(["sw"])
+    devices.set_switch(SW_ID, 1)
+    assert cache.get_key(monitors) != key
+    devices.set_switch(SW_ID, 0)
+    monitors.make_monitor(SW_ID, None)
+    assert cache.get_key(monitors) != key
+
+
+def test_batch_hit_and_resume(circuit_files, tmp_path, monkeypatch):
+    """Test if cached batch runs are restored, or resumed when shorter."""
+    definition, stimulus = circuit_files
+    cache_dir = tmp_path / "cache"
+    expected = {}
+    for cycles in [12, 30]:
+        out_path = tmp_path / "expected{}.trace".format(cycles)
+        assert run_batch(definition, cycles, stimulus, out_path,
+                         seed=3) == EXIT_OK
+        expected[cycles] = read_traces(out_path)
+
+    out_path = tmp_path / "run.trace"
+    assert run_batch(definition, 12, stimulus, out_path, seed=3,
+                     cache_dir=cache_dir) == EXIT_OK
+    assert read_traces(out_path) == expected[12]
+    assert len(os.listdir(cache_dir)) == 2
+
+    # A hit does not simulate at all
+    execute_network = Network.execute_network
+    monkeypatch.setattr(Network, "execute_network", None)
+    assert run_batch(definition, 12, stimulus, out_path, seed=3,
+                     cache_dir=cache_dir) == EXIT_OK
+    assert read_traces(out_path) == expected[12]
+
+    # A longer run only simulates cycles after the cached run, and fewer if
+    # some are skipped as idle
+    simulated = []
+
+    def count_cycles(network):
+        simulated.append(1)
+        return execute_network(network)
+    monkeypatch.setattr(Network, "execute_network", count_cycles)
+    assert run_batch(definition, 30, stimulus, out_path, seed=3,
+                     cache_dir=cache_dir) == EXIT_OK
+    assert read_traces(out_path) == expected[30]
+    assert 0 < len(simulated) <= 18
+    assert len(os.listdir(cache_dir)) == 4
+
+
+def test_eviction(circuit_files, tmp_path):
+    """Test if the least recently used runs are evicted over the cap."""
+    definition, stimulus = circuit_files
+    cache_dir = tmp_path / "cache"
+    for cycles in [10, 20, 30]:
+        assert run_batch(definition, cycles, None, None, seed=5,
+                         cache_dir=cache_dir) == EXIT_OK
+    cache = ResultCache(cache_dir)
+    entries = sorted(cache.get_entries())
+    assert [cycles for key, cycles in entries] == [10, 20, 30]
+    key = entries[0][0]
+    sizes = {}
+    for cycles in [10, 20, 30]:
+        paths = cache.get_paths(key, cycles)
+        sizes[cycles] = sum(os.path.getsize(path) for path in paths)
+        # Use the runs in the order 20, 10, 30
+        for path in paths:
+            os.utime(path, ns=(0, [2, 1, 3][cycles // 10 - 1]))
+
+    cache.max_bytes = sizes[10] + sizes[30]
+    cache.evict()
+    assert sorted(cache.get_entries()) == [[key, 10], [key, 30]]
+    cache.max_bytes = 0
+    cache.evict()
+    assert os.listdir(cache_dir) == []
+
+
+def test_session_continue(circuit_files, tmp_path):
+    """Test if command line runs and continues resume from cached runs."""
+    definition, stimulus = circuit_files
+    cache_dir = tmp_path / "cache"
+
+    def run_session(commands, cache=None):
+        [names, devices, network, monitors] = parse_circuit(definition)
+        devices.set_seed(7)
+        interface = UserInterface(names, devices, network, monitors,
+                                  quiet=True, cache=cache)
+        interface.command_interface(commands)
+        [AND_ID] = names.lookup(["and1"])
+        return [interface.cycles_completed,
+                monitors.get_signal_trace(AND_ID, None)]
+
+    commands = ["stim {}\n".format(stimulus), "r 6\n", "c 10\n", "c 4\n"]
+    expected = run_session(commands)
+    assert run_session(commands, ResultCache(cache_dir)) == expected
+    assert sorted(cycles for key, cycles in
+                  ResultCache(cache_dir).get_entries()) == [6, 20]
+
+    # The run is restored, and the continue resumes from the cached 20 cycles
+    cache = ResultCache(cache_dir)
+    assert run_session(commands[:2] + ["c 14\n", "c 3\n"], cache)[1][:20] == \
+        expected[1]
+    assert sorted(cycles for key, cycles in cache.get_entries()) == \
+        [6, 20, 23]
+
+    # Switch changes make the session differ from a cached run
+    assert run_session(["r 10\n", "s sw 1\n", "c 10\n"], cache)[0] == 20
+    assert sorted(cycles for key, cycles in cache.get_entries()) == \
+        [6, 10, 20, 23]
@@ -0,0 +1,43 @@
+"""Test the signals module."""
+import pytest
+
+from signals import (SIGNAL_TYPES, LOW, HIGH, RISING, FALLING, BLANK,
+                     TRANSITIONS, INVERSE, LEVEL_TABLE, GATE_RULES,
+                     gate_target)
+
+
+@pytest.mark.parametrize("signal, towards_low, towards_high", [
+    (LOW, LOW, RISING),
+    (HIGH, FALLING, HIGH),
+    (RISING, FALLING, HIGH),
+    (FALLING, LOW, RISING),
+    (BLANK, None, None),
+])
+def test_transitions(signal, towards_low, towards_high):
+    """Test if signals are updated towards LOW and HIGH targets."""
+    assert TRANSITIONS[signal] == (towards_low, towards_high)
+    # Any target other than LOW counts as HIGH, e.g. an unset D-type memory
+    target = None
+    assert TRANSITIONS[signal][target != LOW] == towards_high
+
+
+def test_tables():
+    """Test if the inverse and level tables cover every signal."""
+    assert [INVERSE.get(signal) for signal in SIGNAL_TYPES] == [
+        HIGH, LOW, None, None, None]
+    assert bytes(SIGNAL_TYPES).translate(LEVEL_TABLE) == bytes([0, 1, 1, 0, 0])
+
+
+@pytest.mark.parametrize("kind, inputs, target", [
+    ("AND", [HIGH, HIGH], HIGH),
+    ("AND", [HIGH, RISING], LOW),
+    ("OR", [LOW, LOW, LOW], LOW),
+    ("OR", [LOW, HIGH, LOW], HIGH),
+    ("NAND", [HIGH], LOW),
+    ("NOR", [FALLING], LOW),
+    ("XOR", [HIGH, LOW], HIGH),
+    ("XOR", [RISING, RISING], LOW),
+])
+def test_gate_target(kind, inputs, target):
+    """Test if gate rules give the target output of each gate kind."""
+    assert gate_target(*GATE_RULES[kind], inputs) == target
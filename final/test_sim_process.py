@@ -0,0 +1,121 @@
+"""Test the sim_process module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from sim_process import EngineProcess, COMPLETED, WATCH_FIRED
+from stimulus import Stimulus
+
+DEFINITION = """DEFINE
+    clk AS CLOCK WITH cycle_rep = 2,
+    sw AS SWITCH WITH initial = 0,
+    and1 AS AND WITH inputs = 2;
+CONNECT
+    and1.I1 = clk,
+    and1.I2 = sw;
+MONITOR
+    clk, and1;
+END;
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Return an EngineProcess for a clock gated by a switch."""
+    path = tmp_path / "circuit.txt"
+    path.write_text(DEFINITION)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    parser = Parser(names, devices, network, monitors,
+                    Scanner(str(path), names))
+    assert parser.parse_network()
+
+    new_engine = EngineProcess(str(path), names, devices, slot_count=4,
+                               capacity=100, chunk_cycles=5)
+    yield new_engine
+    new_engine.close()
+
+
+def test_run_and_commands(engine):
+    """Test if runs, switches and monitors are shared with the engine."""
+    [CLK_ID, SW_ID, AND_ID] = engine.names.lookup(["clk", "sw", "and1"])
+    LOW, HIGH = engine.devices.LOW, engine.devices.HIGH
+    assert set(engine.monitors_dictionary) == {(CLK_ID, None),
+                                              (AND_ID, None)}
+
+    engine.start_run(8)
+    assert engine.wait(10) == COMPLETED
+    assert engine.get_cycles() == 8
+    clock_trace = engine.get_signal_trace(CLK_ID, None)
+    assert len(clock_trace) == 8
+    assert set(clock_trace) == {LOW, HIGH}
+    assert engine.get_signal_trace(AND_ID, None) == [LOW] * 8
+
+    assert engine.set_switch(SW_ID, HIGH)
+    assert engine.make_monitor(SW_ID, None)
+    assert engine.remove_monitor(AND_ID, None)
+    assert not engine.remove_monitor(AND_ID, None)
+    engine.start_run(4, cold_start=False)
+    assert engine.wait(10) == COMPLETED
+
+    # The history of the new monitor is reconstructed in the engine
+    assert engine.get_signal_trace(SW_ID, None) == [LOW] * 8 + [HIGH] * 4
+    assert engine.get_signal_trace(CLK_ID, None, 6, 10) == \
+        clock_trace[6:] + engine.get_signal_trace(CLK_ID, None, 8, 10)
+    assert engine.get_net_values()[(SW_ID, None)] == HIGH
+
+    # A seeded engine powers up the same way in every cold start
+    assert engine.set_seed(7)
+    seeded_traces = []
+    for run in range(2):
+        engine.start_run(6, cold_start=True)
+        assert engine.wait(10) == COMPLETED
+        seeded_traces.append(engine.get_signal_trace(CLK_ID, None))
+    assert seeded_traces[0] == seeded_traces[1]
+
+
+def test_long_run(engine):
+    """Test if runs longer than the capacity wrap around the trace slots."""
+    [CLK_ID, SW_ID, AND_ID] = engine.names.lookup(["clk", "sw", "and1"])
+    LOW, HIGH, BLANK = (engine.devices.LOW, engine.devices.HIGH,
+                        engine.devices.BLANK)
+    engine.start_run(250)
+    assert engine.wait(10) == COMPLETED
+    assert engine.get_cycles() == 250
+
+    # The latest 100 cycles are held, older ones are fetched from the engine
+    clock_trace = engine.get_signal_trace(CLK_ID, None)
+    assert len(clock_trace) == 250
+    assert clock_trace[150:] == clock_trace[146:246]
+    assert engine.get_signal_trace(CLK_ID, None, 140, 160,
+                                   replay=False) == [BLANK] * 10 + \
+        clock_trace[150:160]
+
+    # A stimulus sets the switch and a watch expression stops the run
+    stimulus = Stimulus(engine.names, engine.devices)
+    stimulus.add_event(100, SW_ID, HIGH)
+    stimulus.add_event(260, SW_ID, HIGH)
+    assert engine.set_stimulus(stimulus)
+    assert engine.set_watches(["and1 == 1"])
+    engine.start_run(100, cold_start=False)
+    assert engine.wait(10) == WATCH_FIRED
+    assert engine.fired == ["and1 == 1"]
+    cycles = engine.get_cycles()
+    assert 260 < cycles < 270
+    and_trace = engine.get_signal_trace(AND_ID, None, 250, cycles)
+    assert and_trace == [LOW] * (cycles - 251) + [HIGH]
+
+
+def test_invalid_definition(tmp_path):
+    """Test if an engine for a faulty definition file raises ValueError."""
+    path = tmp_path / "faulty.txt"
+    path.write_text("DEFINE clk AS CLOCK;")
+    names = Names()
+    with pytest.raises(ValueError):
+        EngineProcess(str(path), names, Devices(names))
@@ -0,0 +1,143 @@
+"""Test the sim_worker module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from watchpoints import Watchpoints
+from sim_worker import SimulationWorker
+from stimulus import Stimulus
+from batch import parse_circuit
+
+
+@pytest.fixture
+def clock_monitors():
+    """Return a Monitors instance watching a clock of half period 2."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [CL_ID] = new_names.lookup(["Clock1"])
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 2)
+    new_devices.cold_startup()
+    new_monitors.make_monitor(CL_ID, None)
+    return new_monitors
+
+
+def start_worker(monitors, cycles, start_cycle=0, **kwargs):
+    """Run a SimulationWorker to completion and return it."""
+    watchpoints = Watchpoints(monitors.names, monitors.devices)
+    worker = SimulationWorker(monitors.network, monitors, watchpoints, cycles,
+                              start_cycle, **kwargs)
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive()
+    return worker
+
+
+def test_run_and_chunks(clock_monitors):
+    """Test if the worker simulates every cycle and hands over chunks."""
+    progress = []
+    done = []
+    worker = start_worker(clock_monitors, 25, chunk_cycles=10,
+                          progress_callback=progress.append,
+                          progress_interval=0,
+                          done_callback=lambda *args: done.append(args))
+
+    [CL_ID] = clock_monitors.names.lookup(["Clock1"])
+    assert worker.cycles_completed == 25
+    # The periodic clock is extrapolated, so chunks may span several
+    # multiples of chunk_cycles
+    chunks = list(worker.chunks)
+    assert chunks == sorted(chunks) and chunks[0] >= 10 and chunks[-1] == 25
+    assert len(clock_monitors.monitors_dictionary[(CL_ID, None)]) == 25
+    # Cycles that repeat the last one are skipped, without a report
+    assert progress == sorted(set(progress)) and progress[-1] == 25
+    assert done == [(worker.COMPLETED, [])]
+
+
+def test_watch_and_cancel(clock_monitors):
+    """Test if the worker stops at watch expressions and when cancelled."""
+    watchpoints = Watchpoints(clock_monitors.names, clock_monitors.devices)
+    watchpoints.add_watch("Clock1 == 1")
+    worker = SimulationWorker(clock_monitors.network, clock_monitors,
+                              watchpoints, 100, 0)
+    worker.run()
+    assert worker.status == worker.WATCH_FIRED
+    assert worker.fired == ["Clock1 == 1"]
+    assert 0 < worker.cycles_completed < 100
+
+    worker = SimulationWorker(clock_monitors.network, clock_monitors,
+                              watchpoints, 100, 0)
+    worker.cancel()
+    worker.run()
+    assert worker.status == worker.CANCELLED
+    assert worker.cycles_completed == 0
+
+
+def test_stimulus_and_checkpoints():
+    """Test if stimulus events are applied and captured by checkpoints."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW_ID, OR_ID] = new_names.lookup(["Sw1", "Or1"])
+    new_devices.make_device(SW_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(OR_ID, new_devices.OR, 1)
+    new_network.make_connection(SW_ID, None, OR_ID, new_names.query("I1"))
+    new_devices.cold_startup()
+
+    stimulus = Stimulus(new_names, new_devices)
+    stimulus.add_event(3, SW_ID, 1, 5)
+    stimulus.add_event(5, SW_ID, 0, 5)
+    worker = start_worker(new_monitors, 12, stimulus=stimulus)
+    assert worker.cycles_completed == 12
+
+    # A monitor added now is reconstructed from the checkpoints
+    new_monitors.make_monitor(OR_ID, None, 12)
+    assert new_monitors.get_signal_trace(OR_ID, None) == \
+        [0, 0, 0, 1, 1, 0, 0, 0, 1, 1, 0, 0]
+
+
+def test_long_run():
+    """Test if the worker runs well past the old 2000 cycle limit."""
+    circuit = parse_circuit("final_ex4.txt")
+    reference = parse_circuit("final_ex4.txt")
+    monitors = circuit[3]
+    for devices in [circuit[1], reference[1]]:
+        devices.set_seed(1)
+        devices.cold_startup()
+
+    worker = start_worker(monitors, 5000, chunk_cycles=1000)
+    assert worker.status == worker.COMPLETED
+    assert worker.cycles_completed == 5000
+    assert list(worker.chunks)[-1] == 5000
+    reference[3].run_cycles(0, 5000)
+    for key, signal_list in reference[3].monitors_dictionary.items():
+        assert monitors.get_signal_trace(*key) == signal_list
+
+    worker = start_worker(monitors, 2500, 5000)
+    assert worker.cycles_completed == 7500
+    assert len(next(iter(monitors.monitors_dictionary.values()))) == 7500
+
+
+def test_failed_run(clock_monitors):
+    """Test if the done callback is made when the run raises."""
+    done = []
+
+    def fail(cycle):
+        raise RuntimeError("step failed")
+
+    worker = SimulationWorker(clock_monitors.network, clock_monitors,
+                              Watchpoints(clock_monitors.names,
+                                          clock_monitors.devices), 10, 0,
+                              done_callback=lambda *args: done.append(args))
+    worker.step = fail
+    worker.start()
+    worker.join(10)
+    assert worker.status == worker.FAILED
+    assert str(worker.error) == "step failed"
+    assert done[-1] == (worker.FAILED, [])
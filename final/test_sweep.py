@@ -0,0 +1,89 @@
+"""Test the sweep module."""
+import pytest
+
+from batch import parse_circuit, EXIT_OK, EXIT_ERROR
+from sweep import Sweep, run_sweep, COMPLETED
+
+CLOCK_DEFINITION = """
+DEFINE
+    clk AS CLOCK WITH cycle_rep = 2,
+    sw AS SWITCH WITH initial = 0,
+    rc AS RC WITH rc_cycles = 3,
+    and1 AS AND WITH inputs = 2,
+    or1 AS OR WITH inputs = 2;
+CONNECT
+    and1.I1 = clk,
+    and1.I2 = sw,
+    or1.I1 = and1,
+    or1.I2 = rc;
+MONITOR
+    and1, or1;
+END;
+"""
+
+
+@pytest.fixture
+def sweep(tmp_path):
+    """Return a Sweep of a clock gated by a switch, ORed with an RC."""
+    path = tmp_path / "circuit.txt"
+    path.write_text(CLOCK_DEFINITION)
+    return Sweep(*parse_circuit(path))
+
+
+def test_grid_and_check_point(sweep):
+    """Test if parameter grids are built and checked correctly."""
+    assert sweep.grid({"clk": [2, 4], "sw": [0, 1]}) == [
+        {"clk": 2, "sw": 0}, {"clk": 2, "sw": 1},
+        {"clk": 4, "sw": 0}, {"clk": 4, "sw": 1}]
+    assert sweep.check_point({"clk": 3, "rc": 10, "sw": 1}) == sweep.NO_ERROR
+    assert sweep.check_point({"and1": 1}) == sweep.NOT_PARAMETER
+    assert sweep.check_point({"nothing": 1}) == sweep.NOT_PARAMETER
+    assert sweep.check_point({"sw": 2}) == sweep.BAD_VALUE
+    assert sweep.check_point({"clk": 0}) == sweep.BAD_VALUE
+    with pytest.raises(ValueError):
+        sweep.run([{"rc": -1}], 10)
+
+
+def test_run_points(sweep):
+    """Test if each point is simulated with its own overrides."""
+    points = sweep.grid({"sw": [0, 1], "rc": [3, 8]})
+    results = sweep.run(points, 24, processes=0, keep_traces=True)
+    assert [result["point"] for result in results] == points
+    for result in results:
+        assert result["status"] == COMPLETED
+        assert result["cycles"] == 24
+        rc_cycles = result["point"]["rc"]
+        or_trace = result["traces"]["or1"]
+        assert or_trace[:rc_cycles] == [1] * rc_cycles
+        if result["point"]["sw"] == 0:
+            assert result["signals"]["and1"] == {"high": 0, "transitions": 0,
+                                                 "final": 0}
+            assert result["signals"]["or1"]["transitions"] == 1
+        else:
+            # The clock has a half period of 2, so it is high half the time
+            assert result["signals"]["and1"]["high"] == 12
+
+    # The points do not depend on the process that ran them
+    pool_results = sweep.run(points, 24, processes=2, keep_traces=True)
+    for result, pool_result in zip(results, pool_results):
+        assert pool_result["point"] == result["point"]
+        assert pool_result["cycles"] == result["cycles"]
+        assert pool_result["traces"]["or1"][:result["point"]["rc"]] == \
+            result["traces"]["or1"][:result["point"]["rc"]]
+
+
+def test_run_sweep(tmp_path, capsys):
+    """Test if the command line sweep prints one row per point and signal."""
+    path = tmp_path / "circuit.txt"
+    path.write_text(CLOCK_DEFINITION)
+    assert run_sweep(path, 10, ["sw=0,1", "rc=2"], 1) == EXIT_OK
+    lines = capsys.readouterr().out.split("\n")
+    assert lines[0] == "sw,rc,status,cycles,signal,high,transitions,final"
+    assert lines[1] == "0,2,completed,10,and1,0,0,0"
+    assert lines[2] == "0,2,completed,10,or1,2,1,0"
+    assert len(lines) == 6
+
+    assert run_sweep(path, 10, ["sw=2"]) == EXIT_ERROR
+    assert run_sweep(path, 10, ["sw"]) == EXIT_ERROR
+    assert run_sweep(path, 10, ["sw=a"]) == EXIT_ERROR
+    assert run_sweep(tmp_path / "missing.txt", 10, []) == EXIT_ERROR
@@ -0,0 +1,141 @@
+"""Test the trace_archive module."""
+import zlib
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from trace_archive import (TraceWriter, TraceReader, encode_chunk,
+                           decode_chunk, save_monitors)
+
+
+@pytest.fixture
+def clock_monitors():
+    """Return a Monitors instance watching a clock and a switch."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, CL_ID, D_ID] = new_names.lookup(["Sw1", "Clock1", "D1"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(CL_ID, new_devices.CLOCK, 3)
+    new_devices.make_device(D_ID, new_devices.D_TYPE)
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.DATA_ID)
+    new_network.make_connection(CL_ID, None, D_ID, new_devices.CLK_ID)
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.SET_ID)
+    new_network.make_connection(SW1_ID, None, D_ID, new_devices.CLEAR_ID)
+
+    new_monitors.make_monitor(CL_ID, None)
+    new_monitors.make_monitor(D_ID, new_devices.QBAR_ID)
+    return new_monitors
+
+
+@pytest.mark.parametrize("samples", [
+    b"", b"\x01", b"\x00" * 1000, b"\x00\x01\x02\x03\x04" * 50,
+    b"\x01" * 127 + b"\x00" * 128 + b"\x01" * 70000,
+])
+def test_encode_and_decode_chunk(samples):
+    """Test if decode_chunk returns the samples given to encode_chunk."""
+    assert decode_chunk(encode_chunk(samples)) == samples
+
+
+def test_write_and_read(tmp_path):
+    """Test if traces are read back in full and by window across chunks."""
+    path = tmp_path / "run.trace"
+    square = [0, 0, 0, 1, 1, 1] * 10
+    ramp = [cycle % 5 for cycle in range(60)]
+
+    writer = TraceWriter(path, ["Clock1", "D1.Q"], chunk_size=16)
+    for cycle in range(25):
+        writer.append([square[cycle], ramp[cycle]])
+    # Full chunks are already on disk while the run is in progress
+    assert [len(chunks) for chunks in writer.chunk_index] == [1, 1]
+    writer.append_traces([square[25:], ramp[25:]])
+    writer.close()
+
+    reader = TraceReader(path)
+    assert reader.cycles == 60
+    assert reader.signal_names == ["Clock1", "D1.Q"]
+    assert reader.get_trace("Clock1") == square
+    assert reader.get_trace("D1.Q") == ramp
+    assert reader.get_trace("D1.Q", 15, 33) == ramp[15:33]
+    assert reader.get_trace("D1.Q", 59, 100) == ramp[59:]
+    assert reader.get_trace("D1.QBAR") is None
+
+
+def test_incomplete_archive(tmp_path):
+    """Test if an archive that was never closed is rejected."""
+    path = tmp_path / "run.trace"
+    writer = TraceWriter(path, ["Clock1"], chunk_size=4)
+    writer.append_traces([[0, 1] * 10])
+    writer.file.close()
+
+    with pytest.raises(ValueError):
+        TraceReader(path)
+
+
+def test_archive_during_run(tmp_path, clock_monitors):
+    """Test if streamed and saved archives reload as Monitors."""
+    monitors = clock_monitors
+    network = monitors.network
+    stream_path = tmp_path / "stream.trace"
+    save_path = tmp_path / "save.trace"
+
+    monitors.start_archive(TraceWriter(stream_path, ["Clock1", "D1.QBAR",
+                                                     "Sw1"], chunk_size=8))
+    for _ in range(30):
+        network.execute_network()
+        monitors.record_signals()
+    monitors.stop_archive()
+    save_monitors(save_path, monitors, chunk_size=8)
+
+    [CL_ID, D_ID, SW1_ID, QBAR_ID] = monitors.names.lookup(
+        ["Clock1", "D1", "Sw1", "QBAR"])
+    clock_trace = monitors.monitors_dictionary[(CL_ID, None)]
+    qbar_trace = monitors.monitors_dictionary[(D_ID, QBAR_ID)]
+
+    streamed = TraceReader(stream_path)
+    assert streamed.get_trace("Clock1") == clock_trace
+    assert streamed.get_trace("D1.QBAR") == qbar_trace
+    assert streamed.get_trace("Sw1") == [monitors.devices.HIGH] * 30
+
+    loaded = TraceReader(save_path).load_monitors()
+    [CL_ID, D_ID, QBAR_ID] = loaded.names.lookup(["Clock1", "D1", "QBAR"])
+    assert loaded.get_signal_names()[0] == ["Clock1", "D1.QBAR"]
+    assert loaded.get_signal_trace(CL_ID, None) == clock_trace
+    assert loaded.get_signal_trace(D_ID, QBAR_ID, 10, 12) == qbar_trace[10:12]
+
+
+def test_read_chunks_on_demand(tmp_path):
+    """Test if only the footer and the chunks of a window are read."""
+    path = tmp_path / "run.trace"
+    ramp = [cycle % 5 for cycle in range(64)]
+    writer = TraceWriter(path, ["D1.Q"], chunk_size=16)
+    writer.append_traces([ramp])
+    writer.close()
+
+    reader = TraceReader(path)
+    # Damage the first chunk after opening: later windows still read
+    [first_offset, first_length] = reader.chunk_index["D1.Q"][0]
+    data = bytearray(path.read_bytes())
+    data[first_offset:first_offset + first_length] = bytes(first_length)
+    path.write_bytes(bytes(data))
+    assert reader.get_trace("D1.Q", 20, 50) == ramp[20:50]
+    with pytest.raises(zlib.error):
+        reader.get_trace("D1.Q", 0, 4)
+
+
+def test_no_signals(tmp_path):
+    """Test if an archive of no signals still counts its cycles."""
+    path = tmp_path / "run.trace"
+    writer = TraceWriter(path, [], chunk_size=4)
+    for _ in range(3):
+        writer.append([])
+    writer.append_traces([], 10)
+    writer.close()
+    reader = TraceReader(path)
+    assert reader.cycles == 13
+    assert reader.signal_names == []
@@ -0,0 +1,73 @@
+"""Test the trace_pyramid module."""
+import math
+
+import pytest
+
+from names import Names
+from devices import Devices
+from trace_pyramid import TracePyramid
+
+
+@pytest.fixture
+def new_devices():
+    """Return a Devices instance for its signal constants."""
+    return Devices(Names())
+
+
+def test_get_buckets(new_devices):
+    """Test if buckets keep the extremes and transitions of each window."""
+    LOW, HIGH = new_devices.LOW, new_devices.HIGH
+    trace = [LOW] * 1000
+    trace[500] = HIGH  # a one cycle glitch
+    pyramid = TracePyramid(new_devices, trace)
+
+    size, first_cycle, mins, maxs, edges = pyramid.get_buckets(0, 1000, 10)
+    assert size == 128
+    assert first_cycle == 0
+    assert len(mins) == 8
+    assert list(mins) == [0] * 8
+    assert list(maxs) == [0, 0, 0, 2, 0, 0, 0, 0]
+    assert list(edges) == [0, 0, 0, 1, 0, 0, 0, 0]
+
+    # A window fitting in max_buckets is returned at full resolution
+    size, first_cycle, mins, maxs, edges = pyramid.get_buckets(495, 505, 10)
+    assert (size, first_cycle) == (1, 495)
+    assert list(maxs) == [0] * 5 + [2] + [0] * 4
+    assert list(edges) == [0] * 5 + [1, 1] + [0] * 3
+
+
+def test_extend_matches_build(new_devices):
+    """Test if extending piecewise gives the same pyramid as one build."""
+    signals = [new_devices.LOW, new_devices.RISING, new_devices.HIGH,
+               new_devices.FALLING, new_devices.BLANK]
+    trace = [signals[(cycle * cycle) % 7 % 5] for cycle in range(777)]
+
+    built = TracePyramid(new_devices, trace)
+    extended = TracePyramid(new_devices)
+    for start in range(0, 777, 50):
+        extended.extend(trace[start:start + 50])
+
+    assert len(extended) == 777
+    assert extended.mins == built.mins
+    assert extended.maxs == built.maxs
+    assert extended.edges == built.edges
+    assert extended.get_samples(100, 110) == trace[100:110]
+
+
+def test_get_points(new_devices):
+    """Test if plot points show every glitch with a bounded point count."""
+    LOW, HIGH, BLANK = new_devices.LOW, new_devices.HIGH, new_devices.BLANK
+    trace = [BLANK] * 10 + [LOW, HIGH] * 5 + [LOW] * 100000
+    trace[60000] = HIGH
+    pyramid = TracePyramid(new_devices, trace)
+
+    x_list, y_list = pyramid.get_points(0, len(trace), 500)
+    assert len(x_list) == len(y_list) <= 2 * 1000
+    glitch = [x for x, y in zip(x_list, y_list) if y == 1 and x > 1000]
+    assert len(glitch) == 1
+    assert abs(glitch[0] - 60000) < len(trace) / 500
+
+    x_list, y_list = pyramid.get_points(8, 14, 500)
+    assert x_list == [8, 9, 10, 11, 12, 13]
+    assert math.isnan(y_list[0]) and math.isnan(y_list[1])
+    assert y_list[2:] == [0, 1, 0, 1]
@@ -0,0 +1,86 @@
+"""Test the userint module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from trace_archive import TraceReader
+from userint import UserInterface
+
+
+@pytest.fixture
+def switch_interface():
+    """Return a quiet UserInterface for a switch feeding an OR gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW_ID, OR_ID] = new_names.lookup(["Sw1", "Or1"])
+    new_devices.make_device(SW_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(OR_ID, new_devices.OR, 1)
+    new_network.make_connection(SW_ID, None, OR_ID, new_names.query("I1"))
+    new_monitors.make_monitor(OR_ID, None)
+    return UserInterface(new_names, new_devices, new_network, new_monitors,
+                         quiet=True)
+
+
+def test_script_continues(switch_interface, capsys):
+    """Test if consecutive script continues run once, as one run."""
+    switch_interface.quiet = False
+    switch_interface.command_interface(
+        ["r 2\n", "c 3\n", "\n", "c 4\n", "s Sw1 1\n", "c 1\n"])
+    output = capsys.readouterr().out
+    assert "Continuing for 7 cycles. Total: 9" in output
+    assert "Continuing for 1 cycles. Total: 10" in output
+    assert output.count("Or1") == 3
+
+
+def test_quiet_session(switch_interface, capsys):
+    """Test if a quiet session prints the traces once at the end."""
+    switch_interface.command_interface(["r 2\n", "s Sw1 1\n", "c 2\n", "q\n",
+                                        "c 5\n"])
+    output = capsys.readouterr().out
+    assert output.count("Or1") == 1
+    assert "Total: 4 cycles." in output
+    assert "Or1: __--" in output
+
+
+def test_trace_export(switch_interface, tmp_path, capsys):
+    """Test if a session ends by writing the traces to an archive."""
+    path = tmp_path / "session.trace"
+    switch_interface.command_interface(["r 3\n", "c 2\n"], path)
+    assert "Or1" not in capsys.readouterr().out
+    assert TraceReader(path).get_trace("Or1") == [0] * 5
+
+
+def test_save_and_load(switch_interface, tmp_path, capsys):
+    """Test if a saved state can be branched from in a later session."""
+    path = tmp_path / "state.bin"
+    switch_interface.command_interface(["r 2\n", "s Sw1 1\n", "c 2\n",
+                                        "save {}\n".format(path), "c 3\n",
+                                        "s Sw1 0\n", "c 1\n",
+                                        "load {}\n".format(path), "c 2\n"])
+    assert switch_interface.cycles_completed == 6
+    [OR_ID] = switch_interface.names.lookup(["Or1"])
+    assert switch_interface.monitors.get_signal_trace(OR_ID, None) == \
+        [0, 0, 1, 1, 1, 1]
+
+    # Loading a later cycle pads the traces, as their history is unknown
+    switch_interface.command_interface(["s Sw1 0\n", "r 1\n",
+                                        "load {}\n".format(path), "c 1\n"])
+    assert switch_interface.monitors.get_signal_trace(OR_ID, None) == \
+        [0, 4, 4, 4, 1]
+
+    path.write_bytes(b"junk")
+    switch_interface.command_interface(["load {}\n".format(path)])
+    assert "does not match" in capsys.readouterr().out
+
+
+def test_seed_command(switch_interface):
+    """Test if the seed command seeds and unseeds the power-up state."""
+    switch_interface.command_interface(["seed 12\n"])
+    assert switch_interface.devices.seed == 12
+    switch_interface.command_interface(["seed\n"])
+    assert switch_interface.devices.seed is None
@@ -0,0 +1,77 @@
+"""Test the watchpoints module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from watchpoints import Watchpoints
+
+
+@pytest.fixture
+def new_watchpoints():
+    """Return a Watchpoints instance for two switches and a D-type."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+
+    [SW1_ID, SW2_ID, D_ID] = new_names.lookup(["Sw1", "EN", "COUNT"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(SW2_ID, new_devices.SWITCH, 0)
+    new_devices.make_device(D_ID, new_devices.D_TYPE)
+    return Watchpoints(new_names, new_devices)
+
+
+@pytest.mark.parametrize("expression, error", [
+    ("COUNT.Q == 1 and EN == 0", "NO_ERROR"),
+    ("not (Sw1 or EN != 1)", "NO_ERROR"),
+    ("Sw1", "NO_ERROR"),
+    ("Sw1 ==", "SYNTAX_ERROR"),
+    ("Sw1 == 2", "SYNTAX_ERROR"),
+    ("(Sw1 and EN", "SYNTAX_ERROR"),
+    ("Sw1 EN", "SYNTAX_ERROR"),
+    ("Sw1 > 0", "SYNTAX_ERROR"),
+    ("and", "SYNTAX_ERROR"),
+    ("Sw3 == 1", "UNKNOWN_SIGNAL"),
+    ("COUNT.DATA == 1", "UNKNOWN_SIGNAL"),
+    ("COUNT == 1", "UNKNOWN_SIGNAL"),
+])
+def test_add_watch_gives_errors(new_watchpoints, expression, error):
+    """Test if add_watch returns the correct errors."""
+    assert new_watchpoints.add_watch(expression) == getattr(new_watchpoints,
+                                                            error)
+    expected_watches = 1 if error == "NO_ERROR" else 0
+    assert len(new_watchpoints.predicates) == expected_watches
+
+
+def test_check(new_watchpoints):
+    """Test if check reports expressions on the cycle they become true."""
+    watchpoints = new_watchpoints
+    devices = watchpoints.devices
+    [SW1_ID, EN_ID, D_ID] = devices.names.lookup(["Sw1", "EN", "COUNT"])
+    count = devices.get_device(D_ID)
+    count.outputs[devices.Q_ID] = devices.LOW
+
+    assert watchpoints.add_watch("COUNT.Q == 1 and EN == 0") == \
+        watchpoints.NO_ERROR
+    assert watchpoints.add_watch("Sw1") == watchpoints.NO_ERROR
+    assert watchpoints.check() == []
+
+    # RISING counts as 1
+    count.outputs[devices.Q_ID] = devices.RISING
+    assert watchpoints.check() == ["COUNT.Q == 1 and EN == 0"]
+    # Still true, but it has already fired
+    count.outputs[devices.Q_ID] = devices.HIGH
+    assert watchpoints.check() == []
+
+    devices.get_device(EN_ID).outputs[None] = devices.HIGH
+    devices.get_device(SW1_ID).outputs[None] = devices.HIGH
+    assert watchpoints.check() == ["Sw1"]
+
+    devices.get_device(EN_ID).outputs[None] = devices.LOW
+    assert watchpoints.check() == ["COUNT.Q == 1 and EN == 0"]
+
+    watchpoints.reset()
+    assert watchpoints.check() == ["COUNT.Q == 1 and EN == 0", "Sw1"]
+
+    watchpoints.remove_all()
+    assert watchpoints.check() == []
@@ -10,25 +10,9 @@ Classes:
 """
 
 import wx
-import gettext
-import os
-
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
+
+from i18n import _
+
 
 class PromptedTextCtrl(wx.TextCtrl):
     """
@@ -0,0 +1,283 @@
+"""Write and read compressed signal trace archives.
+
+Used in the Logic Simulator project to store the results of a simulation in
+a small file that can be reloaded without simulating again.
+
+An archive starts with an 8 byte magic string and the chunk size. The trace
+of every signal is cut into chunks of chunk_size cycles. Each chunk is run
+length encoded as (signal, run length) pairs, with the run length stored as
+a variable length integer, and then compressed with zlib. Signal levels are
+small enumerations, so runs of equal levels are what compress well. Chunks
+are appended as soon as they fill up, so an archive can be written while a
+run is in progress. Closing the archive writes a footer index holding the
+signal names and the offset of every chunk, followed by the offset of the
+footer itself.
+
+Classes
+-------
+TraceWriter - writes signal traces to an archive chunk by chunk.
+TraceReader - reads signal traces back from an archive.
+
+Functions
+---------
+save_monitors - writes the traces of all monitors to an archive.
+"""
+
+import json
+import os
+import re
+import struct
+import zlib
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+
+FILE_MAGIC = b"LSTRACE1"
+FOOTER_MAGIC = b"LSINDEX1"
+HEADER_FORMAT = "<8sI"  # magic, chunk size
+TRAILER_FORMAT = "<Q8s"  # footer offset, footer magic
+
+run_pattern = re.compile(rb"(.)\1*", re.DOTALL)
+
+
+def encode_chunk(samples):
+    """Return the run length encoded and compressed bytes of samples."""
+    encoded = bytearray()
+    for run in run_pattern.finditer(samples):
+        encoded.append(samples[run.start()])
+        run_length = run.end() - run.start()
+        while run_length >= 0x80:
+            encoded.append(run_length & 0x7F | 0x80)
+            run_length >>= 7
+        encoded.append(run_length)
+    return zlib.compress(bytes(encoded))
+
+
+def decode_chunk(data):
+    """Return the samples stored by encode_chunk as bytes."""
+    encoded = zlib.decompress(data)
+    samples = bytearray()
+    position = 0
+    while position < len(encoded):
+        signal = encoded[position]
+        position += 1
+        run_length = 0
+        shift = 0
+        while True:
+            byte = encoded[position]
+            position += 1
+            run_length |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        samples += bytes([signal]) * run_length
+    return bytes(samples)
+
+
+def save_monitors(path, monitors, chunk_size=4096):
+    """Write the recorded traces of all monitors to an archive at path."""
+    signal_names = []
+    traces = []
+    for device_id, output_id in monitors.monitors_dictionary:
+        signal_names.append(monitors.devices.get_signal_name(device_id,
+                                                             output_id))
+        traces.append(monitors.get_signal_trace(device_id, output_id))
+    writer = TraceWriter(path, signal_names, chunk_size)
+    writer.append_traces(traces)
+    writer.close()
+
+
+class TraceWriter:
+
+    """Write signal traces to an archive chunk by chunk.
+
+    Parameters
+    ----------
+    path: path of the archive file to create.
+    signal_names: list of signal names, e.g. from Devices.get_signal_name.
+    chunk_size: number of cycles per chunk.
+
+    Public methods
+    --------------
+    append(self, samples): Appends one cycle, given one signal per name.
+
+    append_traces(self, traces, cycles=None): Appends several cycles, given
+                                 one list of signals per name.
+
+    flush(self): Writes all full chunks to the file.
+
+    close(self): Writes the remaining cycles and the footer index.
+    """
+
+    def __init__(self, path, signal_names, chunk_size=4096):
+        """Create the archive file and write its header."""
+        self.signal_names = list(signal_names)
+        self.chunk_size = chunk_size
+        self.cycles = 0
+        self.buffers = [bytearray() for name in self.signal_names]
+        # chunk_index stores [[offset, length] for each chunk] per signal
+        self.chunk_index = [[] for name in self.signal_names]
+
+        self.file = open(path, "wb")
+        self.file.write(struct.pack(HEADER_FORMAT, FILE_MAGIC, chunk_size))
+
+    def append(self, samples):
+        """Append one cycle, given the signal level of every signal."""
+        for buffer, signal in zip(self.buffers, samples):
+            buffer.append(signal)
+        self.cycles += 1
+        if self.cycles % self.chunk_size == 0:
+            self.flush()
+
+    def append_traces(self, traces, cycles=None):
+        """Append several cycles, given the list of levels of every signal.
+
+        cycles is the number of cycles appended, which is taken from the
+        traces if not given. It must be given for an archive of no signals,
+        so that the cycle count still moves on.
+        """
+        if cycles is None:
+            cycles = len(traces[0]) if traces else 0
+        if not self.buffers:
+            self.cycles += cycles
+            return
+        position = 0
+        while position < cycles:
+            step = min(cycles - position,
+                       self.chunk_size - len(self.buffers[0]))
+            for buffer, trace in zip(self.buffers, traces):
+                buffer.extend(trace[position:position + step])
+            position += step
+            self.cycles += step
+            if len(self.buffers[0]) == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Write all full chunks to the file."""
+        if self.buffers and len(self.buffers[0]) >= self.chunk_size:
+            self.write_chunks()
+            self.file.flush()
+
+    def write_chunks(self):
+        """Write the buffered cycles of every signal as one chunk each."""
+        for index, buffer in enumerate(self.buffers):
+            data = encode_chunk(bytes(buffer))
+            self.chunk_index[index].append([self.file.tell(), len(data)])
+            self.file.write(data)
+            self.buffers[index] = bytearray()
+
+    def close(self):
+        """Write the remaining cycles and the footer index, and close."""
+        if self.buffers and self.buffers[0]:
+            self.write_chunks()
+        footer = zlib.compress(json.dumps({
+            "chunk_size": self.chunk_size, "cycles": self.cycles,
+            "signals": self.signal_names,
+            "chunks": self.chunk_index}).encode("utf-8"))
+        footer_offset = self.file.tell()
+        self.file.write(footer)
+        self.file.write(struct.pack(TRAILER_FORMAT, footer_offset,
+                                    FOOTER_MAGIC))
+        self.file.close()
+
+
+class TraceReader:
+
+    """Read signal traces back from an archive.
+
+    Only the footer index is read when the archive is opened, and only the
+    chunks covering the requested cycles are read and decompressed, so
+    archives larger than memory can be read.
+
+    Parameters
+    ----------
+    path: path of the archive file.
+
+    Public methods
+    --------------
+    get_trace(self, signal_name, start=0, stop=None): Returns the signal
+                  levels of a signal for cycles start to stop - 1.
+
+    load_monitors(self): Returns a monitors.Monitors() instance holding every
+                         archived trace.
+    """
+
+    def __init__(self, path):
+        """Open the archive and read its footer index.
+
+        Raise ValueError if the file is not a complete archive.
+        """
+        self.path = path
+        header_size = struct.calcsize(HEADER_FORMAT)
+        trailer_size = struct.calcsize(TRAILER_FORMAT)
+        with open(path, "rb") as archive:
+            file_size = archive.seek(0, os.SEEK_END)
+            if file_size < header_size + trailer_size:
+                raise ValueError("not a trace archive")
+            archive.seek(0)
+            magic, self.chunk_size = struct.unpack(
+                HEADER_FORMAT, archive.read(header_size))
+            archive.seek(file_size - trailer_size)
+            footer_offset, footer_magic = struct.unpack(
+                TRAILER_FORMAT, archive.read(trailer_size))
+            if magic != FILE_MAGIC or footer_magic != FOOTER_MAGIC or \
+                    not header_size <= footer_offset <= \
+                    file_size - trailer_size:
+                raise ValueError("not a complete trace archive")
+            archive.seek(footer_offset)
+            footer_data = archive.read(file_size - trailer_size -
+                                       footer_offset)
+
+        try:
+            footer = json.loads(zlib.decompress(footer_data))
+        except zlib.error:
+            raise ValueError("damaged trace archive footer")
+        self.cycles = footer["cycles"]
+        self.signal_names = footer["signals"]
+        self.chunk_index = dict(zip(self.signal_names, footer["chunks"]))
+
+    def get_trace(self, signal_name, start=0, stop=None):
+        """Return the signal levels of a signal for cycles start to stop - 1.
+
+        Return None if the signal is not in the archive.
+        """
+        if signal_name not in self.chunk_index:
+            return None
+        if stop is None or stop > self.cycles:
+            stop = self.cycles
+        if start >= stop:
+            return []
+
+        chunks = self.chunk_index[signal_name]
+        first_chunk = start // self.chunk_size
+        last_chunk = (stop - 1) // self.chunk_size
+        samples = bytearray()
+        with open(self.path, "rb") as archive:
+            for offset, length in chunks[first_chunk:last_chunk + 1]:
+                archive.seek(offset)
+                samples += decode_chunk(archive.read(length))
+        first_cycle = first_chunk * self.chunk_size
+        return list(samples[start - first_cycle:stop - first_cycle])
+
+    def load_monitors(self):
+        """Return a monitors.Monitors() instance holding every archived trace.
+
+        The archived signals are attached to placeholder devices, so that
+        name lookups such as Devices.get_signal_name work as usual.
+        """
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+
+        for signal_name in self.signal_names:
+            [device_id, output_id] = devices.get_signal_ids(signal_name)
+            if devices.get_device(device_id) is None:
+                devices.add_device(device_id, None)
+            devices.add_output(device_id, output_id)
+            monitors.make_monitor(device_id, output_id)
+            monitors.monitors_dictionary[(device_id, output_id)] = \
+                self.get_trace(signal_name)
+        return monitors
@@ -0,0 +1,169 @@
+"""Summarise long signal traces at several zoom levels for plotting.
+
+Used in the Logic Simulator project to draw traces of millions of cycles
+with a few points per pixel, without hiding short glitches.
+
+Classes
+-------
+TracePyramid - stores min/max/transition summaries of a signal trace.
+"""
+
+import operator
+
+
+class TracePyramid:
+
+    """Store min/max/transition summaries of a signal trace.
+
+    Level 0 of the pyramid holds one summary per cycle, and each level above
+    halves the resolution, so a bucket at level k covers 2**k cycles. A
+    bucket stores the lowest and highest level of the signal in it and
+    whether the signal changed anywhere in it. Plotting the lowest and the
+    highest level of every bucket therefore shows every change, however
+    short, at any zoom level.
+
+    Levels are counted in half steps: LOW is 0, RISING and FALLING are 1 and
+    HIGH is 2. A bucket holding only BLANK signals has its minimum above its
+    maximum.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    signal_list: initial signal trace, e.g. from Monitors.get_signal_trace.
+
+    Public methods
+    --------------
+    extend(self, signal_list): Appends signals to the end of the trace.
+
+    get_samples(self, start, stop): Returns the signals for cycles start to
+                                    stop - 1.
+
+    get_buckets(self, start, stop, max_buckets): Returns the summaries of at
+                  most about max_buckets buckets covering start to stop - 1.
+
+    get_points(self, start, stop, max_buckets): Returns the points of a line
+                  plot of cycles start to stop - 1.
+    """
+
+    def __init__(self, devices, signal_list=()):
+        """Initialise the level tables and the empty pyramid."""
+        self.devices = devices
+
+        # Map a signal to its level in half steps, BLANK is outside every
+        # [minimum, maximum] range
+        self.min_table = bytearray([0xFF] * 256)
+        self.max_table = bytearray(256)
+        for signal, level in [(devices.LOW, 0), (devices.RISING, 1),
+                              (devices.FALLING, 1), (devices.HIGH, 2)]:
+            self.min_table[signal] = level
+            self.max_table[signal] = level
+        self.edge_table = bytearray(256)
+        self.edge_table[devices.RISING] = 1
+        self.edge_table[devices.FALLING] = 1
+
+        self.samples = bytearray()
+        self.mins = [bytearray()]  # one bytearray per level
+        self.maxs = [bytearray()]
+        self.edges = [bytearray()]
+        self.extend(signal_list)
+
+    def __len__(self):
+        """Return the number of cycles in the trace."""
+        return len(self.samples)
+
+    def extend(self, signal_list):
+        """Append signals to the end of the trace.
+
+        Only the buckets covering the new cycles are recomputed, so extending
+        after every continue costs time in proportion to the new cycles.
+        """
+        samples = bytes(signal_list)
+        if not samples:
+            return
+        previous = self.samples[-1:] or samples[:1]
+        changes = bytes(map(operator.ne, samples, previous + samples[:-1]))
+
+        first = len(self.samples)  # first bucket to recompute at each level
+        self.samples += samples
+        self.mins[0] += samples.translate(self.min_table)
+        self.maxs[0] += samples.translate(self.max_table)
+        self.edges[0] += bytes(map(operator.or_, changes,
+                                   samples.translate(self.edge_table)))
+
+        level = 0
+        while len(self.mins[level]) > 1:
+            if level + 1 == len(self.mins):
+                self.mins.append(bytearray())
+                self.maxs.append(bytearray())
+                self.edges.append(bytearray())
+            first //= 2
+            for levels, function in [(self.mins, min), (self.maxs, max),
+                                     (self.edges, max)]:
+                del levels[level + 1][first:]
+                levels[level + 1] += self.merge(levels[level][2 * first:],
+                                                function)
+            level += 1
+
+    @staticmethod
+    def merge(data, function):
+        """Return the pairs of data combined with function, e.g. min."""
+        merged = bytes(map(function, data[0::2], data[1::2]))
+        if len(data) % 2:
+            merged += data[-1:]
+        return merged
+
+    def get_samples(self, start, stop):
+        """Return the signals for cycles start to stop - 1 as a list."""
+        return list(self.samples[max(start, 0):max(stop, 0)])
+
+    def get_buckets(self, start, stop, max_buckets):
+        """Return the summaries of the buckets covering start to stop - 1.
+
+        The finest level with at most about max_buckets buckets in the window
+        is used. Return a tuple (bucket_size, first_cycle, mins, maxs, edges),
+        where first_cycle is the first cycle of the first bucket.
+        """
+        start = max(start, 0)
+        stop = min(stop, len(self.samples))
+        level = 0
+        while level + 1 < len(self.mins) and \
+                stop - start > max_buckets << level:
+            level += 1
+        if start >= stop:
+            return (1 << level, start, b"", b"", b"")
+
+        first = start >> level
+        last = (stop - 1) >> level
+        return (1 << level, first << level, self.mins[level][first:last + 1],
+                self.maxs[level][first:last + 1],
+                self.edges[level][first:last + 1])
+
+    def get_points(self, start, stop, max_buckets):
+        """Return the x and y lists of a line plot of cycles start to stop - 1.
+
+        Levels are plotted as 0 for LOW, 0.5 for RISING and FALLING and 1 for
+        HIGH, with NaN gaps for BLANK signals. Each bucket above level 0 is
+        drawn as a vertical stroke from its lowest to its highest level.
+        """
+        bucket_size, cycle, mins, maxs, edges = self.get_buckets(
+            start, stop, max_buckets)
+        x_list = []
+        y_list = []
+        previous = 0
+        for low, high in zip(mins, maxs):
+            if low > high:
+                x_list.append(cycle)
+                y_list.append(float("nan"))
+            elif bucket_size == 1:
+                x_list.append(cycle)
+                y_list.append(low / 2)
+            else:
+                # Start the stroke at the end nearest the previous point
+                centre = cycle + bucket_size / 2
+                if 2 * previous > low + high:
+                    low, high = high, low
+                x_list += [centre, centre]
+                y_list += [low / 2, high / 2]
+                previous = high
+            cycle += bucket_size
+        return x_list, y_list
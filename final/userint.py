@@ -8,25 +8,19 @@ Classes:
 UserInterface - reads and parses user commands.
 """
 
-import gettext
-import os
-
-# Set up localization
-if os.getenv("LANG") == "el_GR.UTF-8":
-    locale = "el_GR.utf8"
-elif os.getenv("LANG") in ["en_US.UTF-8", "en_GB.UTF-8"]:
-    locale = "en_GB.utf8"
-else:
-    locale = "en_GB.utf8"
-
-lang = gettext.translation(
-    "logsim",
-    localedir=os.path.join(os.path.dirname(__file__), 'locales'),
-    languages=[locale],
-    fallback=True
-)
-lang.install()
-_ = lang.gettext
+import shutil
+import struct
+import sys
+
+from watchpoints import Watchpoints
+from stimulus import Stimulus
+from periodicity import PeriodDetector
+from trace_archive import save_monitors
+from i18n import _
+
+STATE_MAGIC = b"LSSTATE1"
+STATE_HEADER = "<8sQ"  # magic, cycles completed
+
 
 class UserInterface:
     """Read and parse user commands.
@@ -42,15 +36,19 @@ class UserInterface:
     devices: instance of the devices.Devices() class.
     network: instance of the network.Network() class.
     monitors: instance of the monitors.Monitors() class.
+    quiet: if True, runs print nothing and the signal traces are shown once
+           at the end of the session.
+    cache: instance of the result_cache.ResultCache() class, or None. Runs
+           found in the cache are restored instead of simulated.
 
     Public methods:
     ---------------
-    command_interface(self): Reads in the commands and calls the corresponding
-                             functions.
+    command_interface(self, script=None, out_path=None): Reads in the
+                             commands and calls the corresponding functions.
 
     get_line(self): Prints a prompt for the user and updates the user entry.
 
-    read_command(self): Returns the first non-whitespace character.
+    read_command(self): Returns the command word at the start of the entry.
 
     get_character(self): Moves the cursor forward by one character in the user
                          entry.
@@ -76,34 +74,80 @@ class UserInterface:
 
     zap_command(self): Removes the specified monitor.
 
+    watch_command(self): Adds a watch expression, or clears all of them.
+
+    stats_command(self): Prints activity statistics, starting the collector
+                         on first use.
+
+    stimulus_command(self): Loads a stimulus file, or clears the stimulus.
+
+    seed_command(self): Seeds the power-up state of runs, or unseeds it.
+
+    save_command(self): Saves the simulation state to a file.
+
+    load_command(self): Restores the simulation state from a file.
+
+    display_command(self, summary=False): Shows the signal traces of a window
+                                          of cycles.
+
+    show_signals(self, start=0, stop=None, summary=False): Shows the signal
+                 traces, wrapped to the terminal and paged if long.
+
     run_network(self, cycles): Runs the network for the specified number of
                                simulation cycles.
 
     run_command(self): Runs the simulation from scratch.
 
     continue_command(self): Continues a previously run simulation.
+
+    run_pending(self): Runs the continue commands waiting in a script.
+
+    end_session(self, out_path): Shows the signal traces or writes them to a
+                                 trace archive.
     """
-    def __init__(self, names, devices, network, monitors):
+    def __init__(self, names, devices, network, monitors, quiet=False,
+                 cache=None):
         """Initialise variables."""
         self.names = names
         self.devices = devices
         self.monitors = monitors
         self.network = network
+        self.quiet = quiet
+        self.cache = cache
+        # Result cache key of the current run, or None once the session
+        # differs from a plain run from cycle 0, e.g. after a switch change
+        self.cache_key = None
 
         self.cycles_completed = 0  # number of simulation cycles completed
+        self.watchpoints = Watchpoints(names, devices)
+        self.stimulus = Stimulus(names, devices)
 
         self.character = ""  # current character
         self.line = ""  # current string entered by the user
         self.cursor = 0  # cursor position
+        self.script = None  # iterator over script lines, or None for input()
+        self.pending_cycles = 0  # cycles of script continues not yet run
+
+    def command_interface(self, script=None, out_path=None):
+        """Read the command entered and call the corresponding function.
 
-    def command_interface(self):
-        """Read the command entered and call the corresponding function."""
-        print(_("Logic Simulator: interactive command line user interface.\n"
-              "Enter 'h' for help."))
-        self.get_line()  # get the user entry
-        command = self.read_command()  # read the first character
-        while command != "q":
-            if command == "h":
+        If script is given, e.g. an open file or piped standard input, the
+        commands are read from its lines without prompts, and consecutive
+        continue commands are run together as one. The session ends at "q"
+        or at the end of the input, and the traces are then written to a
+        trace archive at out_path if given.
+        """
+        self.script = None if script is None else iter(script)
+        if script is None:
+            print(_("Logic Simulator: interactive command line user "
+                    "interface.\nEnter 'h' for help."))
+        while self.get_line():  # get the user entry
+            command = self.read_command()  # read the first character
+            if command != "c":
+                self.run_pending()
+            if command == "q":
+                break
+            elif command == "h":
                 self.help_command()
             elif command == "s":
                 self.switch_command()
@@ -115,22 +159,60 @@ class UserInterface:
                 self.run_command()
             elif command == "c":
                 self.continue_command()
+            elif command == "w":
+                self.watch_command()
+            elif command == "stats":
+                self.stats_command()
+            elif command == "stim":
+                self.stimulus_command()
+            elif command == "seed":
+                self.seed_command()
+            elif command == "save":
+                self.save_command()
+            elif command == "load":
+                self.load_command()
+            elif command == "d":
+                self.display_command()
+            elif command == "ds":
+                self.display_command(summary=True)
             else:
                 print(_("Invalid command. Enter 'h' for help."))
-            self.get_line()  # get the user entry
-            command = self.read_command()  # read the first character
+        self.run_pending()
+        self.end_session(out_path)
 
     def get_line(self):
-        """Print prompt for the user and update the user entry."""
+        """Print prompt for the user and update the user entry.
+
+        Read the next line of the script instead if there is one. Return
+        False at the end of the input.
+        """
         self.cursor = 0
-        self.line = input("#: ")
-        while self.line == "":  # if the user enters a blank line
-            self.line = input("#: ")
+        self.line = ""
+        try:
+            while self.line.strip() == "":  # skip blank lines
+                if self.script is None:
+                    self.line = input("#: ")
+                else:
+                    self.line = next(self.script).rstrip("\n")
+        except (EOFError, StopIteration):
+            return False
+        return True
 
     def read_command(self):
-        """Return the first non-whitespace character."""
+        """Return the command word at the start of the user entry.
+
+        Most commands are a single letter, so for "r 10" this is "r".
+        """
         self.skip_spaces()
-        return self.character
+        command = self.character
+        if command.isalpha():
+            self.get_character()
+            while self.character.isalpha():
+                command = "".join([command, self.character])
+                self.get_character()
+            if self.character:  # let the next read see this character again
+                self.cursor -= 1
+        return command
 
     def get_character(self):
         """Move the cursor forward by one character in the user entry."""
@@ -224,6 +306,17 @@ class UserInterface:
         print(_("s X N     - set switch X to N (0 or 1)"))
         print(_("m X       - set a monitor on signal X"))
         print(_("z X       - zap the monitor on signal X"))
+        print(_("w E       - stop runs when expression E becomes true"))
+        print(_("w         - clear all watch expressions"))
+        print(_("stats     - show signal activity statistics"))
+        print(_("stim F    - apply the switch events of stimulus file F"))
+        print(_("stim      - clear the stimulus"))
+        print(_("seed N    - repeat the same power-up state in every run"))
+        print(_("seed      - use a new power-up state in every run"))
+        print(_("save F    - save the simulation state to file F"))
+        print(_("load F    - go back to the simulation state in file F"))
+        print(_("d [N [M]] - show the signal traces from cycle N up to M"))
+        print(_("ds        - as d, with constant stretches collapsed"))
         print(_("h         - help (this command)"))
         print(_("q         - quit the program"))
 
@@ -234,6 +327,7 @@ class UserInterface:
             switch_state = self.read_number(0, 1)
             if switch_state is not None:
                 if self.devices.set_switch(switch_id, switch_state):
+                    self.cache_key = None
                     print(_("Successfully set switch."))
                 else:
                     print(_("Error! Invalid switch."))
@@ -246,6 +340,7 @@ class UserInterface:
             monitor_error = self.monitors.make_monitor(device, port,
                                                        self.cycles_completed)
             if monitor_error == self.monitors.NO_ERROR:
+                self.cache_key = None
                 print(_("Successfully made monitor."))
             else:
                 print(_("Error! Could not make monitor."))
@@ -256,22 +351,209 @@ class UserInterface:
         if monitor is not None:
             [device, port] = monitor
             if self.monitors.remove_monitor(device, port):
+                self.cache_key = None
                 print(_("Successfully zapped monitor"))
             else:
                 print(_("Error! Could not zap monitor."))
 
+    def watch_command(self):
+        """Add the watch expression on the rest of the line.
+
+        Clear all watch expressions if none is given.
+        """
+        expression = self.line[self.cursor:].strip()
+        if not expression:
+            self.watchpoints.remove_all()
+            print(_("Cleared all watch expressions."))
+            return
+        watch_error = self.watchpoints.add_watch(expression)
+        if watch_error == self.watchpoints.NO_ERROR:
+            print(_("Successfully added watch expression."))
+        elif watch_error == self.watchpoints.UNKNOWN_SIGNAL:
+            print(_("Error! Unknown signal in watch expression."))
+        else:
+            print(_("Error! Invalid watch expression."))
+
+    def stats_command(self):
+        """Print activity statistics, starting the collector on first use."""
+        if self.monitors.activity is None:
+            self.monitors.enable_activity()
+            self.cache_key = None
+            print(_("Collecting activity statistics from the next cycle."))
+        else:
+            self.monitors.activity.display_statistics()
+
+    def stimulus_command(self):
+        """Load the stimulus file named on the rest of the line.
+
+        Clear the stimulus if no file is given. Events before the current
+        cycle are skipped, so a stimulus can be loaded between runs.
+        """
+        path = self.line[self.cursor:].strip()
+        self.stimulus.clear()
+        self.cache_key = None
+        if not path:
+            print(_("Cleared the stimulus."))
+            return
+        try:
+            stimulus_error = self.stimulus.load(path)
+        except OSError:
+            print(_("Error! Cannot open stimulus file."))
+            return
+        if stimulus_error == self.stimulus.NO_ERROR:
+            self.stimulus.skip(self.cycles_completed)
+            print(_("Successfully loaded stimulus."))
+        else:
+            line = self.stimulus.error_line
+            self.stimulus.clear()
+            print(_("Error! Invalid stimulus on line {line}.").format(
+                line=line))
+
+    def seed_command(self):
+        """Seed the power-up state of the next runs with the given number.
+
+        Use a new random power-up state in every run if none is given.
+        """
+        self.cache_key = None
+        if not self.line[self.cursor:].strip():
+            self.devices.set_seed(None)
+            print(_("Runs will power up at random."))
+            return
+        seed = self.read_number(0, None)
+        if seed is not None:
+            self.devices.set_seed(seed)
+            print(_("Runs will power up with seed {seed}.").format(seed=seed))
+
+    def save_command(self):
+        """Save the simulation state to the file named on the line."""
+        path = self.line[self.cursor:].strip()
+        if not path:
+            print(_("Error! Expected a file name."))
+            return
+        try:
+            with open(path, "wb") as state_file:
+                state_file.write(struct.pack(STATE_HEADER, STATE_MAGIC,
+                                             self.cycles_completed))
+                state_file.write(self.network.snapshot())
+        except OSError:
+            print(_("Error! Cannot write state file."))
+            return
+        print(_("Saved the state at cycle {cycle}.").format(
+            cycle=self.cycles_completed))
+
+    def load_command(self):
+        """Restore the simulation state from the file named on the line.
+
+        The monitor traces are cut back, or padded, to the saved cycle, so
+        the next continue runs from there.
+        """
+        path = self.line[self.cursor:].strip()
+        if not path:
+            print(_("Error! Expected a file name."))
+            return
+        header_size = struct.calcsize(STATE_HEADER)
+        try:
+            with open(path, "rb") as state_file:
+                data = state_file.read()
+        except OSError:
+            print(_("Error! Cannot open state file."))
+            return
+        try:
+            if len(data) < header_size:
+                raise ValueError("not a state file")
+            magic, cycle = struct.unpack_from(STATE_HEADER, data)
+            if magic != STATE_MAGIC:
+                raise ValueError("not a state file")
+            self.network.restore(data[header_size:])
+        except ValueError:
+            print(_("Error! State file does not match the circuit."))
+            return
+        self.cycles_completed = cycle
+        self.cache_key = None
+        self.monitors.rewind(cycle)
+        self.watchpoints.reset()
+        self.stimulus.reset()
+        self.stimulus.skip(cycle)
+        print(_("Loaded the state at cycle {cycle}.").format(cycle=cycle))
+
+    def display_command(self, summary=False):
+        """Show the signal traces from the optional start to stop cycles."""
+        window = [0, None]
+        for index in range(2):
+            if self.line[self.cursor:].strip():
+                window[index] = self.read_number(0, None)
+                if window[index] is None:
+                    return
+        [start, stop] = window
+        if stop is not None and stop <= start:
+            print(_("Number out of range."))
+            return
+        self.show_signals(start, stop, summary)
+
+    def show_signals(self, start=0, stop=None, summary=False):
+        """Show the signal traces of cycles start to stop - 1.
+
+        On a terminal the traces are wrapped to its width, and shown in a
+        pager if they do not fit on the screen.
+        """
+        if not sys.stdout.isatty():
+            self.monitors.display_signals(start, stop, summary=summary)
+            return
+        columns, rows = shutil.get_terminal_size()
+        text = self.monitors.format_signals(start, stop, columns, summary)
+        if text.count("\n") >= rows - 1:
+            import pydoc  # slow to import, and only needed here
+            pydoc.pager(text)
+        else:
+            sys.stdout.write(text)
+
     def run_network(self, cycles):
         """Run the network for the specified number of simulation cycles.
 
-        Return True if successful.
+        cycles_completed is updated as each cycle completes, and stimulus
+        events are applied as their cycles come. The run stops early if a
+        watch expression becomes true. Return True if successful.
+
+        With a result cache, the cycles of the longest cached run that ends
+        within them are restored instead of simulated, and the run is stored
+        once completed. Watch expressions are only checked on simulated
+        cycles, so the cache is not used while there are any.
+
+        Once the network state repeats after the last stimulus event, whole
+        periods are copied into the monitors instead of simulated, unless
+        there are watch expressions.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                print(_("Error! Network oscillating."))
-                return False
-        self.monitors.display_signals()
+        stop = self.cycles_completed + cycles
+        use_cache = self.cache_key is not None and \
+            not self.watchpoints.predicates
+        if use_cache:
+            restored = self.cache.load(self.cache_key, stop, self.monitors,
+                                       self.cycles_completed + 1)
+            if restored:
+                self.cycles_completed = restored
+                self.stimulus.reset()
+                self.stimulus.skip(restored)
+        cached_cycles = self.cycles_completed
+
+        detector = PeriodDetector(self.network, self.monitors)
+        [self.cycles_completed, status, fired] = self.monitors.run_cycles(
+            self.cycles_completed, stop, self.stimulus, self.watchpoints,
+            detector)
+        if status == self.monitors.OSCILLATING:
+            self.cache_key = None
+            print(_("Error! Network oscillating."))
+            return False
+        if fired:
+            print(_("Watch expression true at cycle {cycle}: "
+                    "{expression}").format(cycle=self.cycles_completed,
+                                           expression=", ".join(fired)))
+        if use_cache and self.cycles_completed == stop > cached_cycles:
+            try:
+                self.cache.store(self.cache_key, stop, self.monitors)
+            except OSError:
+                print(_("Error! Cannot write to the result cache."))
+        if not self.quiet:
+            self.show_signals()
         return True
 
     def run_command(self):
@@ -281,10 +563,16 @@ class UserInterface:
 
         if cycles is not None:  # if the number of cycles provided is valid
             self.monitors.reset_monitors()
-            print(_("".join(["Running for ", str(cycles), " cycles"])))
+            if not self.quiet:
+                print(_("".join(["Running for ", str(cycles), " cycles"])))
+            if self.cache is not None:
+                # Taken before the cold start-up, with the initial switches
+                self.cache_key = self.cache.get_key(self.monitors,
+                                                    self.stimulus)
             self.devices.cold_startup()
-            if self.run_network(cycles):
-                self.cycles_completed += cycles
+            self.watchpoints.reset()
+            self.stimulus.reset()
+            self.run_network(cycles)
 
     def continue_command(self):
         """Continue a previously run simulation."""
@@ -292,7 +580,33 @@ class UserInterface:
         if cycles is not None:  # if the number of cycles provided is valid
             if self.cycles_completed == 0:
                 print(_("Error! Nothing to continue. Run first."))
-            elif self.run_network(cycles):
-                self.cycles_completed += cycles
+            elif self.script is not None:
+                # Wait for the next command, to run consecutive continues
+                # as one
+                self.pending_cycles += cycles
+            elif self.run_network(cycles) and not self.quiet:
                 print(" ".join(["Continuing for", str(cycles), "cycles.",
                                 "Total:", str(self.cycles_completed)]))
+
+    def run_pending(self):
+        """Run the continue commands waiting in a script as one run."""
+        cycles = self.pending_cycles
+        self.pending_cycles = 0
+        if cycles and self.run_network(cycles) and not self.quiet:
+            print(" ".join(["Continuing for", str(cycles), "cycles.",
+                            "Total:", str(self.cycles_completed)]))
+
+    def end_session(self, out_path=None):
+        """Write the signal traces to a trace archive at out_path if given.
+
+        Otherwise show the traces once if runs were quiet.
+        """
+        if out_path is not None:
+            try:
+                save_monitors(out_path, self.monitors)
+            except OSError:
+                print(_("Error! Cannot write trace archive."))
+        elif self.quiet:
+            print(" ".join(["Total:", str(self.cycles_completed),
+                            "cycles."]))
+            self.show_signals(summary=True)
@@ -0,0 +1,201 @@
+"""Compile and check watch expressions over signal levels.
+
+Used in the Logic Simulator project to stop long runs as soon as a condition
+on the network signals becomes true, e.g. "w COUNT.Q == 1 and EN == 0".
+
+Classes
+-------
+Watchpoints - compiles watch expressions and checks them every cycle.
+"""
+
+import re
+
+
+class Watchpoints:
+
+    """Compile watch expressions and check them every cycle.
+
+    A watch expression compares signals with 0 or 1 and combines the results
+    with "and", "or", "not" and brackets. A bare signal name means "== 1".
+    RISING counts as 1 and FALLING as 0. Each expression is compiled once
+    into a Python predicate bound directly to the output dictionaries of the
+    devices it reads, so checking it costs a few dictionary lookups.
+
+    A watchpoint fires on the cycle its expression becomes true, so the
+    simulation can be continued past it.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+
+    Public methods
+    --------------
+    add_watch(self, expression): Compiles and adds a watch expression.
+
+    remove_all(self): Deletes all watch expressions.
+
+    reset(self): Forgets which expressions were true on the last check.
+
+    check(self): Returns the watch expressions that have just become true.
+    """
+
+    token_pattern = re.compile(r"\s*(?:(==|!=|\(|\))|([A-Za-z]\w*(?:\.\w+)?)"
+                               r"|(\d+)|(\S))")
+
+    def __init__(self, names, devices):
+        """Initialise the watch lists and watch errors."""
+        self.names = names
+        self.devices = devices
+
+        self.expressions = []  # expression strings as entered by the user
+        self.predicates = []  # compiled predicates, one per expression
+        self.active = []  # whether each predicate held on the last check
+
+        [self.NO_ERROR, self.SYNTAX_ERROR,
+         self.UNKNOWN_SIGNAL] = self.names.unique_error_codes(3)
+
+        self.tokens = []
+        self.position = 0
+        self.namespace = {}
+
+    def add_watch(self, expression):
+        """Compile the watch expression and add it to the watch list.
+
+        Return NO_ERROR if successful, or the corresponding error if not.
+        """
+        self.tokens = []
+        for match in self.token_pattern.finditer(expression.strip()):
+            operator, signal_name, number, other = match.groups()
+            if other is not None:
+                return self.SYNTAX_ERROR
+            self.tokens.append(operator or signal_name or number)
+        self.position = 0
+        self.namespace = {"ONE": frozenset([self.devices.HIGH,
+                                            self.devices.RISING])}
+
+        try:
+            code = self.or_expression()
+        except ValueError:
+            return self.SYNTAX_ERROR
+        except LookupError:
+            return self.UNKNOWN_SIGNAL
+        if self.position != len(self.tokens):
+            return self.SYNTAX_ERROR
+
+        predicate = eval("lambda: " + code, self.namespace)
+        self.expressions.append(expression.strip())
+        self.predicates.append(predicate)
+        self.active.append(bool(predicate()))
+        return self.NO_ERROR
+
+    def remove_all(self):
+        """Delete all watch expressions."""
+        self.expressions = []
+        self.predicates = []
+        self.active = []
+
+    def reset(self):
+        """Forget which expressions were true, e.g. after a cold start."""
+        self.active = [False] * len(self.predicates)
+
+    def check(self):
+        """Return the watch expressions that have become true this cycle.
+
+        This function is called at every simulation cycle while there are
+        watch expressions.
+        """
+        fired = []
+        for index, predicate in enumerate(self.predicates):
+            value = predicate()
+            if value and not self.active[index]:
+                fired.append(self.expressions[index])
+            self.active[index] = value
+        return fired
+
+    def next_token(self):
+        """Return the current token without consuming it."""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def expect(self, token):
+        """Consume the current token, which must equal token."""
+        if self.next_token() != token:
+            raise ValueError(token)
+        self.position += 1
+
+    def or_expression(self):
+        """Compile or_expression = and_expression, {"or", and_expression}."""
+        code = self.and_expression()
+        while self.next_token() == "or":
+            self.position += 1
+            code = "".join(["(", code, " or ", self.and_expression(), ")"])
+        return code
+
+    def and_expression(self):
+        """Compile and_expression = not_expression, {"and", not_expression}."""
+        code = self.not_expression()
+        while self.next_token() == "and":
+            self.position += 1
+            code = "".join(["(", code, " and ", self.not_expression(), ")"])
+        return code
+
+    def not_expression(self):
+        """Compile not_expression = "not", not_expression | comparison."""
+        if self.next_token() == "not":
+            self.position += 1
+            return "".join(["(not ", self.not_expression(), ")"])
+        return self.comparison()
+
+    def comparison(self):
+        """Compile comparison = "(", or_expression, ")" | signal, [op, 0 | 1]."""
+        token = self.next_token()
+        if token == "(":
+            self.position += 1
+            code = self.or_expression()
+            self.expect(")")
+            return code
+        if token is None or not token[0].isalpha() or \
+                token in ["and", "or", "not"]:
+            raise ValueError(token)
+        self.position += 1
+        signal_code = self.signal(token)
+
+        wanted = 1
+        if self.next_token() in ["==", "!="]:
+            operator = self.next_token()
+            self.position += 1
+            if self.next_token() not in ["0", "1"]:
+                raise ValueError(self.next_token())
+            wanted = int(self.next_token())
+            self.position += 1
+            if operator == "!=":
+                wanted = 1 - wanted
+        if wanted == 1:
+            return "".join(["(", signal_code, " in ONE)"])
+        return "".join(["(", signal_code, " not in ONE)"])
+
+    def signal(self, signal_name):
+        """Return code reading the output signal called signal_name.
+
+        Raise LookupError if there is no such output.
+        """
+        string_list = signal_name.split(".")
+        device_id = self.names.query(string_list[0])
+        port_id = None
+        if len(string_list) == 2:
+            port_id = self.names.query(string_list[1])
+            if port_id is None:
+                raise LookupError(signal_name)
+        device = None
+        if device_id is not None:
+            device = self.devices.get_device(device_id)
+        if device is None or port_id not in device.outputs:
+            raise LookupError(signal_name)
+
+        # Bind the output dictionary once, the predicate only indexes it
+        index = len(self.namespace)
+        self.namespace["o" + str(index)] = device.outputs
+        self.namespace["k" + str(index)] = port_id
+        return "".join(["o", str(index), "[k", str(index), "]"])